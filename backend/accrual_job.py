@@ -1,44 +1,61 @@
 ﻿"""Daily accrual job for investments and loans."""
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+import argparse
+import json
 import logging
+import multiprocessing
 
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, create_engine, func, insert, select, union_all, update
+from sqlalchemy.orm import Session, sessionmaker
 
-from app.db import SessionLocal
-from app.models import Investment, Loan, Transaction, Wallet
-from app.services.finance_service import calculate_investment_accrual, calculate_loan_accrual
+from app.db import DATABASE_URL, SessionLocal
+from app.models import AccrualRun, Investment, Loan, Transaction
+from app.services.finance_service import (
+    ACCRUING_LOAN_STATUSES,
+    accrued_interest_cents,
+    calculate_investment_accrual,
+    calculate_loan_accrual,
+)
+from app.services.wallet_service import resolve_wallet_ids
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("accrual_job")
 
 
+BULK_BATCH_SIZE = 5000
+
+ChunkCallback = Callable[[int, int], None]
+UserRange = tuple[int, int]
+
+
 def _utc_now() -> datetime:
-    return datetime.now(tz=timezone.utc)
+    # As colunas DateTime sao gravadas em UTC sem timezone (datetime.utcnow)
+    return datetime.now(tz=timezone.utc).replace(tzinfo=None)
 
 
 def _floor_days(delta: timedelta) -> int:
     return max(int(delta.total_seconds() // 86400), 0)
 
 
-def _ensure_wallet(db: Session, user_id: int) -> Wallet:
-    wallet = db.query(Wallet).filter(Wallet.user_id == user_id).first()
-    if wallet:
-        return wallet
-    wallet = Wallet(user_id=user_id, saldo=0.0)
-    db.add(wallet)
-    db.flush()
-    return wallet
+def _add_accrual_transactions(db: Session, pending: list[tuple[int, Transaction]]) -> int:
+    wallet_ids = resolve_wallet_ids(db, {user_id for user_id, _ in pending})
+    for user_id, tx in pending:
+        tx.wallet_id = wallet_ids[user_id]
+        db.add(tx)
+    return len(pending)
 
 
 def process_investments(db: Session) -> int:
-    count = 0
     now = _utc_now()
     investments = (
         db.query(Investment)
         .filter(Investment.status == "ativo")
         .all()
     )
+    pending: list[tuple[int, Transaction]] = []
     for investment in investments:
         last = investment.last_accrual_at or investment.created_at or now
         diff_days = _floor_days(now - last)
@@ -53,28 +70,25 @@ def process_investments(db: Session) -> int:
             continue
         investment.rendimento_acumulado += float(accrual.juros)
         investment.last_accrual_at = last + timedelta(days=diff_days)
-        wallet = _ensure_wallet(db, investment.user_id)
         tx = Transaction(
-            wallet_id=wallet.id,
             tipo="rendimento_acumulado",
             valor=float(accrual.juros),
             descricao=f"Juros acumulados ({diff_days} dias) investimento {investment.id}",
             related_investment_id=investment.id,
         )
-        db.add(tx)
+        pending.append((investment.user_id, tx))
         db.add(investment)
-        count += 1
-    return count
+    return _add_accrual_transactions(db, pending)
 
 
 def process_loans(db: Session) -> int:
-    count = 0
     now = _utc_now()
     loans = (
         db.query(Loan)
-        .filter(Loan.status.in_(["ativo", "pendente"]))
+        .filter(Loan.status.in_(ACCRUING_LOAN_STATUSES))
         .all()
     )
+    pending: list[tuple[int, Transaction]] = []
     for loan in loans:
         last = loan.last_accrual_at or loan.created_at or now
         diff_days = _floor_days(now - last)
@@ -90,21 +104,470 @@ def process_loans(db: Session) -> int:
             continue
         loan.interest_accrued += float(accrual.juros)
         loan.last_accrual_at = last + timedelta(days=diff_days)
-        wallet = _ensure_wallet(db, loan.user_id)
         tx = Transaction(
-            wallet_id=wallet.id,
             tipo="juros_acumulado",
             valor=float(accrual.juros),
             descricao=f"Juros acumulados ({diff_days} dias) emprestimo {loan.id}",
             related_loan_id=loan.id,
         )
-        db.add(tx)
+        pending.append((loan.user_id, tx))
         db.add(loan)
-        count += 1
+    return _add_accrual_transactions(db, pending)
+
+
+def _keyset_batches(db: Session, stmt, id_column, batch_size: int, start_after: int = 0):
+    """Percorre ``stmt`` em lotes ordenados por id (WHERE id > ultimo LIMIT n).
+
+    Cada lote e lido com FOR UPDATE SKIP LOCKED: linhas travadas por uma
+    requisicao em andamento (pay_loan, redeem_investment...) sao puladas em
+    vez de bloquear o job e ficam para a proxima execucao. Dialetos sem
+    suporte (SQLite) ignoram a clausula.
+    """
+    last_id = start_after
+    while True:
+        rows = db.execute(
+            stmt.where(id_column > last_id)
+            .order_by(id_column)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+_bulk_investment_update = (
+    update(Investment.__table__)
+    .where(Investment.__table__.c.id == bindparam("b_id"))
+    .values(
+        rendimento_acumulado=Investment.__table__.c.rendimento_acumulado + bindparam("b_juros"),
+        last_accrual_at=bindparam("b_last_accrual_at"),
+    )
+)
+
+_bulk_loan_update = (
+    update(Loan.__table__)
+    .where(Loan.__table__.c.id == bindparam("b_id"))
+    .values(
+        interest_accrued=Loan.__table__.c.interest_accrued + bindparam("b_juros"),
+        last_accrual_at=bindparam("b_last_accrual_at"),
+    )
+)
+
+_bulk_loan_touch = (
+    update(Loan.__table__)
+    .where(Loan.__table__.c.id == bindparam("b_id"))
+    .values(last_accrual_at=bindparam("b_last_accrual_at"))
+)
+
+
+def bulk_process_investments(
+    db: Session,
+    now: datetime | None = None,
+    batch_size: int = BULK_BATCH_SIZE,
+    start_after: int = 0,
+    on_chunk: Optional[ChunkCallback] = None,
+    user_range: Optional[UserRange] = None,
+) -> int:
+    """Versao em lote de ``process_investments``.
+
+    Le apenas as colunas necessarias (sem ORM), resolve as carteiras do lote
+    em uma consulta e aplica os juros com um UPDATE executemany e um
+    INSERT executemany de transacoes por lote. Os juros sao calculados em
+    centavos inteiros com ROUND_HALF_EVEN exato, que o ROUND do banco nao
+    garante em todos os dialetos.
+
+    ``on_chunk(ultimo_id, processados)`` e chamado ao fim de cada lote; e ali
+    que o job faz commit e grava o checkpoint. ``user_range`` (inclusivo)
+    restringe o lote a uma particao de usuarios no modo paralelo.
+    """
+    now = now or _utc_now()
+    count = 0
+    stmt = select(
+        Investment.id,
+        Investment.user_id,
+        Investment.valor,
+        Investment.taxa_rendimento,
+        Investment.last_accrual_at,
+        Investment.created_at,
+    ).where(Investment.status == "ativo")
+    if user_range is not None:
+        stmt = stmt.where(Investment.user_id.between(*user_range))
+
+    for rows in _keyset_batches(db, stmt, Investment.id, batch_size, start_after):
+        processed = _accrue_investment_rows(db, rows, now)
+        count += processed
+        if on_chunk is not None:
+            on_chunk(rows[-1].id, processed)
     return count
 
 
-def run_accrual_job() -> None:
+def _accrue_investment_rows(db: Session, rows, now: datetime) -> int:
+    accruals = []
+    for row in rows:
+        last = row.last_accrual_at or row.created_at or now
+        diff_days = _floor_days(now - last)
+        if diff_days <= 0:
+            continue
+        # Centavos direto das colunas float, sem Decimal por linha
+        juros = accrued_interest_cents(row.valor, row.taxa_rendimento, diff_days)
+        if juros <= 0:
+            continue
+        accruals.append((row, juros / 100, diff_days, last + timedelta(days=diff_days)))
+    if not accruals:
+        return 0
+
+    wallet_ids = resolve_wallet_ids(db, {row.user_id for row, *_ in accruals})
+    db.execute(
+        _bulk_investment_update,
+        [{"b_id": row.id, "b_juros": juros, "b_last_accrual_at": new_last} for row, juros, _, new_last in accruals],
+    )
+    db.execute(
+        insert(Transaction),
+        [
+            {
+                "wallet_id": wallet_ids[row.user_id],
+                "tipo": "rendimento_acumulado",
+                "valor": juros,
+                "descricao": f"Juros acumulados ({diff_days} dias) investimento {row.id}",
+                "related_investment_id": row.id,
+            }
+            for row, juros, diff_days, _ in accruals
+        ],
+    )
+    return len(accruals)
+
+
+def bulk_process_loans(
+    db: Session,
+    now: datetime | None = None,
+    batch_size: int = BULK_BATCH_SIZE,
+    start_after: int = 0,
+    on_chunk: Optional[ChunkCallback] = None,
+    user_range: Optional[UserRange] = None,
+) -> int:
+    """Versao em lote de ``process_loans`` (mesma estrategia dos investimentos)."""
+    now = now or _utc_now()
+    count = 0
+    stmt = select(
+        Loan.id,
+        Loan.user_id,
+        Loan.valor,
+        Loan.valor_pago,
+        Loan.taxa_juros,
+        Loan.interest_accrued,
+        Loan.last_accrual_at,
+        Loan.created_at,
+    ).where(Loan.status.in_(ACCRUING_LOAN_STATUSES))
+    if user_range is not None:
+        stmt = stmt.where(Loan.user_id.between(*user_range))
+
+    for rows in _keyset_batches(db, stmt, Loan.id, batch_size, start_after):
+        processed = _accrue_loan_rows(db, rows, now)
+        count += processed
+        if on_chunk is not None:
+            on_chunk(rows[-1].id, processed)
+    return count
+
+
+def _accrue_loan_rows(db: Session, rows, now: datetime) -> int:
+    accruals = []
+    settled = []
+    for row in rows:
+        last = row.last_accrual_at or row.created_at or now
+        diff_days = _floor_days(now - last)
+        if diff_days <= 0:
+            continue
+        # Mesmo calculo de Loan.valor_restante
+        valor_restante = row.valor * (1 + row.taxa_juros) - (row.valor_pago or 0.0) - (row.interest_accrued or 0.0)
+        if valor_restante <= 0:
+            settled.append({"b_id": row.id, "b_last_accrual_at": now})
+            continue
+        juros = accrued_interest_cents(valor_restante, row.taxa_juros, diff_days)
+        if juros <= 0:
+            continue
+        accruals.append((row, juros / 100, diff_days, last + timedelta(days=diff_days)))
+
+    if settled:
+        db.execute(_bulk_loan_touch, settled)
+    if not accruals:
+        return 0
+
+    wallet_ids = resolve_wallet_ids(db, {row.user_id for row, *_ in accruals})
+    db.execute(
+        _bulk_loan_update,
+        [{"b_id": row.id, "b_juros": juros, "b_last_accrual_at": new_last} for row, juros, _, new_last in accruals],
+    )
+    db.execute(
+        insert(Transaction),
+        [
+            {
+                "wallet_id": wallet_ids[row.user_id],
+                "tipo": "juros_acumulado",
+                "valor": juros,
+                "descricao": f"Juros acumulados ({diff_days} dias) emprestimo {row.id}",
+                "related_loan_id": row.id,
+            }
+            for row, juros, diff_days, _ in accruals
+        ],
+    )
+    return len(accruals)
+
+
+def _start_or_resume_run(db: Session, chunk_size: int, fresh: bool) -> AccrualRun:
+    pending = (
+        db.query(AccrualRun)
+        .filter(AccrualRun.status.in_(["em_andamento", "falhou"]))
+        .order_by(AccrualRun.id.desc())
+        .first()
+    )
+    if pending is not None and not fresh:
+        logger.info(
+            "Retomando accrual run %s na fase %s (investimento > %s, emprestimo > %s)",
+            pending.id,
+            pending.phase,
+            pending.last_investment_id,
+            pending.last_loan_id,
+        )
+        pending.status = "em_andamento"
+        pending.error = None
+        db.commit()
+        return pending
+    if pending is not None:
+        pending.status = "abandonado"
+
+    run = AccrualRun(reference_at=_utc_now(), chunk_size=chunk_size)
+    db.add(run)
+    db.commit()
+    return run
+
+
+def run_chunked_accrual(chunk_size: int = BULK_BATCH_SIZE, fresh: bool = False) -> AccrualRun:
+    """Executa o accrual em lote com commit e checkpoint a cada chunk.
+
+    Se a execucao anterior nao terminou, ela e retomada a partir do ultimo id
+    gravado, usando a mesma data de referencia. Linhas ja processadas tiveram
+    ``last_accrual_at`` avancado, entao reprocessar um chunk nao duplica juros.
+    """
+    db = SessionLocal()
+    run = _start_or_resume_run(db, chunk_size, fresh)
+    try:
+        def investment_checkpoint(last_id: int, processed: int) -> None:
+            run.last_investment_id = last_id
+            run.investments_processed += processed
+            db.commit()
+
+        def loan_checkpoint(last_id: int, processed: int) -> None:
+            run.last_loan_id = last_id
+            run.loans_processed += processed
+            db.commit()
+
+        if run.phase == "investimentos":
+            bulk_process_investments(
+                db,
+                now=run.reference_at,
+                batch_size=run.chunk_size,
+                start_after=run.last_investment_id,
+                on_chunk=investment_checkpoint,
+            )
+            run.phase = "emprestimos"
+            db.commit()
+
+        if run.phase == "emprestimos":
+            bulk_process_loans(
+                db,
+                now=run.reference_at,
+                batch_size=run.chunk_size,
+                start_after=run.last_loan_id,
+                on_chunk=loan_checkpoint,
+            )
+
+        run.phase = "concluido"
+        run.status = "concluido"
+        run.finished_at = _utc_now()
+        db.commit()
+        logger.info(
+            "Accrual job finished - run=%s, investments=%s, loans=%s",
+            run.id,
+            run.investments_processed,
+            run.loans_processed,
+        )
+        return run
+    except Exception as exc:  # pragma: no cover - logging defensivo
+        db.rollback()
+        run.status = "falhou"
+        run.error = str(exc)[:255]
+        db.commit()
+        logger.exception("Accrual job failed (run %s, retomavel): %s", run.id, exc)
+        raise
+    finally:
+        db.close()
+
+
+def plan_user_partitions(db: Session, workers: int) -> list[UserRange]:
+    """Divide os usuarios com posicoes ativas em ate ``workers`` faixas contiguas.
+
+    As faixas sao por ``user_id`` (cada usuario fica inteiro em uma particao,
+    entao duas particoes nunca disputam a mesma carteira) e balanceadas pela
+    quantidade de investimentos + emprestimos de cada usuario.
+    """
+    positions = union_all(
+        select(Investment.user_id.label("user_id")).where(Investment.status == "ativo"),
+        select(Loan.user_id.label("user_id")).where(Loan.status.in_(ACCRUING_LOAN_STATUSES)),
+    ).subquery()
+    per_user = db.execute(
+        select(positions.c.user_id, func.count())
+        .group_by(positions.c.user_id)
+        .order_by(positions.c.user_id)
+    ).all()
+    return split_user_counts(per_user, workers)
+
+
+def split_user_counts(per_user: list[tuple[int, int]], workers: int) -> list[UserRange]:
+    """Agrupa ``(user_id, posicoes)`` ordenados por user_id em ate ``workers``
+    faixas contiguas que cobrem todos os usuarios, com carga proxima da media."""
+    if not per_user:
+        return []
+
+    target = sum(count for _, count in per_user) / max(workers, 1)
+    partitions: list[UserRange] = []
+    start = None
+    load = 0
+    for user_id, count in per_user:
+        # A faixa comeca antes do teste de corte: um usuario que sozinho
+        # atinge a meta fecha a propria faixa em vez de gerar (None, user_id)
+        if start is None:
+            start = user_id
+        load += count
+        if load >= target and len(partitions) < workers - 1:
+            partitions.append((start, user_id))
+            start, load = None, 0
+    if start is not None:
+        partitions.append((start, per_user[-1][0]))
+    return partitions
+
+
+def _accrue_partition(database_url: str, user_range: UserRange, now: datetime, chunk_size: int) -> dict:
+    """Processa uma particao de usuarios em um processo separado.
+
+    Cada processo cria a propria engine/sessao; conexoes nao sao herdadas do
+    processo pai. Cada lote e comitado, como no modo serial.
+    """
+    connect_args = {"timeout": 60} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        investments = bulk_process_investments(
+            db, now=now, batch_size=chunk_size, user_range=user_range, on_chunk=lambda *_: db.commit()
+        )
+        loans = bulk_process_loans(
+            db, now=now, batch_size=chunk_size, user_range=user_range, on_chunk=lambda *_: db.commit()
+        )
+        db.commit()
+        return {"usuarios": user_range, "investimentos": investments, "emprestimos": loans}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def run_parallel_accrual(
+    workers: int,
+    chunk_size: int = BULK_BATCH_SIZE,
+    database_url: str = DATABASE_URL,
+    now: datetime | None = None,
+) -> list[dict]:
+    """Executa o accrual em lote em ``workers`` processos, um por faixa de usuarios.
+
+    Todas as particoes usam a mesma data de referencia, entao o resultado e o
+    mesmo da execucao serial. Uma particao que falha nao desfaz os lotes ja
+    comitados das outras; rodar o job de novo completa o que faltou, pois as
+    linhas processadas ja tiveram ``last_accrual_at`` avancado. So compensa
+    com Postgres: no SQLite as escritas sao serializadas pelo lock do arquivo.
+    """
+    now = now or _utc_now()
+    engine = create_engine(database_url)
+    try:
+        with Session(engine) as db:
+            partitions = plan_user_partitions(db, workers)
+    finally:
+        engine.dispose()
+    if not partitions:
+        logger.info("Accrual job finished - nenhuma posicao ativa")
+        return []
+
+    # spawn: cada worker comeca sem conexoes/estado herdados do processo pai
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(partitions), mp_context=context) as pool:
+        futures = [
+            pool.submit(_accrue_partition, database_url, user_range, now, chunk_size)
+            for user_range in partitions
+        ]
+        summaries = []
+        failures = []
+        for user_range, future in zip(partitions, futures):
+            try:
+                summaries.append(future.result())
+            except Exception as exc:
+                failures.append((user_range, exc))
+                logger.error("Accrual partition %s failed: %s", user_range, exc)
+
+    for summary in summaries:
+        logger.info(
+            "Accrual partition users %s-%s - investments=%s, loans=%s",
+            summary["usuarios"][0],
+            summary["usuarios"][1],
+            summary["investimentos"],
+            summary["emprestimos"],
+        )
+    logger.info(
+        "Accrual job finished - workers=%s, investments=%s, loans=%s",
+        len(partitions),
+        sum(summary["investimentos"] for summary in summaries),
+        sum(summary["emprestimos"] for summary in summaries),
+    )
+    if failures:
+        raise RuntimeError(f"{len(failures)} particao(oes) de accrual falharam: {failures[0][1]}")
+    return summaries
+
+
+def run_forecast(horizon_days: int) -> dict:
+    """Projeta os juros dos proximos ``horizon_days`` dias sem gravar nada."""
+    # Import tardio: numpy so e necessario no modo de previsao
+    from app.services.accrual_forecast import forecast_accruals, load_accrual_book
+
+    db = SessionLocal()
+    try:
+        book = load_accrual_book(db)
+    finally:
+        db.close()
+    forecast = forecast_accruals(book, _utc_now(), horizon_days)
+    logger.info(
+        "Accrual forecast - dias=%s, investments=%s, loans=%s, total=%.2f",
+        horizon_days,
+        forecast["investimentos"],
+        forecast["emprestimos"],
+        forecast["total"],
+    )
+    return forecast
+
+
+def run_accrual_job(
+    mode: str = "bulk",
+    chunk_size: int = BULK_BATCH_SIZE,
+    fresh: bool = False,
+    workers: int = 1,
+) -> None:
+    if mode == "bulk" and workers > 1:
+        run_parallel_accrual(workers, chunk_size=chunk_size)
+        return
+    if mode == "bulk":
+        run_chunked_accrual(chunk_size=chunk_size, fresh=fresh)
+        return
+
     db = SessionLocal()
     try:
         investments_processed = process_investments(db)
@@ -114,7 +577,8 @@ def run_accrual_job() -> None:
         else:
             db.rollback()
         logger.info(
-            "Accrual job finished - investments=%s, loans=%s",
+            "Accrual job finished - mode=%s, investments=%s, loans=%s",
+            mode,
             investments_processed,
             loans_processed,
         )
@@ -127,5 +591,31 @@ def run_accrual_job() -> None:
 
 
 if __name__ == "__main__":
-    run_accrual_job()
-
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--mode",
+        choices=["bulk", "orm"],
+        default="bulk",
+        help="bulk: UPDATE/INSERT em lote com checkpoint por chunk (padrao); orm: linha a linha",
+    )
+    parser.add_argument("--chunk-size", type=int, default=BULK_BATCH_SIZE, help="linhas por chunk/commit")
+    parser.add_argument("--fresh", action="store_true", help="abandona uma execucao pendente em vez de retoma-la")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processos paralelos no modo bulk, particionados por faixa de user_id (sem checkpoint)",
+    )
+    parser.add_argument(
+        "--forecast",
+        type=int,
+        metavar="DIAS",
+        help="apenas projeta os juros dos proximos DIAS dias (JSON na saida padrao), sem gravar",
+    )
+    args = parser.parse_args()
+    if args.forecast is not None:
+        if args.forecast <= 0:
+            parser.error("--forecast deve ser positivo")
+        print(json.dumps(run_forecast(args.forecast), default=str, indent=2))
+    else:
+        run_accrual_job(mode=args.mode, chunk_size=args.chunk_size, fresh=args.fresh, workers=args.workers)
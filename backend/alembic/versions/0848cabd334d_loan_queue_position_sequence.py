@@ -0,0 +1,41 @@
+"""loan_queue_position_sequence
+
+Revision ID: 0848cabd334d
+Revises: 835a1679d86c
+Create Date: 2026-10-17 11:40:05.502917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0848cabd334d'
+down_revision = '835a1679d86c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('sequence_counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute(
+        "INSERT INTO sequence_counters (name, value) "
+        "SELECT 'loan_queue_position', COALESCE(MAX(queue_position), 0) FROM loans"
+    )
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.CreateSequence(sa.Sequence('loan_queue_position_seq')))
+        op.execute(
+            "SELECT setval('loan_queue_position_seq', COALESCE(MAX(queue_position), 0) + 1, false) FROM loans"
+        )
+    op.create_index('ix_loans_status_queue_position', 'loans', ['status', 'queue_position'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_loans_status_queue_position', table_name='loans')
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.DropSequence(sa.Sequence('loan_queue_position_seq')))
+    op.drop_table('sequence_counters')
@@ -0,0 +1,46 @@
+"""create_pool_aggregates
+
+Revision ID: 835a1679d86c
+Revises: 63b99dfd8154
+Create Date: 2026-10-17 09:12:40.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '835a1679d86c'
+down_revision = '63b99dfd8154'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('pool_aggregates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('total_invested', sa.Float(), nullable=False),
+    sa.Column('total_committed', sa.Float(), nullable=False),
+    sa.Column('active_investors', sa.Integer(), nullable=False),
+    sa.Column('queued_loans', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_investments_user_status', 'investments', ['user_id', 'status'], unique=False)
+    # Semeia a linha unica com o estado atual das tabelas
+    op.execute(
+        """
+        INSERT INTO pool_aggregates (id, total_invested, total_committed, active_investors, queued_loans, updated_at)
+        SELECT 1,
+            (SELECT COALESCE(SUM(valor), 0) FROM investments WHERE status = 'ativo'),
+            (SELECT COALESCE(SUM(valor), 0) FROM loans WHERE status IN ('pendente', 'ativo')),
+            (SELECT COUNT(DISTINCT user_id) FROM investments WHERE status = 'ativo'),
+            (SELECT COUNT(id) FROM loans WHERE status = 'fila'),
+            CURRENT_TIMESTAMP
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_investments_user_status', table_name='investments')
+    op.drop_table('pool_aggregates')
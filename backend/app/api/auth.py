@@ -1,12 +1,17 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, status
+﻿from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app.models import User, Wallet
 from app.schemas import UserCreate, UserResponse
-from app.services.auth_service import AuthService, InvalidTokenError
+from app.services.auth_service import AuthService, InvalidTokenError, token_cache_metrics
+from app.services.password_hasher import PasswordHashPoolBusy, password_hash_pool
+from app.services.principal_cache import Principal, principal_cache
 
 router = APIRouter()
 
@@ -23,23 +28,68 @@ def _get_user_response(user: User) -> UserResponse:
     return UserResponse.model_validate(user)
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
+def _load_principal(db: Session, user_id: int) -> Optional[Principal]:
+    # So as colunas de autorizacao: a linha inteira traz profile_image_base64
+    row = db.execute(select(User.id, User.is_admin, User.is_active).where(User.id == user_id)).first()
+    if row is None:
+        return None
+    return Principal(id=row.id, is_admin=bool(row.is_admin), is_active=bool(row.is_active))
+
+
+def _hash_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Muitas autenticacoes em andamento, tente novamente",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def hash_password(password: str) -> str:
+    """Hash bcrypt no pool limitado, fora do event loop; 503 se a fila estiver cheia."""
+    try:
+        return await password_hash_pool.run(AuthService.hash_password, password)
+    except PasswordHashPoolBusy:
+        raise _hash_pool_busy()
+
+
+def _token_payload(token: str) -> dict:
     try:
         payload = AuthService.decode_access_token(token)
     except InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido")
-
-    user_id = payload.get("user_id")
-    if user_id is None:
+    if payload.get("user_id") is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido")
+    return payload
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+
+async def get_token_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """Principal so a partir das claims assinadas do token, sem sessao de banco.
+
+    Para rotas que so calculam (previews). Um usuario desativado continua
+    aceito ate o token expirar, a menos que este processo ja tenha o
+    principal dele em cache como inativo. E async para nao passar pelo
+    threadpool: depois do primeiro decode, tudo aqui e consulta em memoria.
+    """
+    payload = _token_payload(token)
+    user_id = payload["user_id"]
+    cached = principal_cache.peek(user_id)
+    if cached is not None and not cached.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario inativo")
+    return Principal(id=user_id, is_admin=bool(payload.get("is_admin", False)), is_active=True)
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """Principal do token; o banco so e consultado quando o cache expira ou e invalidado."""
+    user_id = _token_payload(token)["user_id"]
+    principal = principal_cache.get(user_id, lambda: _load_principal(db, user_id))
+    if principal is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario nao encontrado")
-    return user
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario inativo")
+    return principal
 
 
 @router.post("/login", response_model=LoginResponse)
@@ -49,11 +99,14 @@ async def login(
 ):
     """Autentica usuario real a partir da tabela users usando OAuth2 password flow."""
     email = form_data.username
-    user = AuthService.authenticate(db, email, form_data.password)
+    try:
+        user = await AuthService.authenticate(db, email, form_data.password)
+    except PasswordHashPoolBusy:
+        raise _hash_pool_busy()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email ou senha incorretos")
 
-    token = AuthService.create_access_token(subject=user.email, user_id=user.id)
+    token = AuthService.create_access_token(subject=user.email, user_id=user.id, is_admin=user.is_admin)
     return LoginResponse(token=token, user_id=user.id, email=user.email)
 
 
@@ -68,7 +121,7 @@ async def register(payload: UserCreate, db: Session = Depends(get_db)) -> UserRe
     if existing_cpf:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="CPF ja cadastrado")
 
-    hashed_password = AuthService.hash_password(payload.password)
+    hashed_password = await hash_password(payload.password)
 
     user = User(
         email=payload.email,
@@ -94,6 +147,28 @@ async def register(payload: UserCreate, db: Session = Depends(get_db)) -> UserRe
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
-    return _get_user_response(current_user)
+async def get_me(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario nao encontrado")
+    return _get_user_response(user)
+
+
+@router.get("/cache/metrics")
+async def get_auth_cache_metrics(current_user: Principal = Depends(get_current_user)) -> dict:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem ver metricas de autenticacao")
+    return {
+        "principal": principal_cache.metrics(),
+        "token": token_cache_metrics(),
+    }
+
 
+@router.get("/hash/metrics")
+async def get_password_hash_metrics(current_user: Principal = Depends(get_current_user)) -> dict:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem ver metricas de hash de senha")
+    return password_hash_pool.metrics()
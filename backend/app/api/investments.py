@@ -5,19 +5,30 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, get_token_principal
 from app.db import get_db
 from app.models import Investment, Transaction, User, Wallet
 from app.schemas import (
     InvestmentCreate,
+    InvestmentPreviewBatchRequest,
+    InvestmentPreviewBatchResponse,
     InvestmentPreviewRequest,
     InvestmentPreviewResponse,
     InvestmentResponse,
     InvestmentUpdate,
 )
+from app.services.finance_batch import MAX_BATCH_SCENARIOS, investment_preview_batch
 from app.services.finance_service import calculate_investment_preview
-from app.services.pool_service import process_loan_queue
+from app.services.pool_cache import pool_snapshot_cache
+from app.services.pool_service import (
+    item_state,
+    record_investment_change,
+)
+from app.services.principal_cache import Principal
+from app.services.queue_worker import loan_queue_worker
+from app.services.schedule_cache import investment_schedule_cache
 
 router = APIRouter(prefix="/investments", tags=["investments"])
 
@@ -32,17 +43,30 @@ def _get_investment_or_404(db: Session, investment_id: int) -> Investment:
 @router.post("/preview", response_model=InvestmentPreviewResponse)
 async def preview_investment(
     payload: InvestmentPreviewRequest,
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_token_principal),
 ) -> InvestmentPreviewResponse:
     return calculate_investment_preview(payload)
 
 
+@router.post("/preview/batch", response_model=InvestmentPreviewBatchResponse)
+async def preview_investment_batch(
+    payload: InvestmentPreviewBatchRequest,
+    _: Principal = Depends(get_token_principal),
+) -> dict:
+    if len(payload.cenarios) > MAX_BATCH_SCENARIOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximo de {MAX_BATCH_SCENARIOS} cenarios por lote",
+        )
+    return await run_in_threadpool(investment_preview_batch, payload.cenarios)
+
+
 @router.get("/{investment_id}/schedule", response_model=InvestmentPreviewResponse)
 async def get_investment_schedule(
     investment_id: int,
     dias: int = 30,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> InvestmentPreviewResponse:
     if dias <= 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Dias deve ser maior que zero")
@@ -53,7 +77,9 @@ async def get_investment_schedule(
         dias=dias,
         tipo="composto" if investment.status == "ativo" else "simples",
     )
-    return calculate_investment_preview(req)
+    # Os termos estao na chave: alterar o investimento gera outra entrada
+    key = (investment.valor, investment.taxa_rendimento, dias, req.tipo)
+    return investment_schedule_cache.get_or_compute(key, lambda: calculate_investment_preview(req))
 
 
 @router.get("", response_model=List[InvestmentResponse])
@@ -62,7 +88,7 @@ async def list_investments(
     limit: int = 100,
     user_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> List[Investment]:
     query = db.query(Investment)
     if user_id is not None:
@@ -74,7 +100,7 @@ async def list_investments(
 async def get_investment(
     investment_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Investment:
     return _get_investment_or_404(db, investment_id)
 
@@ -83,7 +109,7 @@ async def get_investment(
 async def create_investment(
     payload: InvestmentCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Investment:
     user = db.query(User).filter(User.id == payload.user_id).first()
     if not user:
@@ -108,6 +134,7 @@ async def create_investment(
 
     db.add(investment)
     db.flush()
+    record_investment_change(db, investment, item_state(None), item_state(investment))
 
     transaction = Transaction(
         wallet_id=wallet.id,
@@ -120,7 +147,8 @@ async def create_investment(
 
     db.commit()
     db.refresh(investment)
-    process_loan_queue(db)
+    loan_queue_worker.signal()
+    pool_snapshot_cache.invalidate()
     return investment
 
 
@@ -129,15 +157,18 @@ async def update_investment(
     investment_id: int,
     payload: InvestmentUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Investment:
     investment = _get_investment_or_404(db, investment_id)
+    before = item_state(investment)
     update_data = payload.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(investment, key, value)
     db.add(investment)
+    record_investment_change(db, investment, before, item_state(investment))
     db.commit()
     db.refresh(investment)
+    pool_snapshot_cache.invalidate()
     return investment
 
 
@@ -145,7 +176,7 @@ async def update_investment(
 async def redeem_investment(
     investment_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Investment:
     investment = _get_investment_or_404(db, investment_id)
     if investment.status == "resgatado":
@@ -158,6 +189,7 @@ async def redeem_investment(
     total_resgate = investment.valor + (investment.rendimento_acumulado or 0)
     wallet.saldo += total_resgate
 
+    before = item_state(investment)
     investment.status = "resgatado"
     investment.resgatado_at = datetime.utcnow()
 
@@ -170,9 +202,11 @@ async def redeem_investment(
     )
     db.add(transaction)
     db.add(investment)
+    record_investment_change(db, investment, before, item_state(investment))
     db.commit()
     db.refresh(investment)
-    process_loan_queue(db)
+    loan_queue_worker.signal()
+    pool_snapshot_cache.invalidate()
     return investment
 
 
@@ -180,7 +214,7 @@ async def redeem_investment(
 async def delete_investment(
     investment_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Response:
     investment = _get_investment_or_404(db, investment_id)
     if investment.status == "resgatado":
@@ -201,8 +235,11 @@ async def delete_investment(
     )
     db.add(transaction)
     db.add(wallet)
+    before = item_state(investment)
     db.delete(investment)
+    record_investment_change(db, investment, before, item_state(None))
     db.commit()
-    process_loan_queue(db)
+    loan_queue_worker.signal()
+    pool_snapshot_cache.invalidate()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -1,38 +1,64 @@
 ﻿"""Loan API routes."""
 from datetime import datetime, date
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import func
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, get_token_principal
 from app.db import get_db
-from app.models import Investment, Loan, Transaction, User, Wallet
+from app.models import Loan, Transaction, User
 from app.schemas import (
     LoanApproval,
+    LoanCetRecomputeResponse,
     LoanCreate,
+    LoanInstallment,
     LoanPayment,
+    LoanPreviewBatchRequest,
+    LoanPreviewBatchResponse,
+    LoanPreviewGridRequest,
+    LoanPreviewGridResponse,
     LoanPreviewRequest,
     LoanPreviewResponse,
     LoanResponse,
     LoanRejection,
     LoanUpdate,
 )
-from app.services.finance_service import calculate_loan_preview
+from app.services.cet import loan_cet, recompute_loan_cet
+from app.services.finance_batch import (
+    MAX_BATCH_PRAZO_MESES,
+    MAX_BATCH_SCENARIOS,
+    MAX_GRID_PRAZOS,
+    MAX_GRID_TAXAS,
+    loan_preview_batch,
+    loan_preview_grid,
+)
+from app.services.finance_service import (
+    calculate_loan_installment,
+    calculate_loan_preview,
+    iter_loan_preview_ndjson,
+)
+from app.services.pool_cache import pool_snapshot_cache
 from app.services.pool_service import (
+    COMMITTED_STATUSES,
+    POOL_THRESHOLD,
+    get_pool_totals,
+    item_state,
     next_queue_position,
-    process_loan_queue,
+    record_loan_change,
     should_enqueue,
 )
+from app.services.principal_cache import Principal
+from app.services.queue_worker import loan_queue_worker
+from app.services.schedule_cache import loan_schedule_cache
+from app.services.wallet_service import get_or_create_wallet
 
 router = APIRouter(prefix="/loans", tags=["loans"])
 
 
-APPROVAL_STATUSES = {"pendente", "ativo"}
-
-
 def _get_loan_or_404(db: Session, loan_id: int) -> Loan:
     loan = db.query(Loan).filter(Loan.id == loan_id).first()
     if not loan:
@@ -40,40 +66,110 @@ def _get_loan_or_404(db: Session, loan_id: int) -> Loan:
     return loan
 
 
-def _ensure_wallet_for_user(db: Session, user_id: int) -> Wallet:
-    wallet = db.query(Wallet).filter(Wallet.user_id == user_id).first()
-    if wallet:
-        return wallet
-    wallet = Wallet(user_id=user_id, saldo=0.0)
-    db.add(wallet)
-    db.flush()
-    return wallet
+def _schedule_terms(loan: Loan) -> tuple:
+    # Chave do cronograma sem a primeira parcela, que vem da rota
+    return (loan.valor, loan.taxa_juros, loan.prazo_meses, "price")
+
+
+def _schedule_request(loan: Loan, primeira_parcela: Optional[date]) -> LoanPreviewRequest:
+    return LoanPreviewRequest(
+        valor=Decimal(str(loan.valor)),
+        taxa_juros=Decimal(str(loan.taxa_juros)),
+        prazo_meses=loan.prazo_meses,
+        sistema="price",
+        primeira_parcela=primeira_parcela or (loan.created_at.date() if loan.created_at else date.today()),
+    )
+
+
+def _invalidate_schedule(loan: Loan, terms: tuple) -> None:
+    """Descarta os cronogramas dos termos antigos se o emprestimo mudou de termos."""
+    if _schedule_terms(loan) != terms:
+        loan_schedule_cache.invalidate_where(lambda key: key[:-1] == terms)
 
 
 @router.post("/preview", response_model=LoanPreviewResponse)
 async def preview_loan(
     payload: LoanPreviewRequest,
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_token_principal),
 ) -> LoanPreviewResponse:
     return calculate_loan_preview(payload)
 
 
+@router.post("/preview/batch", response_model=LoanPreviewBatchResponse)
+async def preview_loan_batch(
+    payload: LoanPreviewBatchRequest,
+    _: Principal = Depends(get_token_principal),
+) -> dict:
+    if len(payload.cenarios) > MAX_BATCH_SCENARIOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximo de {MAX_BATCH_SCENARIOS} cenarios por lote",
+        )
+    if any(cenario.prazo_meses > MAX_BATCH_PRAZO_MESES for cenario in payload.cenarios):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Prazo maximo de {MAX_BATCH_PRAZO_MESES} meses por cenario",
+        )
+    return await run_in_threadpool(loan_preview_batch, payload.cenarios, payload.incluir_parcelas)
+
+
+@router.post("/preview/grid", response_model=LoanPreviewGridResponse)
+async def preview_loan_grid(
+    payload: LoanPreviewGridRequest,
+    _: Principal = Depends(get_token_principal),
+) -> dict:
+    if len(payload.taxas_juros) > MAX_GRID_TAXAS or len(payload.prazos_meses) > MAX_GRID_PRAZOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximo de {MAX_GRID_TAXAS} taxas e {MAX_GRID_PRAZOS} prazos por grade",
+        )
+    return loan_preview_grid(payload.valor, payload.taxas_juros, payload.prazos_meses, payload.sistema)
+
+
+@router.post("/cet/recompute", response_model=LoanCetRecomputeResponse)
+async def recompute_cet(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+) -> dict:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem recalcular o CET")
+    return await run_in_threadpool(recompute_loan_cet, db)
+
+
 @router.get("/{loan_id}/schedule", response_model=LoanPreviewResponse)
 async def get_loan_schedule(
     loan_id: int,
     primeira_parcela: Optional[date] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    formato: Literal["json", "ndjson"] = "json",
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
-) -> LoanPreviewResponse:
+    _: Principal = Depends(get_current_user),
+):
+    if offset < 0 or (limit is not None and limit <= 0):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Offset deve ser >= 0 e limit maior que zero")
     loan = _get_loan_or_404(db, loan_id)
-    req = LoanPreviewRequest(
-        valor=Decimal(str(loan.valor)),
-        taxa_juros=Decimal(str(loan.taxa_juros)),
-        prazo_meses=loan.prazo_meses,
-        sistema="price",
-        primeira_parcela=primeira_parcela or (loan.created_at.date() if loan.created_at else date.today()),
-    )
-    return calculate_loan_preview(req)
+    req = _schedule_request(loan, primeira_parcela)
+    if formato == "ndjson":
+        return StreamingResponse(iter_loan_preview_ndjson(req, offset, limit), media_type="application/x-ndjson")
+    if offset or limit is not None:
+        return calculate_loan_preview(req, offset, limit)
+    key = _schedule_terms(loan) + (req.primeira_parcela,)
+    return loan_schedule_cache.get_or_compute(key, lambda: calculate_loan_preview(req))
+
+
+@router.get("/{loan_id}/installments/{numero}", response_model=LoanInstallment)
+async def get_loan_installment(
+    loan_id: int,
+    numero: int,
+    primeira_parcela: Optional[date] = None,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+) -> LoanInstallment:
+    loan = _get_loan_or_404(db, loan_id)
+    if not 1 <= numero <= loan.prazo_meses:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Parcela nao encontrada")
+    return calculate_loan_installment(_schedule_request(loan, primeira_parcela), numero)
 
 
 @router.get("", response_model=List[LoanResponse])
@@ -83,7 +179,7 @@ async def list_loans(
     status_filter: Optional[str] = None,
     user_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> List[Loan]:
     query = db.query(Loan)
     if status_filter:
@@ -97,7 +193,7 @@ async def list_loans(
 async def get_loan(
     loan_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Loan:
     return _get_loan_or_404(db, loan_id)
 
@@ -106,7 +202,7 @@ async def get_loan(
 async def create_loan(
     payload: LoanCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Loan:
     if current_user.id != payload.user_id and not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Sem permissao para solicitar emprestimo para outro usuario")
@@ -123,14 +219,17 @@ async def create_loan(
         prazo_meses=payload.prazo_meses,
         status="pendente",
     )
+    loan.cet = loan_cet(loan.valor, loan.taxa_juros, loan.prazo_meses)
 
     if should_enqueue(db, payload.valor):
         loan.status = "fila"
         loan.queue_position = next_queue_position(db)
 
     db.add(loan)
+    record_loan_change(db, item_state(None), item_state(loan))
     db.commit()
     db.refresh(loan)
+    pool_snapshot_cache.invalidate()
     return loan
 
 
@@ -139,18 +238,25 @@ async def update_loan(
     loan_id: int,
     payload: LoanUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Loan:
     loan = _get_loan_or_404(db, loan_id)
     if loan.user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Sem permissao para alterar este emprestimo")
 
+    before = item_state(loan)
+    terms = _schedule_terms(loan)
     update_data = payload.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(loan, key, value)
+    if _schedule_terms(loan) != terms:
+        loan.cet = loan_cet(loan.valor, loan.taxa_juros, loan.prazo_meses)
     db.add(loan)
+    record_loan_change(db, before, item_state(loan))
     db.commit()
     db.refresh(loan)
+    _invalidate_schedule(loan, terms)
+    pool_snapshot_cache.invalidate()
     return loan
 
 
@@ -159,7 +265,7 @@ async def approve_loan(
     loan_id: int,
     payload: LoanApproval,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Loan:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem aprovar emprestimos")
@@ -170,37 +276,34 @@ async def approve_loan(
     if loan.status not in {"pendente", "reavaliacao"}:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Emprestimo nao esta pendente")
 
-    pool_total = (
-        db.query(func.coalesce(func.sum(Investment.valor), 0))
-        .filter(Investment.status == "ativo")
-        .scalar()
-    ) or 0
-
-    emprestado_total = (
-        db.query(func.coalesce(func.sum(Loan.valor), 0))
-        .filter(Loan.id != loan.id)
-        .filter(Loan.status.in_(APPROVAL_STATUSES))
-        .scalar()
-    ) or 0
+    pool_total, emprestado_total = get_pool_totals(db)
+    if loan.status in COMMITTED_STATUSES:
+        emprestado_total -= loan.valor
 
-    if pool_total <= 0 or emprestado_total + loan.valor > pool_total * 0.8:
+    before = item_state(loan)
+    if pool_total <= 0 or emprestado_total + loan.valor > pool_total * POOL_THRESHOLD:
         loan.status = "fila"
         loan.queue_position = loan.queue_position or next_queue_position(db)
         db.add(loan)
+        record_loan_change(db, before, item_state(loan))
         db.commit()
         db.refresh(loan)
+        pool_snapshot_cache.invalidate()
         return loan
 
+    terms = _schedule_terms(loan)
     if payload.taxa_juros is not None:
         loan.taxa_juros = payload.taxa_juros
     if payload.prazo_meses is not None:
         loan.prazo_meses = payload.prazo_meses
 
+    if _schedule_terms(loan) != terms or loan.cet is None:
+        loan.cet = loan_cet(loan.valor, loan.taxa_juros, loan.prazo_meses)
     loan.status = "ativo"
     loan.approved_at = datetime.utcnow()
     loan.queue_position = None
 
-    wallet = _ensure_wallet_for_user(db, loan.user_id)
+    wallet = get_or_create_wallet(db, loan.user_id)
     wallet.saldo += loan.valor
 
     transaction = Transaction(
@@ -213,8 +316,11 @@ async def approve_loan(
     db.add(transaction)
     db.add(loan)
     db.add(wallet)
+    record_loan_change(db, before, item_state(loan))
     db.commit()
     db.refresh(loan)
+    _invalidate_schedule(loan, terms)
+    pool_snapshot_cache.invalidate()
     return loan
 
 
@@ -223,7 +329,7 @@ async def reject_loan(
     loan_id: int,
     payload: LoanRejection,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Loan:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem rejeitar emprestimos")
@@ -232,13 +338,16 @@ async def reject_loan(
     if loan.status not in {"pendente", "fila"}:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Apenas emprestimos pendentes ou na fila podem ser rejeitados")
 
+    before = item_state(loan)
     loan.status = "rejeitado"
     loan.motivo_rejeicao = payload.motivo_rejeicao
     loan.queue_position = None
     db.add(loan)
+    record_loan_change(db, before, item_state(loan))
     db.commit()
     db.refresh(loan)
-    process_loan_queue(db)
+    loan_queue_worker.signal()
+    pool_snapshot_cache.invalidate()
     return loan
 
 
@@ -247,7 +356,7 @@ async def pay_loan(
     loan_id: int,
     payload: LoanPayment,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Loan:
     loan = _get_loan_or_404(db, loan_id)
     if loan.user_id != current_user.id and not current_user.is_admin:
@@ -255,7 +364,8 @@ async def pay_loan(
     if loan.status not in {"ativo", "pendente"}:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Emprestimo nao esta ativo")
 
-    wallet = _ensure_wallet_for_user(db, loan.user_id)
+    wallet = get_or_create_wallet(db, loan.user_id)
+    before = item_state(loan)
 
     if wallet.saldo < payload.valor_pagamento:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Saldo insuficiente na carteira")
@@ -289,10 +399,12 @@ async def pay_loan(
     db.add(transaction)
     db.add(wallet)
     db.add(loan)
+    record_loan_change(db, before, item_state(loan))
     db.commit()
     db.refresh(loan)
 
-    process_loan_queue(db)
+    loan_queue_worker.signal()
+    pool_snapshot_cache.invalidate()
     return loan
 
 
@@ -300,7 +412,7 @@ async def pay_loan(
 async def delete_loan(
     loan_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Response:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem remover emprestimos")
@@ -309,8 +421,11 @@ async def delete_loan(
     if loan.status not in {"pendente", "rejeitado", "fila"}:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="So e possivel excluir emprestimos pendentes, em fila ou rejeitados")
 
+    before = item_state(loan)
     db.delete(loan)
+    record_loan_change(db, before, item_state(None))
     db.commit()
-    process_loan_queue(db)
+    loan_queue_worker.signal()
+    pool_snapshot_cache.invalidate()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
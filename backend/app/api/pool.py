@@ -1,17 +1,25 @@
 ﻿"""Pool dashboard API."""
-from fastapi import APIRouter, Depends
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.api.auth import get_current_user
-from app.db import get_db
-from app.services.pool_service import (
-    POOL_THRESHOLD,
-    active_investors_count,
-    get_pool_totals,
-    queued_loans_count,
-)
-from app.models import User
+from app.db import SessionLocal, get_db
+from app.services.accrual_forecast import MAX_FORECAST_DAYS, forecast_accruals, load_accrual_book
+from app.services.cashflow_projection import MAX_CASHFLOW_MONTHS, load_loan_book, project_cashflow
+from app.services.finance_service import _rate_annual_to_daily, _rate_annual_to_monthly
+from app.services.pool_cache import pool_snapshot_cache
+from app.services.pool_history import MAX_HISTORY_BUCKETS, downsample_pool_history
+from app.services.pool_service import POOL_THRESHOLD, get_pool_aggregate
+from app.services.pool_stream import PoolStatusBroadcaster
+from app.services.principal_cache import Principal
+from app.services.queue_worker import loan_queue_worker
+from app.services.schedule_cache import investment_schedule_cache, loan_schedule_cache, lru_cache_metrics
 
 router = APIRouter(prefix="/pool", tags=["pool"])
 
@@ -26,12 +34,65 @@ class PoolResponse(BaseModel):
     limite_utilizacao: float
 
 
-@router.get("", response_model=PoolResponse)
-async def get_pool_status(
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
-) -> PoolResponse:
-    total_investido, total_comprometido = get_pool_totals(db)
+class PoolHistoryBucket(BaseModel):
+    inicio: datetime
+    amostras: int
+    utilizacao_min: float
+    utilizacao_max: float
+    utilizacao_media: float
+    saldo_total_medio: float
+    saldo_emprestado_medio: float
+    fila_max: int
+
+
+class AccrualForecastDay(BaseModel):
+    data: datetime
+    juros_investimentos: float
+    juros_emprestimos: float
+    total: float
+    acumulado: float
+
+
+class AccrualForecastResponse(BaseModel):
+    referencia: datetime
+    dias: int
+    investimentos: int
+    emprestimos: int
+    total_investimentos: float
+    total_emprestimos: float
+    total: float
+    serie: List[AccrualForecastDay]
+
+
+class CashflowMonth(BaseModel):
+    mes: date
+    parcelas: int
+    principal: float
+    juros: float
+    total: float
+
+
+class CashflowResponse(BaseModel):
+    referencia: date
+    meses: int
+    emprestimos: int
+    em_atraso: float
+    total_principal: float
+    total_juros: float
+    total: float
+    serie: List[CashflowMonth]
+
+
+def _as_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _build_pool_response(db: Session) -> PoolResponse:
+    aggregate = get_pool_aggregate(db)
+    total_investido = float(aggregate.total_invested)
+    total_comprometido = float(aggregate.total_committed)
     saldo_disponivel = max(total_investido - total_comprometido, 0.0)
     percentual_utilizacao = 0.0
     if total_investido:
@@ -42,7 +103,118 @@ async def get_pool_status(
         saldo_disponivel=saldo_disponivel,
         saldo_emprestado=total_comprometido,
         percentual_utilizacao=percentual_utilizacao,
-        total_investidores=active_investors_count(db),
-        emprestimos_em_fila=queued_loans_count(db),
+        total_investidores=int(aggregate.active_investors),
+        emprestimos_em_fila=int(aggregate.queued_loans),
         limite_utilizacao=POOL_THRESHOLD * 100,
     )
+
+
+def _load_pool_response() -> PoolResponse:
+    db = SessionLocal()
+    try:
+        return _build_pool_response(db)
+    finally:
+        db.close()
+
+
+async def _load_pool_status() -> dict:
+    status_atual = await pool_snapshot_cache.get(_load_pool_response)
+    return status_atual.model_dump()
+
+
+pool_status_broadcaster = PoolStatusBroadcaster(_load_pool_status)
+pool_snapshot_cache.add_invalidation_listener(pool_status_broadcaster.notify)
+
+
+@router.get("", response_model=PoolResponse)
+async def get_pool_status(_: Principal = Depends(get_current_user)) -> PoolResponse:
+    # A carga e compartilhada e blindada contra cancelamento: usa sessao propria,
+    # nao a da requisicao que a iniciou (fechada pelo get_db se ela cair antes)
+    return await pool_snapshot_cache.get(_load_pool_response)
+
+
+@router.get("/queue/metrics")
+async def get_queue_worker_metrics(current_user: Principal = Depends(get_current_user)) -> dict:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem ver metricas da fila")
+    return loan_queue_worker.metrics()
+
+
+@router.get("/cache/metrics")
+async def get_finance_cache_metrics(current_user: Principal = Depends(get_current_user)) -> dict:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem ver metricas de cache")
+    return {
+        "taxa_mensal": lru_cache_metrics(_rate_annual_to_monthly),
+        "taxa_diaria": lru_cache_metrics(_rate_annual_to_daily),
+        "cronograma_emprestimo": loan_schedule_cache.metrics(),
+        "cronograma_investimento": investment_schedule_cache.metrics(),
+    }
+
+
+@router.get("/history", response_model=List[PoolHistoryBucket])
+async def get_pool_history(
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    buckets: int = 200,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+) -> List[dict]:
+    fim = _as_naive_utc(fim) if fim else datetime.utcnow()
+    inicio = _as_naive_utc(inicio) if inicio else fim - timedelta(days=1)
+    if inicio >= fim:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inicio deve ser anterior ao fim")
+    if buckets <= 0 or buckets > MAX_HISTORY_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Buckets deve estar entre 1 e {MAX_HISTORY_BUCKETS}",
+        )
+    return downsample_pool_history(db, inicio, fim, buckets)
+
+
+@router.get("/accrual-forecast", response_model=AccrualForecastResponse)
+async def get_accrual_forecast(
+    dias: int = 30,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+) -> dict:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem ver a previsao de juros")
+    if dias <= 0 or dias > MAX_FORECAST_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Dias deve estar entre 1 e {MAX_FORECAST_DAYS}",
+        )
+    book = await run_in_threadpool(load_accrual_book, db)
+    return await run_in_threadpool(forecast_accruals, book, datetime.utcnow(), dias)
+
+
+@router.get("/cashflow", response_model=CashflowResponse)
+async def get_cashflow(
+    months: int = 12,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+) -> dict:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem ver o fluxo de caixa")
+    if months <= 0 or months > MAX_CASHFLOW_MONTHS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Meses deve estar entre 1 e {MAX_CASHFLOW_MONTHS}",
+        )
+    book = await run_in_threadpool(load_loan_book, db)
+    return await run_in_threadpool(project_cashflow, book, date.today(), months)
+
+
+@router.get("/stream")
+async def stream_pool_status(
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+) -> StreamingResponse:
+    # Libera a conexao usada na autenticacao; o stream pode durar horas
+    db.close()
+    return StreamingResponse(
+        pool_status_broadcaster.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -6,8 +6,10 @@ from sqlalchemy.orm import Session
 
 from app.api.auth import get_current_user
 from app.db import get_db
-from app.models import Transaction, User, Wallet
+from app.models import Transaction, Wallet
 from app.schemas import TransactionCreate, TransactionResponse, TransactionUpdate
+from app.services.principal_cache import Principal
+from app.services.transaction_compaction import get_archived_details, is_compaction_summary
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
@@ -39,7 +41,7 @@ async def list_transactions(
     wallet_id: Optional[int] = None,
     tipo: Optional[str] = None,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> List[Transaction]:
     query = db.query(Transaction)
     if wallet_id is not None:
@@ -53,16 +55,27 @@ async def list_transactions(
 async def get_transaction(
     transaction_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Transaction:
     return _get_transaction_or_404(db, transaction_id)
 
 
+@router.get("/{transaction_id}/archive", response_model=List[TransactionResponse])
+async def list_archived_details(
+    transaction_id: int,
+    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_user),
+) -> list:
+    """Lancamentos originais consolidados em uma linha de resumo mensal de accrual."""
+    _get_transaction_or_404(db, transaction_id)
+    return get_archived_details(db, transaction_id)
+
+
 @router.post("", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
 async def create_transaction(
     payload: TransactionCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Transaction:
     wallet = db.query(Wallet).filter(Wallet.id == payload.wallet_id).first()
     if not wallet:
@@ -96,7 +109,7 @@ async def update_transaction(
     transaction_id: int,
     payload: TransactionUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Transaction:
     transaction = _get_transaction_or_404(db, transaction_id)
 
@@ -117,10 +130,16 @@ async def update_transaction(
 async def delete_transaction(
     transaction_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Response:
     transaction = _get_transaction_or_404(db, transaction_id)
 
+    if is_compaction_summary(db, transaction_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Resumo mensal de juros nao pode ser removido: os lancamentos arquivados dependem dele",
+        )
+
     if transaction.related_investment_id or transaction.related_loan_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
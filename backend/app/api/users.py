@@ -4,7 +4,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, hash_password
 from app.db import get_db
 from app.models import Investment, Loan, User, Wallet
 from app.schemas import (
@@ -13,7 +13,8 @@ from app.schemas import (
     UserStatusUpdate,
     UserUpdate,
 )
-from app.services.auth_service import AuthService
+from app.services.principal_cache import Principal, principal_cache
+from app.services.transaction_compaction import delete_wallet_archive
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -31,7 +32,7 @@ async def list_users(
     limit: int = 100,
     is_active: Optional[bool] = None,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> List[User]:
     query = db.query(User)
     if is_active is not None:
@@ -43,7 +44,7 @@ async def list_users(
 async def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> User:
     return _get_user_or_404(db, user_id)
 
@@ -52,7 +53,7 @@ async def get_user(
 async def create_user(
     payload: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> User:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem criar usuarios")
@@ -65,7 +66,7 @@ async def create_user(
     if existing_cpf:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="CPF ja cadastrado")
 
-    hashed_password = AuthService.hash_password(payload.password)
+    hashed_password = await hash_password(payload.password)
 
     user = User(
         email=payload.email,
@@ -95,7 +96,7 @@ async def update_user(
     user_id: int,
     payload: UserUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> User:
     user = _get_user_or_404(db, user_id)
 
@@ -116,6 +117,7 @@ async def update_user(
     db.add(user)
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user_id)
     return user
 
 
@@ -124,7 +126,7 @@ async def toggle_user_status(
     user_id: int,
     payload: UserStatusUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> User:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem alterar status")
@@ -134,6 +136,7 @@ async def toggle_user_status(
     db.add(user)
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(user_id)
     return user
 
 
@@ -141,7 +144,7 @@ async def toggle_user_status(
 async def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Response:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem remover usuarios")
@@ -170,7 +173,11 @@ async def delete_user(
             detail="Usuario possui emprestimos ativos ou pendentes",
         )
 
+    if user.wallet is not None:
+        # A cascata do ORM remove as transacoes da carteira, inclusive resumos referenciados pelo arquivo
+        delete_wallet_archive(db, user.wallet.id)
     db.delete(user)
     db.commit()
+    principal_cache.invalidate(user_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -8,6 +8,7 @@ from app.api.auth import get_current_user
 from app.db import get_db
 from app.models import Transaction, User, Wallet
 from app.schemas import TransactionResponse, WalletCreate, WalletResponse, WalletUpdate
+from app.services.principal_cache import Principal
 
 router = APIRouter(prefix="/wallets", tags=["wallets"])
 
@@ -25,7 +26,7 @@ async def list_wallets(
     limit: int = 100,
     user_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> List[Wallet]:
     query = db.query(Wallet)
     if user_id is not None:
@@ -37,7 +38,7 @@ async def list_wallets(
 async def get_wallet(
     wallet_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Wallet:
     return _get_wallet_or_404(db, wallet_id)
 
@@ -46,7 +47,7 @@ async def get_wallet(
 async def get_wallet_by_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Wallet:
     wallet = db.query(Wallet).filter(Wallet.user_id == user_id).first()
     if not wallet:
@@ -58,7 +59,7 @@ async def get_wallet_by_user(
 async def create_wallet(
     payload: WalletCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Wallet:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem criar carteiras")
@@ -83,7 +84,7 @@ async def update_wallet(
     wallet_id: int,
     payload: WalletUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> Wallet:
     wallet = _get_wallet_or_404(db, wallet_id)
     update_data = payload.model_dump(exclude_unset=True)
@@ -112,7 +113,7 @@ async def update_wallet(
 async def list_wallet_transactions(
     wallet_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    _: Principal = Depends(get_current_user),
 ) -> List[Transaction]:
     _ = _get_wallet_or_404(db, wallet_id)
     return (
@@ -127,7 +128,7 @@ async def list_wallet_transactions(
 async def delete_wallet(
     wallet_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Response:
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Apenas administradores podem remover carteiras")
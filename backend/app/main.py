@@ -3,6 +3,9 @@ from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import auth, investments, loans, pool, transactions, users, wallets, kyc
+from app.services.password_hasher import password_hash_pool
+from app.services.pool_history import pool_history_recorder
+from app.services.queue_worker import loan_queue_worker
 
 # Carregar variáveis de ambiente do arquivo .env se existir
 env_file = Path(__file__).parent.parent / ".env"
@@ -43,6 +46,19 @@ app.include_router(transactions.router)
 app.include_router(kyc.router)
 
 
+@app.on_event("startup")
+async def start_background_workers():
+    loan_queue_worker.start()
+    pool_history_recorder.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await loan_queue_worker.stop()
+    await pool_history_recorder.stop()
+    password_hash_pool.shutdown()
+
+
 @app.get("/")
 def read_root():
     return {
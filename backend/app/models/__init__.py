@@ -9,6 +9,11 @@ from app.models.transaction import Transaction
 from app.models.investment import Investment
 from app.models.loan import Loan
 from app.models.kyc_document import KycDocument
+from app.models.accrual_run import AccrualRun
+from app.models.archived_transaction import ArchivedTransaction
+from app.models.pool_aggregate import PoolAggregate
+from app.models.pool_snapshot import PoolSnapshot
+from app.models.sequence_counter import SequenceCounter, loan_queue_position_seq
 
 __all__ = [
     "Base",
@@ -18,4 +23,10 @@ __all__ = [
     "Investment",
     "Loan",
     "KycDocument",
+    "AccrualRun",
+    "ArchivedTransaction",
+    "PoolAggregate",
+    "PoolSnapshot",
+    "SequenceCounter",
+    "loan_queue_position_seq",
 ]
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.models.user import Base
+
+
+class AccrualRun(Base):
+    """Execucao do job de accrual com checkpoint para retomada"""
+    __tablename__ = "accrual_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Data de referencia usada em todos os chunks, inclusive apos retomada
+    reference_at = Column(DateTime, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+
+    # Fases: investimentos, emprestimos, concluido
+    phase = Column(String, default="investimentos", nullable=False)
+    # Status: em_andamento, falhou, concluido, abandonado
+    status = Column(String, default="em_andamento", nullable=False)
+
+    last_investment_id = Column(Integer, default=0, nullable=False)
+    last_loan_id = Column(Integer, default=0, nullable=False)
+    investments_processed = Column(Integer, default=0, nullable=False)
+    loans_processed = Column(Integer, default=0, nullable=False)
+    error = Column(String, nullable=True)
+
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<AccrualRun(id={self.id}, phase={self.phase}, status={self.status})>"
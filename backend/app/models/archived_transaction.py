@@ -0,0 +1,26 @@
+﻿from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from datetime import datetime
+from app.models.user import Base
+
+
+class ArchivedTransaction(Base):
+    """Lancamentos de accrual consolidados (arquivo frio, fora das listagens)"""
+    __tablename__ = "transactions_archive"
+
+    # Mesmo id da linha original em transactions
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    # Linha de resumo mensal que substituiu este lancamento
+    summary_transaction_id = Column(Integer, ForeignKey("transactions.id"), nullable=False, index=True)
+
+    wallet_id = Column(Integer, nullable=False)
+    tipo = Column(String, nullable=False)
+    valor = Column(Float, nullable=False)
+    descricao = Column(String, nullable=True)
+    related_investment_id = Column(Integer, nullable=True)
+    related_loan_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ArchivedTransaction(id={self.id}, summary={self.summary_transaction_id}, valor=R${self.valor:.2f})>"
@@ -1,4 +1,4 @@
-﻿from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey
+﻿from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.user import Base
@@ -24,6 +24,10 @@ class Investment(Base):
 
     user = relationship("User", back_populates="investments")
 
+    __table_args__ = (
+        Index("ix_investments_user_status", "user_id", "status"),
+    )
+
     def __repr__(self):
         return f"<Investment(id={self.id}, user_id={self.user_id}, valor=R${self.valor:.2f}, status={self.status})>"
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.user import Base
@@ -20,6 +20,8 @@ class Loan(Base):
     motivo_rejeicao = Column(String, nullable=True)
     queue_position = Column(Integer, nullable=True)
     interest_accrued = Column(Float, default=0.0)
+    # CET anual dos termos atuais; gravado quando os termos mudam e recalculado em lote por POST /loans/cet/recompute
+    cet = Column(Float, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -29,6 +31,10 @@ class Loan(Base):
 
     user = relationship("User", back_populates="loans")
 
+    __table_args__ = (
+        Index("ix_loans_status_queue_position", "status", "queue_position"),
+    )
+
     @property
     def valor_total_com_juros(self):
         return self.valor * (1 + self.taxa_juros)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Float, DateTime
+from datetime import datetime
+from app.models.user import Base
+
+
+class PoolAggregate(Base):
+    """Totais do pool mantidos incrementalmente (linha unica, id=1)"""
+    __tablename__ = "pool_aggregates"
+
+    id = Column(Integer, primary_key=True)
+
+    total_invested = Column(Float, default=0.0, nullable=False)
+    total_committed = Column(Float, default=0.0, nullable=False)
+    active_investors = Column(Integer, default=0, nullable=False)
+    queued_loans = Column(Integer, default=0, nullable=False)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<PoolAggregate(total=R${self.total_invested:.2f}, committed=R${self.total_committed:.2f}, "
+            f"investors={self.active_investors}, queued={self.queued_loans})>"
+        )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, DateTime
+from datetime import datetime
+from app.models.user import Base
+
+
+class PoolSnapshot(Base):
+    """Serie temporal (append-only) do estado do pool"""
+    __tablename__ = "pool_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    recorded_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    total_invested = Column(Float, nullable=False)
+    total_committed = Column(Float, nullable=False)
+    utilization = Column(Float, nullable=False)
+    queued_loans = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<PoolSnapshot(at={self.recorded_at}, utilization={self.utilization:.2f}%)>"
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, BigInteger, String, Sequence
+from app.models.user import Base
+
+# Em bancos com suporte a sequences (PostgreSQL) a posicao na fila vem daqui;
+# create_all ignora a sequence no SQLite, que usa a tabela abaixo.
+loan_queue_position_seq = Sequence("loan_queue_position_seq", metadata=Base.metadata)
+
+
+class SequenceCounter(Base):
+    """Contador nomeado para bancos sem sequences (SQLite)"""
+    __tablename__ = "sequence_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SequenceCounter(name={self.name}, value={self.value})>"
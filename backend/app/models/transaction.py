@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.user import Base
@@ -7,6 +7,10 @@ from app.models.user import Base
 class Transaction(Base):
     """Histórico de Transações (Auditoria)"""
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Compactacao de accrual: varre um tipo dentro de um intervalo de datas
+        Index("ix_transactions_tipo_created_at", "tipo", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     wallet_id = Column(Integer, ForeignKey("wallets.id"), nullable=False)
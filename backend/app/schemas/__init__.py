@@ -1,9 +1,16 @@
 ﻿"""Public schemas exports."""
 from .finance import (
     InterestAccrualResult,
+    InvestmentPreviewBatchRequest,
+    InvestmentPreviewBatchResponse,
     InvestmentPreviewRequest,
     InvestmentPreviewResponse,
     LoanInstallment,
+    LoanInstallmentColumns,
+    LoanPreviewBatchRequest,
+    LoanPreviewBatchResponse,
+    LoanPreviewGridRequest,
+    LoanPreviewGridResponse,
     LoanPreviewRequest,
     LoanPreviewResponse,
 )
@@ -24,6 +31,7 @@ from .investment import (
 from .loan import (
     LoanApproval,
     LoanBase,
+    LoanCetRecomputeResponse,
     LoanCreate,
     LoanPayment,
     LoanResponse,
@@ -46,9 +54,16 @@ __all__ = [
     "InterestAccrualResult",
     "InvestmentPreviewRequest",
     "InvestmentPreviewResponse",
+    "InvestmentPreviewBatchRequest",
+    "InvestmentPreviewBatchResponse",
     "LoanPreviewRequest",
     "LoanPreviewResponse",
+    "LoanPreviewBatchRequest",
+    "LoanPreviewBatchResponse",
+    "LoanPreviewGridRequest",
+    "LoanPreviewGridResponse",
     "LoanInstallment",
+    "LoanInstallmentColumns",
     "UserBase",
     "UserCreate",
     "UserResponse",
@@ -67,6 +82,7 @@ __all__ = [
     "LoanResponse",
     "LoanUpdate",
     "LoanApproval",
+    "LoanCetRecomputeResponse",
     "LoanRejection",
     "LoanPayment",
     "TransactionBase",
@@ -1,7 +1,7 @@
 ﻿"""Finance preview schemas."""
 from datetime import date
 from decimal import Decimal
-from typing import List, Literal
+from typing import Annotated, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -42,11 +42,80 @@ class LoanInstallment(BaseModel):
 class LoanPreviewResponse(BaseModel):
     valor_contratado: Decimal
     taxa_mensal: Decimal
+    # Custo efetivo total anual: TIR do valor liberado contra as parcelas (None sem solucao)
+    cet: Optional[Decimal] = None
     total_pago: Decimal
     total_juros: Decimal
     parcelas: List[LoanInstallment]
 
 
+class InvestmentPreviewBatchRequest(BaseModel):
+    cenarios: List[InvestmentPreviewRequest] = Field(min_length=1)
+
+
+class InvestmentPreviewBatchResponse(BaseModel):
+    """Uma lista por campo, alinhada pelo indice do cenario."""
+
+    cenarios: int
+    valor_investido: List[float]
+    rendimento_previsto: List[float]
+    total_previsto: List[float]
+    taxa_mensal: List[float]
+    apy: List[float]
+
+
+class LoanPreviewBatchRequest(BaseModel):
+    cenarios: List[LoanPreviewRequest] = Field(min_length=1)
+    incluir_parcelas: bool = False
+
+
+class LoanInstallmentColumns(BaseModel):
+    """Parcelas de todos os cenarios em colunas; ``cenario`` aponta o indice de origem."""
+
+    cenario: List[int]
+    numero: List[int]
+    data_pagamento: List[date]
+    valor_parcela: List[float]
+    juros: List[float]
+    amortizacao: List[float]
+    saldo_devedor: List[float]
+
+
+class LoanPreviewBatchResponse(BaseModel):
+    """Uma lista por campo, alinhada pelo indice do cenario."""
+
+    cenarios: int
+    valor_contratado: List[float]
+    taxa_mensal: List[float]
+    cet: List[Optional[float]]
+    prazo_meses: List[int]
+    valor_primeira_parcela: List[float]
+    total_pago: List[float]
+    total_juros: List[float]
+    parcelas: Optional[LoanInstallmentColumns] = None
+
+
+class LoanPreviewGridRequest(BaseModel):
+    valor: Decimal = Field(gt=0)
+    taxas_juros: List[Annotated[Decimal, Field(gt=0)]] = Field(min_length=1)
+    prazos_meses: List[Annotated[int, Field(gt=0)]] = Field(min_length=1)
+    sistema: Literal["price", "sac"] = "price"
+
+
+class LoanPreviewGridResponse(BaseModel):
+    """Matrizes taxa x prazo: linha ``i`` e ``taxas_juros[i]``, coluna ``j`` e ``prazos_meses[j]``."""
+
+    valor_contratado: float
+    sistema: str
+    taxas_juros: List[float]
+    prazos_meses: List[int]
+    taxa_mensal: List[float]
+    valor_primeira_parcela: List[List[float]]
+    valor_ultima_parcela: List[List[float]]
+    total_pago: List[List[float]]
+    total_juros: List[List[float]]
+
+
 class InterestAccrualResult(BaseModel):
     dias: int
     juros: Decimal
@@ -44,6 +44,14 @@ class LoanPayment(BaseModel):
     valor_pagamento: float = Field(gt=0)
 
 
+class LoanCetRecomputeResponse(BaseModel):
+    emprestimos: int
+    sem_solucao: int
+    cet_medio: Optional[float] = None
+    cet_minimo: Optional[float] = None
+    cet_maximo: Optional[float] = None
+
+
 class LoanResponse(LoanBase):
     id: int
     user_id: int
@@ -51,6 +59,7 @@ class LoanResponse(LoanBase):
     updated_at: Optional[datetime] = None
     approved_at: Optional[datetime] = None
     paid_at: Optional[datetime] = None
+    cet: Optional[float] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,222 @@
+﻿"""Vectorized projection of the daily accrual job."""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Investment, Loan
+from app.services.finance_service import ACCRUING_LOAN_STATUSES
+
+SECONDS_PER_DAY = 86400
+MAX_FORECAST_DAYS = 3650
+
+
+@dataclass
+class AccrualBook:
+    """Colunas da carteira ativa como arrays (uma posicao por indice)."""
+
+    investment_last: np.ndarray
+    investment_valor: np.ndarray
+    investment_taxa: np.ndarray
+    loan_last: np.ndarray
+    loan_saldo: np.ndarray
+    loan_taxa: np.ndarray
+
+
+def _epoch(column):
+    return func.extract("epoch", column)
+
+
+def _columns(db: Session, stmt, width: int) -> np.ndarray:
+    rows = db.execute(stmt).all()
+    if not rows:
+        return np.empty((0, width))
+    # Tuplas antes do numpy: np.array sobre Row e ~20x mais lento
+    return np.array([tuple(row) for row in rows], dtype=np.float64)
+
+
+def load_accrual_book(db: Session) -> AccrualBook:
+    """Le so as colunas usadas pelo job, ja convertidas em epoch no banco."""
+    investments = _columns(
+        db,
+        select(
+            _epoch(func.coalesce(Investment.last_accrual_at, Investment.created_at)),
+            Investment.valor,
+            Investment.taxa_rendimento,
+        ).where(Investment.status == "ativo"),
+        3,
+    )
+    loans = _columns(
+        db,
+        select(
+            _epoch(func.coalesce(Loan.last_accrual_at, Loan.created_at)),
+            # Mesmo calculo de Loan.valor_restante
+            Loan.valor * (1 + Loan.taxa_juros)
+            - func.coalesce(Loan.valor_pago, 0.0)
+            - func.coalesce(Loan.interest_accrued, 0.0),
+            Loan.taxa_juros,
+        ).where(Loan.status.in_(ACCRUING_LOAN_STATUSES)),
+        3,
+    )
+    return AccrualBook(
+        investment_last=investments[:, 0],
+        investment_valor=investments[:, 1],
+        investment_taxa=investments[:, 2],
+        loan_last=loans[:, 0],
+        loan_saldo=loans[:, 1],
+        loan_taxa=loans[:, 2],
+    )
+
+
+def _interest_cents(principal: np.ndarray, taxa: np.ndarray, dias: np.ndarray) -> np.ndarray:
+    # accrued_interest em centavos; np.rint arredonda meio para o par, como ROUND_HALF_EVEN
+    return np.rint(principal * taxa * dias / 365 * 100)
+
+
+class _Positions:
+    """Estado de um lado da carteira durante a simulacao.
+
+    ``base`` e o numero (nao truncado) de dias inteiros entre o ultimo accrual
+    e ``reference``; na execucao ``k`` a posicao tem ``max(base + k, 0)`` dias
+    acumulados desde a data original. ``posted`` guarda quantos desses dias ja
+    foram lancados. Posicoes em regime (um dia por execucao, juros > 0) saem
+    do laco geral e entram no caminho rapido de cada subclasse.
+    """
+
+    def __init__(self, last: np.ndarray, principal: np.ndarray, taxa: np.ndarray, reference_epoch: float) -> None:
+        last = np.nan_to_num(last, nan=reference_epoch)
+        keep = (principal > 0) & (taxa > 0)
+        self.base = np.floor((reference_epoch - last[keep]) / SECONDS_PER_DAY).astype(np.int64)
+        self.principal = principal[keep]
+        self.taxa = taxa[keep]
+        self.posted = np.zeros(self.base.shape, dtype=np.int64)
+
+    def _general_step(self, day: int) -> np.ndarray:
+        elapsed = np.maximum(self.base + day, 0)
+        dias = elapsed - self.posted
+        juros = np.where(dias > 0, _interest_cents(self.principal, self.taxa, dias), 0)
+        posted = juros > 0
+        self.posted[posted] = elapsed[posted]
+        return juros
+
+    def _steady_mask(self, day: int) -> np.ndarray:
+        return self.posted == self.base + day
+
+    def _drop(self, mask: np.ndarray) -> None:
+        self.base = self.base[~mask]
+        self.principal = self.principal[~mask]
+        self.taxa = self.taxa[~mask]
+        self.posted = self.posted[~mask]
+
+
+class _InvestmentPositions(_Positions):
+    """Investimentos: o principal nao muda, entao o juro diario em regime e constante."""
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.steady_cents = 0
+
+    def step(self, day: int) -> int:
+        juros = int(self._general_step(day).sum())
+        daily = _interest_cents(self.principal, self.taxa, 1)
+        steady = self._steady_mask(day) & (daily > 0)
+        self.steady_cents += int(daily[steady].sum())
+        self._drop(steady)
+        return juros
+
+    def steady_step(self) -> int:
+        return self.steady_cents
+
+
+class _LoanPositions(_Positions):
+    """Emprestimos: o juro lancado abate o saldo (``valor_restante``) do dia seguinte.
+
+    So entram no caminho rapido saldos que continuam rendendo ao menos 1
+    centavo por dia ate o fim do horizonte, mesmo com o abatimento diario;
+    os demais ficam no laco geral, que trata dias sem lancamento.
+    """
+
+    def __init__(self, *args, horizon_days: int) -> None:
+        super().__init__(*args)
+        self.horizon_days = horizon_days
+        self.steady_saldo = np.empty(0)
+        self.steady_taxa = np.empty(0)
+
+    def step(self, day: int) -> int:
+        juros = self._general_step(day)
+        self.principal = self.principal - juros / 100
+        remaining = self.horizon_days - day
+        # Limite inferior do saldo no fim do horizonte: decaimento pela taxa diaria
+        # mais meio centavo de arredondamento por dia
+        floor_saldo = self.principal * (1 - self.taxa / 365) ** remaining - remaining * 0.005
+        steady = self._steady_mask(day) & (floor_saldo * self.taxa / 365 * 100 >= 0.51)
+        if steady.any():
+            self.steady_saldo = np.concatenate([self.steady_saldo, self.principal[steady]])
+            self.steady_taxa = np.concatenate([self.steady_taxa, self.taxa[steady]])
+        self._drop(steady | (self.principal <= 0))
+        return int(juros.sum())
+
+    def steady_step(self) -> int:
+        # Mesma ordem de operacoes de _interest_cents com dias=1
+        juros = self.steady_saldo * self.steady_taxa
+        juros /= 365
+        juros *= 100
+        np.rint(juros, out=juros)
+        total = int(juros.sum())
+        juros /= 100
+        self.steady_saldo -= juros
+        return total
+
+
+def forecast_accruals(book: AccrualBook, reference: datetime, horizon_days: int) -> dict:
+    """Projeta o que o job lancaria se rodasse uma vez por dia por ``horizon_days`` dias.
+
+    A execucao ``k`` acontece em ``reference + k dias``. Cada dia e uma passada
+    vetorizada sobre as posicoes, reproduzindo as regras do job: dias inteiros
+    desde o ultimo accrual, juros zerados nao avancam a data, e o juros do
+    emprestimo abate o saldo usado no dia seguinte. Nada e gravado. Os valores
+    sao calculados em float e arredondados por posicao em centavos; podem
+    diferir do job (Decimal) em centavos isolados.
+    """
+    reference_epoch = (reference - datetime(1970, 1, 1)).total_seconds()
+    investments = _InvestmentPositions(
+        book.investment_last, book.investment_valor, book.investment_taxa, reference_epoch
+    )
+    loans = _LoanPositions(
+        book.loan_last, book.loan_saldo, book.loan_taxa, reference_epoch, horizon_days=horizon_days
+    )
+
+    series = []
+    acumulado = 0
+    total_investimentos = 0
+    total_emprestimos = 0
+    for day in range(1, horizon_days + 1):
+        # O caminho rapido roda antes do geral para nao cobrar duas vezes quem acabou de entrar
+        juros_investimentos = investments.steady_step() + investments.step(day)
+        juros_emprestimos = loans.steady_step() + loans.step(day)
+
+        total_investimentos += juros_investimentos
+        total_emprestimos += juros_emprestimos
+        acumulado += juros_investimentos + juros_emprestimos
+        series.append(
+            {
+                "data": reference + timedelta(days=day),
+                "juros_investimentos": juros_investimentos / 100,
+                "juros_emprestimos": juros_emprestimos / 100,
+                "total": (juros_investimentos + juros_emprestimos) / 100,
+                "acumulado": acumulado / 100,
+            }
+        )
+
+    return {
+        "referencia": reference,
+        "dias": horizon_days,
+        "investimentos": int(book.investment_last.size),
+        "emprestimos": int(book.loan_last.size),
+        "total_investimentos": total_investimentos / 100,
+        "total_emprestimos": total_emprestimos / 100,
+        "total": (total_investimentos + total_emprestimos) / 100,
+        "serie": series,
+    }
@@ -0,0 +1,153 @@
+"""Loan queue admission policies."""
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, Optional
+
+# O ambiente e lido em get_admission_policy, nao no import; o worker da fila
+# resolve a politica uma vez ao iniciar
+DEFAULT_POLICY = "fifo"
+DEFAULT_MAX_SKIPS = 20
+DEFAULT_WINDOW = 1000
+DEFAULT_AGING_HOURS = 72.0
+
+
+@dataclass(frozen=True)
+class QueuedLoan:
+    id: int
+    valor: float
+    created_at: datetime
+
+
+class AdmissionPolicy(ABC):
+    """Escolhe quais emprestimos da fila (ja em ordem) cabem na capacidade livre.
+
+    ``candidates`` e consumido de forma preguicosa: politicas que param cedo
+    nao forcam a leitura do restante da fila.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def select(self, candidates: Iterable[QueuedLoan], capacity: float, now: datetime) -> list[QueuedLoan]:
+        """Retorna os emprestimos admitidos, na ordem de admissao."""
+
+
+class FifoPolicy(AdmissionPolicy):
+    """Ordem estrita: o primeiro emprestimo que nao cabe bloqueia o resto."""
+
+    name = "fifo"
+
+    def select(self, candidates: Iterable[QueuedLoan], capacity: float, now: datetime) -> list[QueuedLoan]:
+        chosen = []
+        for loan in candidates:
+            if loan.valor > capacity:
+                break
+            chosen.append(loan)
+            capacity -= loan.valor
+        return chosen
+
+
+class SkipAheadPolicy(AdmissionPolicy):
+    """Pula ate ``max_skips`` emprestimos que nao cabem antes de parar."""
+
+    name = "skip_ahead"
+
+    def __init__(self, max_skips: Optional[int] = None) -> None:
+        if max_skips is None:
+            max_skips = int(os.getenv("LOAN_ADMISSION_MAX_SKIPS", str(DEFAULT_MAX_SKIPS)))
+        self.max_skips = max_skips
+
+    def select(self, candidates: Iterable[QueuedLoan], capacity: float, now: datetime) -> list[QueuedLoan]:
+        chosen = []
+        skipped = 0
+        for loan in candidates:
+            if capacity <= 0:
+                break
+            if loan.valor > capacity:
+                skipped += 1
+                if skipped > self.max_skips:
+                    break
+                continue
+            chosen.append(loan)
+            capacity -= loan.valor
+        return chosen
+
+
+class BestFitPolicy(AdmissionPolicy):
+    """Preenche a capacidade com o maior emprestimo que cabe (best-fit decreasing).
+
+    Os candidatos da janela sao ordenados por valor uma vez (O(w log w)); cada
+    escolha e uma busca binaria pela capacidade restante seguida de um
+    union-find que pula as posicoes ja escolhidas, sem inserir nem remover
+    elementos da lista. Emprestimos na fila
+    ha mais de ``aging`` mantem prioridade FIFO; se um deles nao cabe, a passada
+    para e reserva a capacidade para ele, evitando starvation de valores altos.
+    """
+
+    name = "best_fit"
+
+    def __init__(
+        self,
+        aging: Optional[timedelta] = None,
+        window: Optional[int] = None,
+    ) -> None:
+        if aging is None:
+            aging = timedelta(hours=float(os.getenv("LOAN_ADMISSION_AGING_HOURS", str(DEFAULT_AGING_HOURS))))
+        if window is None:
+            window = int(os.getenv("LOAN_ADMISSION_WINDOW", str(DEFAULT_WINDOW)))
+        self.aging = aging
+        self.window = window
+
+    def select(self, candidates: Iterable[QueuedLoan], capacity: float, now: datetime) -> list[QueuedLoan]:
+        chosen = []
+        by_value: list[tuple[float, int, QueuedLoan]] = []
+        for order, loan in enumerate(islice(candidates, self.window)):
+            if now - loan.created_at >= self.aging:
+                if loan.valor > capacity:
+                    return chosen
+                chosen.append(loan)
+                capacity -= loan.valor
+                continue
+            by_value.append((loan.valor, order, loan))
+
+        by_value.sort()
+        valores = [valor for valor, _, _ in by_value]
+        # livre[p]: maior posicao (1-based) ainda nao escolhida <= p; 0 = nenhuma
+        livre = list(range(len(by_value) + 1))
+        while capacity > 0:
+            slot = _largest_free(livre, bisect_right(valores, capacity))
+            if slot == 0:
+                break
+            livre[slot] = slot - 1
+            valor, _, loan = by_value[slot - 1]
+            chosen.append(loan)
+            capacity -= valor
+        return chosen
+
+
+def _largest_free(livre: list[int], slot: int) -> int:
+    # Union-find com compressao por salto: custo amortizado quase constante
+    while livre[slot] != slot:
+        livre[slot] = livre[livre[slot]]
+        slot = livre[slot]
+    return slot
+
+
+ADMISSION_POLICIES = {
+    FifoPolicy.name: FifoPolicy,
+    SkipAheadPolicy.name: SkipAheadPolicy,
+    BestFitPolicy.name: BestFitPolicy,
+}
+
+
+def get_admission_policy(name: Optional[str] = None) -> AdmissionPolicy:
+    """Politica ``name`` ou a de ``LOAN_ADMISSION_POLICY``, lida do ambiente agora."""
+    name = name or os.getenv("LOAN_ADMISSION_POLICY", DEFAULT_POLICY)
+    try:
+        return ADMISSION_POLICIES[name]()
+    except KeyError:
+        raise ValueError(f"Politica de admissao desconhecida: {name}") from None
@@ -1,5 +1,7 @@
 ﻿from datetime import datetime, timedelta
+from functools import lru_cache
 import os
+import time
 from typing import Optional
 
 from jose import JWTError, jwt
@@ -7,10 +9,13 @@ from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from app.models import User
+from app.services.password_hasher import password_hash_pool
+from app.services.schedule_cache import lru_cache_metrics
 
 SECRET_KEY = os.getenv("SECRET_KEY", "shiftbox-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -19,21 +24,37 @@ class InvalidTokenError(Exception):
     """Raised when a JWT token is invalid or expired."""
 
 
+# Cada cliente repete o mesmo token ate expirar; a verificacao HMAC + parse do
+# python-jose domina o custo da autenticacao. Tokens invalidos levantam e nao
+# entram no cache. O dict devolvido e compartilhado: nao alterar.
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _decode_token(token: str) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+def token_cache_metrics() -> dict:
+    return lru_cache_metrics(_decode_token)
+
+
 class AuthService:
     """Real authentication service backed by the users table."""
 
     @staticmethod
-    def authenticate(db: Session, email: str, password: str) -> Optional[User]:
+    async def authenticate(db: Session, email: str, password: str) -> Optional[User]:
         user = db.query(User).filter(User.email == email).first()
         if not user:
             return None
-        if not AuthService.verify_password(password, user.hashed_password):
+        # bcrypt no pool limitado: o verify nao trava o event loop (PasswordHashPoolBusy se a fila encher)
+        if not await password_hash_pool.run(AuthService.verify_password, password, user.hashed_password):
             return None
         return user
 
     @staticmethod
-    def create_access_token(*, subject: str, user_id: int, expires_delta: Optional[timedelta] = None) -> str:
-        to_encode = {"sub": subject, "user_id": user_id}
+    def create_access_token(
+        *, subject: str, user_id: int, is_admin: bool = False, expires_delta: Optional[timedelta] = None
+    ) -> str:
+        # is_admin assinado no token: rotas so de calculo autorizam sem consultar o banco
+        to_encode = {"sub": subject, "user_id": user_id, "is_admin": bool(is_admin)}
         expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
         to_encode.update({"exp": expire})
         return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
@@ -41,9 +62,13 @@ class AuthService:
     @staticmethod
     def decode_access_token(token: str) -> dict:
         try:
-            return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = _decode_token(token)
         except JWTError as exc:  # pragma: no cover - defensive
             raise InvalidTokenError from exc
+        # O decode valida exp so na primeira vez; no cache a validade e conferida aqui
+        if "exp" in payload and payload["exp"] <= time.time():
+            raise InvalidTokenError("Token expirado")
+        return payload
 
     @staticmethod
     def hash_password(password: str) -> str:
@@ -0,0 +1,120 @@
+﻿"""Vectorized monthly cash-flow projection for the active loan book."""
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Loan
+
+MAX_CASHFLOW_MONTHS = 120
+
+
+@dataclass
+class LoanBook:
+    """Colunas dos emprestimos ativos como arrays (um emprestimo por indice)."""
+
+    valor: np.ndarray
+    taxa_juros: np.ndarray
+    prazo: np.ndarray
+    valor_pago: np.ndarray
+    # Mes (ano * 12 + mes - 1) da primeira parcela, como em /loans/{id}/schedule
+    primeiro_mes: np.ndarray
+
+
+def load_loan_book(db: Session) -> LoanBook:
+    """Le os emprestimos ativos em uma unica consulta, so com as colunas usadas."""
+    rows = db.execute(
+        select(
+            Loan.valor,
+            Loan.taxa_juros,
+            Loan.prazo_meses,
+            func.coalesce(Loan.valor_pago, 0.0),
+            extract("year", Loan.created_at) * 12 + extract("month", Loan.created_at) - 1,
+        ).where(Loan.status == "ativo")
+    ).all()
+    # Tuplas antes do numpy: np.array sobre Row e ~20x mais lento
+    columns = np.array([tuple(row) for row in rows], dtype=np.float64) if rows else np.empty((0, 5))
+    # Sem created_at o cronograma comeca no mes corrente, como no /schedule
+    today = date.today()
+    current = today.year * 12 + today.month - 1
+    return LoanBook(
+        valor=columns[:, 0],
+        taxa_juros=columns[:, 1],
+        prazo=columns[:, 2].astype(np.int64),
+        valor_pago=columns[:, 3],
+        primeiro_mes=np.nan_to_num(columns[:, 4], nan=current).astype(np.int64),
+    )
+
+
+def project_cashflow(book: LoanBook, reference: date, months: int) -> dict:
+    """Entradas mensais esperadas (principal e juros) dos emprestimos ativos.
+
+    Cada emprestimo segue a tabela Price de ``calculate_loan_preview``. A
+    parcela ``k`` de cada mes sai da forma fechada do saldo, entao o laco
+    percorre os ``months`` meses e cada passo calcula todos os emprestimos
+    juntos. ``valor_pago`` quita as parcelas em ordem; parcelas de meses
+    anteriores a ``reference`` ainda nao quitadas somam em ``em_atraso``.
+    Os valores sao calculados em float e arredondados por mes.
+    """
+    ok = (book.valor > 0) & (book.prazo > 0)
+    valor = book.valor[ok]
+    prazo = book.prazo[ok]
+    pago = book.valor_pago[ok]
+    primeiro_mes = book.primeiro_mes[ok]
+    taxa = np.power(1 + book.taxa_juros[ok], 1 / 12) - 1
+
+    com_juros = taxa > 0
+    crescimento = np.power(1 + taxa, prazo)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        parcela = np.where(com_juros, valor * taxa * crescimento / (crescimento - 1), valor / prazo)
+
+    mes_referencia = reference.year * 12 + reference.month - 1
+    # Parcelas vencidas antes do mes de referencia e nao cobertas pelo valor pago
+    vencidas = np.clip(mes_referencia - primeiro_mes, 0, prazo)
+    em_atraso = float(np.clip(vencidas * parcela - pago, 0, None).sum())
+
+    series = []
+    total_principal = 0.0
+    total_juros = 0.0
+    for j in range(months):
+        numero = mes_referencia + j - primeiro_mes + 1
+        idx = np.nonzero((numero >= 1) & (numero <= prazo))[0]
+        k = numero[idx]
+        i = taxa[idx]
+        p = parcela[idx]
+
+        fator = np.power(1 + i, k - 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            saldo = np.where(com_juros[idx], valor[idx] * fator - p * (fator - 1) / i, valor[idx] - p * (k - 1))
+        juros = saldo * i
+        amortizacao = p - juros
+        # Fracao da parcela ainda nao coberta por valor_pago
+        aberto = np.clip(k * p - pago[idx], 0, p) / p
+
+        principal_mes = float((aberto * amortizacao).sum())
+        juros_mes = float((aberto * juros).sum())
+        total_principal += principal_mes
+        total_juros += juros_mes
+        ano, mes = divmod(mes_referencia + j, 12)
+        series.append(
+            {
+                "mes": date(ano, mes + 1, 1),
+                "parcelas": int(np.count_nonzero(aberto)),
+                "principal": round(principal_mes, 2),
+                "juros": round(juros_mes, 2),
+                "total": round(principal_mes + juros_mes, 2),
+            }
+        )
+
+    return {
+        "referencia": reference,
+        "meses": months,
+        "emprestimos": int(valor.size),
+        "em_atraso": round(em_atraso, 2),
+        "total_principal": round(total_principal, 2),
+        "total_juros": round(total_juros, 2),
+        "total": round(total_principal + total_juros, 2),
+        "serie": series,
+    }
@@ -0,0 +1,196 @@
+﻿"""Vectorized IRR / CET (custo efetivo total) solver for loan cash flows."""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Loan
+
+IRR_TOLERANCE = 1e-12
+IRR_MAX_ITERATIONS = 100
+IRR_RESIDUAL = 1e-9
+# Limites iniciais do intervalo de busca (taxa por periodo)
+IRR_LOWER_BOUND = -0.99
+IRR_UPPER_BOUND = 1024.0
+# Linhas por passada no recalculo da carteira: cada iteracao aloca matrizes linhas x meses
+CET_CHUNK_SIZE = 10_000
+
+
+def _npv(fluxos: np.ndarray, ponderados: np.ndarray, taxa: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """VPL de cada coluna (periodos x linhas) na sua taxa e a derivada em relacao a taxa."""
+    v = 1 / (1 + taxa)
+    desconto = np.empty_like(fluxos)
+    desconto[0] = 1.0
+    if fluxos.shape[1] >= fluxos.shape[0]:
+        # Carteira: um produto por periodo sobre todas as linhas (memoria contigua)
+        for k in range(1, fluxos.shape[0]):
+            np.multiply(desconto[k - 1], v, out=desconto[k])
+    else:
+        # Poucas linhas e prazo longo: produto acumulado evita o laco em Python
+        np.cumprod(np.broadcast_to(v, (fluxos.shape[0] - 1, v.size)), axis=0, out=desconto[1:])
+    vpl = np.einsum("ij,ij->j", fluxos, desconto)
+    derivada = -np.einsum("ij,ij->j", ponderados, desconto) * v
+    return vpl, derivada
+
+
+def solve_irr(fluxos: np.ndarray, chute: Optional[np.ndarray] = None) -> np.ndarray:
+    """TIR por periodo de cada linha de ``fluxos`` (colunas = periodos 0..N).
+
+    Espera fluxos convencionais: o periodo 0 negativo (valor liberado) e os
+    demais nao negativos, completados com zero alem do prazo de cada linha;
+    assim o VPL e decrescente na taxa e a raiz e unica. Newton com
+    salvaguarda: cada linha guarda um intervalo que contem a raiz e, quando o
+    passo de Newton sai dele, usa a bissecao. As linhas convergidas saem das
+    iteracoes quando somam metade das restantes. Linhas sem raiz no
+    intervalo ficam NaN.
+    """
+    fluxos = np.asarray(fluxos, dtype=np.float64)
+    linhas = fluxos.shape[0]
+    resultado = np.full(linhas, np.nan)
+    if linhas == 0:
+        return resultado
+
+    taxa = np.full(linhas, 0.01) if chute is None else np.asarray(chute, dtype=np.float64).copy()
+    inferior = np.full(linhas, IRR_LOWER_BOUND)
+    superior = np.full(linhas, IRR_UPPER_BOUND)
+    taxa = np.clip(taxa, inferior, superior)
+    ativos = np.arange(linhas)
+    pendente = np.ones(linhas, dtype=bool)
+    # Periodos nas linhas: cada passo do desconto opera sobre memoria contigua
+    f = np.ascontiguousarray(fluxos.T)
+    ponderados = f * np.arange(f.shape[0])[:, None]
+    # Residuo aceito na convergencia, relativo ao tamanho dos fluxos da linha
+    residuo = np.abs(fluxos).sum(axis=1) * IRR_RESIDUAL
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(IRR_MAX_ITERATIONS):
+            vpl, derivada = _npv(f, ponderados, taxa)
+            # VPL decrescente: positivo indica taxa abaixo da raiz
+            inferior = np.where(vpl > 0, taxa, inferior)
+            superior = np.where(vpl < 0, taxa, superior)
+            newton = taxa - vpl / derivada
+            tolerancia = IRR_TOLERANCE * (1 + np.abs(taxa))
+            # Passo abaixo da tolerancia pode coincidir com o limite do intervalo; conta como convergido
+            convergiu = np.isfinite(newton) & (np.abs(newton - taxa) <= tolerancia)
+            dentro = np.isfinite(newton) & (newton > inferior) & (newton < superior)
+            proxima = np.where(dentro | convergiu, newton, (inferior + superior) / 2)
+
+            pronto = pendente & (convergiu | (np.abs(proxima - taxa) <= tolerancia) | (vpl == 0))
+            if pronto.any():
+                # Passo minimo sem VPL ~ 0: o intervalo encolheu ate um limite sem raiz
+                raiz = np.abs(vpl[pronto]) <= residuo[pronto]
+                resultado[ativos[pronto]] = np.where(raiz, np.where(vpl[pronto] == 0, taxa[pronto], proxima[pronto]), np.nan)
+                pendente &= ~pronto
+                restantes = int(np.count_nonzero(pendente))
+                if restantes == 0:
+                    break
+                # Copiar a matriz a cada iteracao custaria mais que recalcular as linhas prontas
+                if restantes <= pendente.size // 2:
+                    ativos = ativos[pendente]
+                    f = f[:, pendente]
+                    ponderados = ponderados[:, pendente]
+                    residuo = residuo[pendente]
+                    proxima = proxima[pendente]
+                    inferior = inferior[pendente]
+                    superior = superior[pendente]
+                    pendente = np.ones(restantes, dtype=bool)
+            taxa = proxima
+    return resultado
+
+
+def annual_cet(taxa_mensal: np.ndarray) -> np.ndarray:
+    """CET anual equivalente a TIR mensal."""
+    return np.power(1 + taxa_mensal, 12) - 1
+
+
+def price_cet(valor: np.ndarray, taxa_juros: np.ndarray, prazo: np.ndarray) -> np.ndarray:
+    """CET anual de emprestimos Price a partir dos termos, em blocos de ``CET_CHUNK_SIZE``.
+
+    O fluxo de cada emprestimo e o valor liberado no periodo 0 e a parcela
+    Price arredondada em centavos nos ``prazo`` meses seguintes, como em
+    ``calculate_loan_preview``. Sem tarifas nem IOF no modelo, o CET difere
+    da taxa contratada so pelo arredondamento das parcelas.
+    """
+    cet = np.full(valor.size, np.nan)
+    for inicio in range(0, valor.size, CET_CHUNK_SIZE):
+        bloco = slice(inicio, inicio + CET_CHUNK_SIZE)
+        v = valor[bloco]
+        n = prazo[bloco]
+        taxa = np.power(1 + taxa_juros[bloco], 1 / 12) - 1
+
+        crescimento = np.power(1 + taxa, n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            parcela = np.where(taxa > 0, v * taxa * crescimento / (crescimento - 1), v / n)
+
+        meses = int(n.max())
+        fluxos = np.zeros((v.size, meses + 1))
+        fluxos[:, 0] = -np.rint(v * 100)
+        parcela_cents = np.rint(parcela * 100)
+        fluxos[:, 1:] = np.where(np.arange(1, meses + 1)[None, :] <= n[:, None], parcela_cents[:, None], 0.0)
+        # Sem juros a ultima parcela absorve o resto do arredondamento, como no cronograma
+        sem_juros = np.nonzero(taxa == 0)[0]
+        fluxos[sem_juros, n[sem_juros]] -= fluxos[sem_juros, 0] + n[sem_juros] * parcela_cents[sem_juros]
+        cet[bloco] = annual_cet(solve_irr(fluxos, taxa))
+    return cet
+
+
+def loan_cet(valor: float, taxa_juros: Optional[float], prazo: int) -> Optional[float]:
+    """CET anual de um unico emprestimo, arredondado como em ``recompute_loan_cet``."""
+    if valor <= 0 or prazo <= 0:
+        return None
+    cet = price_cet(np.array([valor]), np.array([taxa_juros or 0.0]), np.array([prazo]))[0]
+    # + 0.0 normaliza o -0.0 das taxas zero
+    return round(float(cet), 4) + 0.0 if np.isfinite(cet) else None
+
+
+@dataclass
+class LoanTerms:
+    """Termos dos emprestimos ativos como arrays (um emprestimo por indice)."""
+
+    id: np.ndarray
+    valor: np.ndarray
+    taxa_juros: np.ndarray
+    prazo: np.ndarray
+
+
+def load_loan_terms(db: Session) -> LoanTerms:
+    """Le os termos dos emprestimos ativos em uma unica consulta."""
+    rows = db.execute(
+        select(Loan.id, Loan.valor, Loan.taxa_juros, Loan.prazo_meses).where(
+            Loan.status == "ativo", Loan.valor > 0, Loan.prazo_meses > 0
+        )
+    ).all()
+    columns = np.array([tuple(row) for row in rows], dtype=np.float64) if rows else np.empty((0, 4))
+    return LoanTerms(
+        id=columns[:, 0].astype(np.int64),
+        valor=columns[:, 1],
+        taxa_juros=np.nan_to_num(columns[:, 2]),
+        prazo=columns[:, 3].astype(np.int64),
+    )
+
+
+def recompute_loan_cet(db: Session) -> dict:
+    """Recalcula e grava o CET de todos os emprestimos ativos em uma passada."""
+    terms = load_loan_terms(db)
+    cet = np.round(price_cet(terms.valor, terms.taxa_juros, terms.prazo), 4) + 0.0
+    resolvidos = np.isfinite(cet)
+    if terms.id.size:
+        # executemany direto na tabela: sem a sincronizacao de sessao do bulk update do ORM
+        db.execute(
+            update(Loan.__table__).where(Loan.__table__.c.id == bindparam("loan_id")).values(cet=bindparam("cet")),
+            [
+                {"loan_id": loan_id, "cet": valor if ok else None}
+                for loan_id, valor, ok in zip(terms.id.tolist(), cet.tolist(), resolvidos.tolist())
+            ],
+        )
+        db.commit()
+    validos = cet[resolvidos]
+    return {
+        "emprestimos": int(terms.id.size),
+        "sem_solucao": int(terms.id.size - validos.size),
+        "cet_medio": round(float(validos.mean()), 4) if validos.size else None,
+        "cet_minimo": float(validos.min()) if validos.size else None,
+        "cet_maximo": float(validos.max()) if validos.size else None,
+    }
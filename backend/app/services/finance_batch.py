@@ -0,0 +1,190 @@
+﻿"""Vectorized loan and investment previews for many scenarios at once."""
+from datetime import date
+from decimal import Decimal
+from typing import Sequence
+
+import numpy as np
+
+from app.schemas.finance import InvestmentPreviewRequest, LoanPreviewRequest
+from app.services.cet import annual_cet, solve_irr
+from app.services.finance_service import _add_months
+
+MAX_BATCH_SCENARIOS = 1000
+MAX_BATCH_PRAZO_MESES = 600
+MAX_GRID_TAXAS = 200
+MAX_GRID_PRAZOS = 200
+
+
+def _cents(values: np.ndarray) -> np.ndarray:
+    # decimal_round em float: np.rint arredonda meio para o par, como ROUND_HALF_EVEN
+    return np.rint(values * 100).astype(np.int64)
+
+
+def _round(values: np.ndarray, places: int) -> list[float]:
+    scale = 10.0**places
+    return (np.rint(values * scale) / scale).tolist()
+
+
+def _monthly_rate(annual: np.ndarray) -> np.ndarray:
+    return np.power(1 + annual, 1 / 12) - 1
+
+
+def loan_preview_batch(cenarios: Sequence[LoanPreviewRequest], incluir_parcelas: bool = False) -> dict:
+    """Mesmo calculo de ``calculate_loan_preview`` para todos os cenarios de uma vez.
+
+    As parcelas viram uma matriz cenario x mes. O saldo apos cada mes sai da
+    forma fechada (Price: v((1+i)^n - (1+i)^k) / ((1+i)^n - 1); SAC:
+    v(n - k) / n), como nos saldos do cronograma em centavos, em vez de
+    subtrair amortizacoes em float mes a mes, que acumula erro em prazos
+    longos. Meses alem do prazo de um cenario ficam mascarados. Calculado em
+    float e arredondado em centavos: difere do preview individual so em
+    empates de meio centavo isolados.
+    """
+    valor = np.array([float(c.valor) for c in cenarios])
+    taxa_mensal = _monthly_rate(np.array([float(c.taxa_juros) for c in cenarios]))
+    prazo = np.array([c.prazo_meses for c in cenarios], dtype=np.int64)
+    # Sem juros a Price coincide com a SAC, como em iter_price_schedule_cents
+    price = np.array([c.sistema == "price" for c in cenarios]) & (taxa_mensal > 0)
+
+    meses = int(prazo.max())
+    numero = np.arange(1, meses + 1)
+    valido = numero[None, :] <= prazo[:, None]
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        crescimento = np.power(1 + taxa_mensal, prazo)
+        parcela_price = np.where(price, valor * taxa_mensal * crescimento / (crescimento - 1), valor / prazo)
+        fator = np.power(1 + taxa_mensal[:, None], numero[None, :])
+        saldo_price = valor[:, None] * (crescimento[:, None] - fator) / (crescimento - 1)[:, None]
+    amortizacao_sac = valor / prazo
+    saldo_sac = valor[:, None] * (prazo[:, None] - numero[None, :]) / prazo[:, None]
+
+    saldos = np.where(price[:, None], saldo_price, saldo_sac)
+    # Ultimo mes zera o saldo; alem do prazo o valor e descartado
+    saldos = np.where(valido & (numero[None, :] < prazo[:, None]), saldos, 0.0)
+    saldos = np.where(saldos < 0.005, 0.0, saldos)
+    saldos_anteriores = np.hstack([valor[:, None], saldos[:, :-1]])
+    juros = np.where(valido, saldos_anteriores * taxa_mensal[:, None], 0.0)
+    amortizacoes = np.where(price[:, None], parcela_price[:, None] - juros, amortizacao_sac[:, None])
+    parcelas = np.where(price[:, None], parcela_price[:, None], amortizacao_sac[:, None] + juros)
+
+    parcelas_cents = np.where(valido, _cents(parcelas), 0)
+    juros_cents = np.where(valido, _cents(juros), 0)
+    # Fluxos de todos os cenarios resolvidos juntos; meses alem do prazo ja sao zero
+    fluxos = np.hstack([-_cents(valor)[:, None], parcelas_cents]).astype(np.float64)
+    cet = np.rint(annual_cet(solve_irr(fluxos, taxa_mensal)) * 10_000) / 10_000
+
+    result = {
+        "cenarios": len(cenarios),
+        "valor_contratado": _round(valor, 2),
+        "taxa_mensal": _round(taxa_mensal, 4),
+        "cet": [None if np.isnan(x) else x for x in cet.tolist()],
+        "prazo_meses": prazo.tolist(),
+        "valor_primeira_parcela": (parcelas_cents[:, 0] / 100).tolist(),
+        # O preview individual soma as parcelas ja arredondadas
+        "total_pago": (parcelas_cents.sum(axis=1) / 100).tolist(),
+        "total_juros": (juros_cents.sum(axis=1) / 100).tolist(),
+        "parcelas": None,
+    }
+    if incluir_parcelas:
+        cenario, mes = np.nonzero(valido)
+        result["parcelas"] = {
+            "cenario": cenario.tolist(),
+            "numero": (mes + 1).tolist(),
+            "data_pagamento": _payment_dates(cenarios, prazo),
+            "valor_parcela": (parcelas_cents[valido] / 100).tolist(),
+            "juros": (juros_cents[valido] / 100).tolist(),
+            "amortizacao": (_cents(amortizacoes[valido]) / 100).tolist(),
+            "saldo_devedor": (_cents(saldos[valido]) / 100).tolist(),
+        }
+    return result
+
+
+def _payment_dates(cenarios: Sequence[LoanPreviewRequest], prazo: np.ndarray) -> list[date]:
+    # Cenarios de um mesmo lote quase sempre compartilham a primeira parcela
+    hoje = date.today()
+    meses = int(prazo.max())
+    calendarios: dict[date, list[date]] = {}
+    datas: list[date] = []
+    for cenario, n in zip(cenarios, prazo.tolist()):
+        primeira = cenario.primeira_parcela or hoje
+        calendario = calendarios.get(primeira)
+        if calendario is None:
+            calendario = calendarios[primeira] = [_add_months(primeira, i) for i in range(meses)]
+        datas.extend(calendario[:n])
+    return datas
+
+
+def loan_preview_grid(valor: Decimal, taxas_juros: Sequence[Decimal], prazos_meses: Sequence[int], sistema: str) -> dict:
+    """Totais de ``calculate_loan_preview`` para cada par taxa x prazo, sem gerar parcelas.
+
+    Price e SAC tem forma fechada para a primeira e a ultima parcela e para
+    os totais, entao a grade inteira e uma conta de arrays taxa x prazo e o
+    custo nao depende dos prazos. Na Price o total pago usa a parcela
+    arredondada em centavos, como o cronograma, e bate com o preview; no SAC
+    soma os valores exatos de cada mes (o preview arredonda mes a mes, ate
+    meio centavo por parcela). Os juros sao sempre ``total_pago - valor`` em
+    centavos, para a grade nunca se contradizer.
+    """
+    v = float(valor)
+    taxa = _monthly_rate(np.array([float(t) for t in taxas_juros]))[:, None]
+    prazo = np.array(prazos_meses, dtype=np.float64)[None, :]
+
+    if sistema == "price":
+        crescimento = np.power(1 + taxa, prazo)
+        parcela = v * taxa * crescimento / (crescimento - 1)
+        primeira = ultima = parcela
+        # O cronograma paga a parcela ja arredondada em todos os meses
+        total_pago_cents = _cents(parcela) * prazo.astype(np.int64)
+    else:
+        amortizacao = v / prazo
+        primeira = amortizacao + v * taxa
+        ultima = amortizacao * (1 + taxa)
+        # Juros sobre saldos v, v - a, ..., a: soma aritmetica
+        total_pago_cents = _cents(v + v * taxa * (prazo + 1) / 2)
+    total_juros_cents = total_pago_cents - _cents(np.float64(v))
+
+    return {
+        "valor_contratado": round(v, 2),
+        "sistema": sistema,
+        "taxas_juros": [float(t) for t in taxas_juros],
+        "prazos_meses": list(prazos_meses),
+        "taxa_mensal": _round(taxa[:, 0], 4),
+        "valor_primeira_parcela": _round(np.broadcast_to(primeira, total_pago_cents.shape), 2),
+        "valor_ultima_parcela": _round(np.broadcast_to(ultima, total_pago_cents.shape), 2),
+        "total_pago": (total_pago_cents / 100).tolist(),
+        "total_juros": (total_juros_cents / 100).tolist(),
+    }
+
+
+def investment_preview_batch(cenarios: Sequence[InvestmentPreviewRequest]) -> dict:
+    """Mesmo calculo de ``calculate_investment_preview`` para todos os cenarios de uma vez."""
+    valor = np.array([float(c.valor) for c in cenarios])
+    taxa = np.array([float(c.taxa_rendimento) for c in cenarios])
+    dias = np.array([c.dias for c in cenarios], dtype=np.float64)
+    tipo = np.array([c.tipo for c in cenarios])
+    capitalizacao = np.array([c.capitalizacao for c in cenarios])
+
+    taxa_mensal = _monthly_rate(taxa)
+    apy = np.power(1 + taxa_mensal, 12) - 1
+
+    composto = np.select(
+        [capitalizacao == "diaria", capitalizacao == "mensal", capitalizacao == "semestral"],
+        [
+            np.power(1 + (np.power(1 + taxa, 1 / 365) - 1), dias),
+            np.power(1 + taxa_mensal, dias / 30),
+            np.power(1 + (np.power(1 + taxa, 1 / 2) - 1), dias / 182.5),
+        ],
+        default=np.power(1 + taxa, dias / 365),
+    )
+    simples = tipo == "simples"
+    rendimento = np.where(simples, valor * taxa * dias / 365, valor * composto - valor)
+    total = np.where(simples, valor + rendimento, valor * composto)
+
+    return {
+        "cenarios": len(cenarios),
+        "valor_investido": _round(valor, 2),
+        "rendimento_previsto": _round(rendimento, 2),
+        "total_previsto": _round(total, 2),
+        "taxa_mensal": _round(taxa_mensal, 4),
+        "apy": _round(apy, 4),
+    }
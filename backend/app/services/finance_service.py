@@ -1,6 +1,13 @@
 ﻿from decimal import Decimal, ROUND_HALF_EVEN, getcontext
 from datetime import date
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, Optional
 import math
+import os
+
+import numpy as np
+from pydantic import TypeAdapter
 
 from app.schemas.finance import (
     InterestAccrualResult,
@@ -10,12 +17,31 @@ from app.schemas.finance import (
     LoanPreviewRequest,
     LoanPreviewResponse,
 )
+from app.services.cet import annual_cet, solve_irr
+from app.services.money import (
+    CENTS_PER_UNIT,
+    FIXED_SCALE,
+    cents_to_decimal,
+    div_round_half_even,
+    exact_ratio,
+    fixed_mul,
+    fixed_pow,
+    fixed_to_cents,
+    interest_cents,
+    to_fixed,
+)
 
 getcontext().prec = 28
 
 TWO_PLACES = Decimal("0.01")
 FOUR_PLACES = Decimal("0.0001")
 ALL_DAYS_YEAR = Decimal(365)
+HALF_CENT_FIXED = to_fixed(Decimal("0.005"))
+
+RATE_CACHE_SIZE = int(os.getenv("RATE_CACHE_SIZE", "1024"))
+
+# Status de emprestimo sobre os quais o job diario acumula juros
+ACCRUING_LOAN_STATUSES = ("ativo", "pendente")
 
 
 def decimal_round(value: Decimal, places: Decimal = TWO_PLACES) -> Decimal:
@@ -26,10 +52,14 @@ def _pow_decimal(base: Decimal, exponent: Decimal) -> Decimal:
     return Decimal(math.pow(float(base), float(exponent)))
 
 
+# Poucas taxas distintas circulam (produtos e sliders do simulador); Decimal e
+# imutavel e hashable, entao o resultado pode ser compartilhado
+@lru_cache(maxsize=RATE_CACHE_SIZE)
 def _rate_annual_to_monthly(rate: Decimal) -> Decimal:
     return Decimal(_pow_decimal(Decimal(1) + rate, Decimal(1) / Decimal(12)) - 1)
 
 
+@lru_cache(maxsize=RATE_CACHE_SIZE)
 def _rate_annual_to_daily(rate: Decimal) -> Decimal:
     return Decimal(_pow_decimal(Decimal(1) + rate, Decimal(1) / ALL_DAYS_YEAR) - 1)
 
@@ -69,14 +99,30 @@ def calculate_investment_preview(req: InvestmentPreviewRequest) -> InvestmentPre
     )
 
 
+def accrued_interest_cents(principal: Decimal | float, taxa_anual: Decimal | float, dias: int) -> int:
+    """Juros simples pro rata dia (base 365) em centavos inteiros, ROUND_HALF_EVEN.
+
+    Aceita as colunas float direto; o resultado e o mesmo de passar
+    ``Decimal(str(valor))``.
+    """
+    return interest_cents(principal, taxa_anual, dias, 365)
+
+
+def accrued_interest(principal: Decimal, taxa_anual: Decimal, dias: int) -> Decimal:
+    """Juros simples pro rata dia (base 365), arredondados em centavos.
+
+    Para uma unica chamada com Decimal a conta direta em Decimal e mais
+    rapida que converter os operandos para fracoes inteiras.
+    """
+    return decimal_round(principal * taxa_anual * Decimal(dias) / ALL_DAYS_YEAR)
+
+
 def calculate_investment_accrual(valor: Decimal, taxa_rendimento: Decimal, dias: int) -> InterestAccrualResult:
-    juros = valor * taxa_rendimento * Decimal(dias) / ALL_DAYS_YEAR
-    return InterestAccrualResult(dias=dias, juros=decimal_round(juros))
+    return InterestAccrualResult(dias=dias, juros=accrued_interest(valor, taxa_rendimento, dias))
 
 
 def calculate_loan_accrual(saldo: Decimal, taxa_juros: Decimal, dias: int) -> InterestAccrualResult:
-    juros = saldo * taxa_juros * Decimal(dias) / ALL_DAYS_YEAR
-    return InterestAccrualResult(dias=dias, juros=decimal_round(juros))
+    return InterestAccrualResult(dias=dias, juros=accrued_interest(saldo, taxa_juros, dias))
 
 
 def _add_months(base_date: date, months: int) -> date:
@@ -86,77 +132,240 @@ def _add_months(base_date: date, months: int) -> date:
     return date(year, month, day)
 
 
-def _price_schedule(valor: Decimal, taxa_mensal: Decimal, prazo: int, primeira: date) -> list[LoanInstallment]:
-    parcelas: list[LoanInstallment] = []
-    if taxa_mensal == 0:
-        parcela_valor = valor / prazo
-    else:
-        fator = (taxa_mensal * (Decimal(1) + taxa_mensal) ** prazo) / ((Decimal(1) + taxa_mensal) ** prazo - 1)
-        parcela_valor = valor * fator
-
-    saldo = valor
-    for i in range(1, prazo + 1):
-        data_pagamento = _add_months(primeira, i - 1)
-        juros = saldo * taxa_mensal
-        amortizacao = parcela_valor - juros
+# Linha do cronograma em centavos: (parcela, juros, amortizacao, saldo_devedor)
+ScheduleRow = tuple[int, int, int, int]
+
+
+def _price_terms(valor: Decimal, taxa: int, prazo: int) -> tuple[int, int]:
+    """Valor e parcela da tabela Price em ponto fixo inteiro (escala 10^-24)."""
+    valor_fixo = to_fixed(valor)
+    crescimento = fixed_pow(FIXED_SCALE + taxa, prazo)
+    return valor_fixo, div_round_half_even(valor_fixo * fixed_mul(taxa, crescimento), crescimento - FIXED_SCALE)
+
+
+def _price_balance(valor_fixo: int, taxa: int, parcela_fixa: int, k: int) -> int:
+    # Saldo fechado apos k parcelas: V(1+i)^k - P((1+i)^k - 1)/i
+    fator = fixed_pow(FIXED_SCALE + taxa, k)
+    saldo = fixed_mul(valor_fixo, fator) - div_round_half_even(parcela_fixa * (fator - FIXED_SCALE), taxa)
+    return 0 if saldo < HALF_CENT_FIXED else saldo
+
+
+def iter_price_schedule_cents(valor: Decimal, taxa_mensal: Decimal, prazo: int, inicio: int = 1) -> Iterator[ScheduleRow]:
+    """Tabela Price em centavos a partir da parcela ``inicio``, uma linha por vez.
+
+    O saldo antes de ``inicio`` sai da forma fechada, entao comecar no meio
+    custa O(log inicio); a diferenca para o laco desde a primeira parcela
+    fica na ordem de 10^-24 e nao altera os centavos.
+    """
+    taxa = to_fixed(taxa_mensal)
+    if taxa == 0:
+        # Sem juros Price e SAC coincidem: parcela = amortizacao = valor / prazo
+        yield from iter_sac_schedule_cents(valor, taxa_mensal, prazo, inicio)
+        return
+
+    valor_fixo, parcela_fixa = _price_terms(valor, taxa, prazo)
+    parcela = fixed_to_cents(parcela_fixa)
+    saldo = valor_fixo if inicio == 1 else _price_balance(valor_fixo, taxa, parcela_fixa, inicio - 1)
+    for _ in range(inicio, prazo + 1):
+        # Truncar em 10^-24 nao altera o arredondamento em centavos
+        juros = saldo * taxa // FIXED_SCALE
+        amortizacao = parcela_fixa - juros
         saldo -= amortizacao
-        if saldo < Decimal("0.005"):
-            saldo = Decimal(0)
-        parcelas.append(
-            LoanInstallment(
-                numero=i,
-                data_pagamento=data_pagamento,
-                valor_parcela=decimal_round(parcela_valor),
-                juros=decimal_round(juros),
-                amortizacao=decimal_round(amortizacao),
-                saldo_devedor=decimal_round(saldo),
+        if saldo < HALF_CENT_FIXED:
+            saldo = 0
+        yield (parcela, fixed_to_cents(juros), fixed_to_cents(amortizacao), fixed_to_cents(saldo))
+
+
+def iter_sac_schedule_cents(valor: Decimal, taxa_mensal: Decimal, prazo: int, inicio: int = 1) -> Iterator[ScheduleRow]:
+    """Tabela SAC em centavos a partir da parcela ``inicio``.
+
+    Tudo e fracao exata de inteiros (saldo antes da parcela i = valor *
+    restantes / prazo), com um unico ROUND_HALF_EVEN por campo. Quando um
+    campo cai exatamente em meio centavo, vale o par do valor exato; o laco
+    Decimal anterior acumulava ``saldo -= valor / prazo`` com 28 digitos e
+    decidia esses empates pelo ruido, para cima ou para baixo.
+    """
+    v_num, v_den = exact_ratio(valor)
+    t_num, t_den = exact_ratio(taxa_mensal)
+    # Saldos em unidades de 1/den; saldo < 0.005 <=> saldo * 200 < den
+    den = v_den * prazo
+    amortizacao = div_round_half_even(v_num * CENTS_PER_UNIT, den)
+    for i in range(inicio, prazo + 1):
+        saldo = v_num * (prazo - i + 1)
+        if i > 1 and saldo * 2 * CENTS_PER_UNIT < den:
+            saldo = 0
+        juros = div_round_half_even(saldo * t_num * CENTS_PER_UNIT, den * t_den)
+        parcela = div_round_half_even((v_num * t_den + saldo * t_num) * CENTS_PER_UNIT, den * t_den)
+        restante = v_num * (prazo - i)
+        if restante * 2 * CENTS_PER_UNIT < den:
+            restante = 0
+        yield (parcela, juros, amortizacao, div_round_half_even(restante * CENTS_PER_UNIT, den))
+
+
+def price_schedule_cents(valor: Decimal, taxa_mensal: Decimal, prazo: int) -> list[ScheduleRow]:
+    return list(iter_price_schedule_cents(valor, taxa_mensal, prazo))
+
+
+def sac_schedule_cents(valor: Decimal, taxa_mensal: Decimal, prazo: int) -> list[ScheduleRow]:
+    return list(iter_sac_schedule_cents(valor, taxa_mensal, prazo))
+
+
+def price_installment_cents(valor: Decimal, taxa_mensal: Decimal, prazo: int, numero: int) -> ScheduleRow:
+    """Parcela ``numero`` da tabela Price sem percorrer as anteriores.
+
+    O saldo vem da forma fechada, mas ``(1+i)^k`` e ``(1+i)^prazo`` saem de
+    ``fixed_pow``: O(log numero + log prazo) multiplicacoes inteiras, nao O(1).
+    O ``**`` em float usado por ``finance_batch`` seria O(1), mas nao
+    reproduz os centavos de ``price_schedule_cents``.
+    """
+    return next(iter_price_schedule_cents(valor, taxa_mensal, prazo, numero))
+
+
+def sac_installment_cents(valor: Decimal, taxa_mensal: Decimal, prazo: int, numero: int) -> ScheduleRow:
+    """Parcela ``numero`` da tabela SAC sem percorrer as anteriores."""
+    return next(iter_sac_schedule_cents(valor, taxa_mensal, prazo, numero))
+
+
+def _installment(numero: int, row: ScheduleRow, primeira: date) -> LoanInstallment:
+    parcela, juros, amortizacao, saldo = row
+    return LoanInstallment(
+        numero=numero,
+        data_pagamento=_add_months(primeira, numero - 1),
+        valor_parcela=cents_to_decimal(parcela),
+        juros=cents_to_decimal(juros),
+        amortizacao=cents_to_decimal(amortizacao),
+        saldo_devedor=cents_to_decimal(saldo),
+    )
+
+
+_INSTALLMENT_LIST = TypeAdapter(list[LoanInstallment])
+
+
+def _payment_dates(primeira: date, inicio: int, quantidade: int) -> list[date]:
+    # Mesmas datas de _add_months(primeira, numero - 1), contando meses absolutos
+    dia = min(primeira.day, 28)
+    mes = primeira.year * 12 + primeira.month - 1 + inicio - 1
+    return [date(m // 12, m % 12 + 1, dia) for m in range(mes, mes + quantidade)]
+
+
+def _installments(rows: Iterable[ScheduleRow], primeira: date, inicio: int = 1) -> list[LoanInstallment]:
+    # Uma unica validacao da lista inteira sai mais barata que um LoanInstallment(...) por linha
+    rows = list(rows)
+    return _INSTALLMENT_LIST.validate_python(
+        [
+            {
+                "numero": numero,
+                "data_pagamento": data_pagamento,
+                "valor_parcela": cents_to_decimal(parcela),
+                "juros": cents_to_decimal(juros),
+                "amortizacao": cents_to_decimal(amortizacao),
+                "saldo_devedor": cents_to_decimal(saldo),
+            }
+            for numero, data_pagamento, (parcela, juros, amortizacao, saldo) in zip(
+                range(inicio, inicio + len(rows)), _payment_dates(primeira, inicio, len(rows)), rows
             )
-        )
-    return parcelas
+        ]
+    )
+
+
+def _price_schedule(valor: Decimal, taxa_mensal: Decimal, prazo: int, primeira: date) -> list[LoanInstallment]:
+    return _installments(iter_price_schedule_cents(valor, taxa_mensal, prazo), primeira)
 
 
 def _sac_schedule(valor: Decimal, taxa_mensal: Decimal, prazo: int, primeira: date) -> list[LoanInstallment]:
-    parcelas: list[LoanInstallment] = []
-    amortizacao_constante = valor / prazo
-    saldo = valor
-    for i in range(1, prazo + 1):
-        data_pagamento = _add_months(primeira, i - 1)
-        juros = saldo * taxa_mensal
-        parcela = amortizacao_constante + juros
-        saldo -= amortizacao_constante
-        if saldo < Decimal("0.005"):
-            saldo = Decimal(0)
-        parcelas.append(
-            LoanInstallment(
-                numero=i,
-                data_pagamento=data_pagamento,
-                valor_parcela=decimal_round(parcela),
-                juros=decimal_round(juros),
-                amortizacao=decimal_round(amortizacao_constante),
-                saldo_devedor=decimal_round(saldo),
-            )
-        )
-    return parcelas
+    return _installments(iter_sac_schedule_cents(valor, taxa_mensal, prazo), primeira)
 
 
-def calculate_loan_preview(req: LoanPreviewRequest) -> LoanPreviewResponse:
-    valor = req.valor
-    taxa_mensal = _rate_annual_to_monthly(req.taxa_juros)
-    primeira = req.primeira_parcela or date.today()
+def _schedule_rows(req: LoanPreviewRequest, taxa_mensal: Decimal, inicio: int = 1) -> Iterator[ScheduleRow]:
+    rows = iter_price_schedule_cents if req.sistema == "price" else iter_sac_schedule_cents
+    return rows(req.valor, taxa_mensal, req.prazo_meses, inicio)
 
-    if req.sistema == "price":
-        parcelas = _price_schedule(valor, taxa_mensal, req.prazo_meses, primeira)
-    else:
-        parcelas = _sac_schedule(valor, taxa_mensal, req.prazo_meses, primeira)
 
-    total_pago = sum(p.valor_parcela for p in parcelas)
-    total_juros = sum(p.juros for p in parcelas)
+def _page_rows(
+    req: LoanPreviewRequest, taxa_mensal: Decimal, offset: int, limit: Optional[int]
+) -> Iterator[ScheduleRow]:
+    if offset >= req.prazo_meses:
+        return iter(())
+    return islice(_schedule_rows(req, taxa_mensal, offset + 1), limit)
 
+
+def _schedule_cet(req: LoanPreviewRequest, taxa_mensal: Decimal, parcelas: list[int]) -> Optional[Decimal]:
+    """CET anual do cronograma: TIR do valor liberado contra as parcelas em centavos.
+
+    ``None`` quando a TIR nao tem solucao (ex.: parcelas que arredondam para
+    zero centavo), como em ``loan_cet``.
+    """
+    fluxos = np.array([[-int(decimal_round(req.valor) * 100), *parcelas]], dtype=np.float64)
+    irr = solve_irr(fluxos, np.array([float(taxa_mensal)]))
+    with np.errstate(over="ignore", invalid="ignore"):
+        cet = float(annual_cet(irr)[0])
+    return decimal_round(Decimal(cet), FOUR_PLACES) if math.isfinite(cet) else None
+
+
+def _preview_response(
+    req: LoanPreviewRequest, taxa_mensal: Decimal, parcelas_cents: list[int], total_juros: int, parcelas: list[LoanInstallment]
+) -> LoanPreviewResponse:
     return LoanPreviewResponse(
-        valor_contratado=decimal_round(valor),
+        valor_contratado=decimal_round(req.valor),
         taxa_mensal=decimal_round(taxa_mensal, FOUR_PLACES),
-        total_pago=decimal_round(total_pago),
-        total_juros=decimal_round(total_juros),
+        cet=_schedule_cet(req, taxa_mensal, parcelas_cents),
+        total_pago=cents_to_decimal(sum(parcelas_cents)),
+        total_juros=cents_to_decimal(total_juros),
         parcelas=parcelas,
     )
 
+
+def _schedule_totals(req: LoanPreviewRequest, taxa_mensal: Decimal) -> tuple[list[int], int]:
+    # Parcelas em centavos (para os totais e o CET) e juros totais do prazo inteiro
+    parcelas = []
+    total_juros = 0
+    for parcela, juros, _, _ in _schedule_rows(req, taxa_mensal):
+        parcelas.append(parcela)
+        total_juros += juros
+    return parcelas, total_juros
+
+
+def calculate_loan_preview(req: LoanPreviewRequest, offset: int = 0, limit: Optional[int] = None) -> LoanPreviewResponse:
+    """Cronograma do emprestimo; ``offset``/``limit`` paginam as parcelas.
+
+    Os totais sempre cobrem o prazo inteiro (uma passada em centavos
+    inteiros); so as parcelas da pagina viram ``LoanInstallment``.
+    """
+    taxa_mensal = _rate_annual_to_monthly(req.taxa_juros)
+    primeira = req.primeira_parcela or date.today()
+
+    if offset == 0 and limit is None:
+        rows = list(_schedule_rows(req, taxa_mensal))
+        parcelas_cents = [row[0] for row in rows]
+        total_juros = sum(row[1] for row in rows)
+        return _preview_response(req, taxa_mensal, parcelas_cents, total_juros, _installments(rows, primeira))
+
+    parcelas_cents, total_juros = _schedule_totals(req, taxa_mensal)
+    parcelas = _installments(_page_rows(req, taxa_mensal, offset, limit), primeira, offset + 1)
+    return _preview_response(req, taxa_mensal, parcelas_cents, total_juros, parcelas)
+
+
+def iter_loan_preview_ndjson(req: LoanPreviewRequest, offset: int = 0, limit: Optional[int] = None) -> Iterator[str]:
+    """Cronograma em NDJSON: uma linha por parcela da pagina e, por ultimo, o resumo.
+
+    As parcelas sao geradas e serializadas uma a uma, entao memoria e tempo
+    ate o primeiro byte nao dependem do prazo. O resumo (sem ``parcelas``)
+    vai no fim porque os totais exigem percorrer o prazo inteiro.
+    """
+    taxa_mensal = _rate_annual_to_monthly(req.taxa_juros)
+    primeira = req.primeira_parcela or date.today()
+    for numero, row in enumerate(_page_rows(req, taxa_mensal, offset, limit), start=offset + 1):
+        yield _installment(numero, row, primeira).model_dump_json() + "\n"
+
+    parcelas_cents, total_juros = _schedule_totals(req, taxa_mensal)
+    resumo = _preview_response(req, taxa_mensal, parcelas_cents, total_juros, [])
+    yield resumo.model_dump_json(exclude={"parcelas"}) + "\n"
+
+
+def calculate_loan_installment(req: LoanPreviewRequest, numero: int) -> LoanInstallment:
+    """Uma unica parcela de ``calculate_loan_preview``: O(log prazo) no Price, O(1) no SAC."""
+    if not 1 <= numero <= req.prazo_meses:
+        raise ValueError("Parcela fora do prazo do emprestimo")
+    taxa_mensal = _rate_annual_to_monthly(req.taxa_juros)
+    row = next(_schedule_rows(req, taxa_mensal, numero))
+    return _installment(numero, row, req.primeira_parcela or date.today())
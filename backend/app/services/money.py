@@ -0,0 +1,93 @@
+﻿"""Fixed-point money arithmetic on Python integers."""
+from decimal import Decimal
+
+# Escala do ponto fixo para taxas e saldos intermediarios (24 casas decimais,
+# bem abaixo do ulp do Decimal com prec=28 para valores de ate 10^4)
+FIXED_SCALE = 10**24
+CENTS_PER_UNIT = 100
+_FIXED_PER_CENT = FIXED_SCALE // CENTS_PER_UNIT
+_ONE_CENT = Decimal("0.01")
+# Ate 15 digitos significativos o repr de um float e a propria fracao decimal
+_MAX_EXACT_FLOAT = 10**15
+
+
+def div_round_half_even(numerator: int, denominator: int) -> int:
+    """``numerator / denominator`` arredondado para inteiro, meio para o par (ROUND_HALF_EVEN)."""
+    if denominator < 0:
+        numerator, denominator = -numerator, -denominator
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and quotient & 1):
+        quotient += 1
+    return quotient
+
+
+def to_fixed(value: Decimal | int) -> int:
+    numerator, denominator = Decimal(value).as_integer_ratio()
+    return div_round_half_even(numerator * FIXED_SCALE, denominator)
+
+
+def fixed_mul(a: int, b: int) -> int:
+    return div_round_half_even(a * b, FIXED_SCALE)
+
+
+def fixed_pow(base: int, exponent: int) -> int:
+    """``base ** exponent`` em ponto fixo (exponenciacao binaria, expoente inteiro >= 0)."""
+    result = FIXED_SCALE
+    while exponent:
+        if exponent & 1:
+            result = fixed_mul(result, base)
+        exponent >>= 1
+        if exponent:
+            base = fixed_mul(base, base)
+    return result
+
+
+def fixed_to_cents(value: int) -> int:
+    # div_round_half_even em linha: e chamada varias vezes por parcela
+    quotient, remainder = divmod(value, _FIXED_PER_CENT)
+    twice = 2 * remainder
+    if twice > _FIXED_PER_CENT or (twice == _FIXED_PER_CENT and quotient & 1):
+        quotient += 1
+    return quotient
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    """Centavos como Decimal com 2 casas, o mesmo formato de ``decimal_round``."""
+    # Produto exato (prec=28); mais barato que Decimal(cents).scaleb(-2)
+    return _ONE_CENT * cents
+
+
+def exact_ratio(value: Decimal | float) -> tuple[int, int]:
+    """Fracao exata de ``value``; um float vale pelo seu repr, como ``Decimal(str(x))``.
+
+    Floats com ate 2 (dinheiro) ou 6 (taxas) casas e menos de 15 digitos sao
+    convertidos direto para inteiros, sem passar por Decimal.
+    """
+    if value.__class__ is float:
+        scaled = round(value * 100)
+        if scaled / 100 == value and -_MAX_EXACT_FLOAT < scaled < _MAX_EXACT_FLOAT:
+            return scaled, 100
+        scaled = round(value * 1_000_000)
+        if scaled / 1_000_000 == value and -_MAX_EXACT_FLOAT < scaled < _MAX_EXACT_FLOAT:
+            return scaled, 1_000_000
+        value = Decimal(repr(value))
+    return value.as_integer_ratio()
+
+
+def interest_cents(principal: Decimal | float, taxa: Decimal | float, dias: int, base_dias: int) -> int:
+    """Juros simples ``principal * taxa * dias / base`` em centavos, com uma unica arredondada exata."""
+    if principal.__class__ is float and taxa.__class__ is float:
+        # Caso comum das colunas do job: dinheiro com 2 casas e taxa com ate 6
+        p_num = round(principal * 100)
+        t_num = round(taxa * 1_000_000)
+        if (
+            p_num / 100 == principal
+            and t_num / 1_000_000 == taxa
+            and -_MAX_EXACT_FLOAT < p_num < _MAX_EXACT_FLOAT
+            and -_MAX_EXACT_FLOAT < t_num < _MAX_EXACT_FLOAT
+        ):
+            return div_round_half_even(p_num * t_num * dias, 1_000_000 * base_dias)
+    p_num, p_den = exact_ratio(principal)
+    t_num, t_den = exact_ratio(taxa)
+    return div_round_half_even(p_num * t_num * dias * CENTS_PER_UNIT, p_den * t_den * base_dias)
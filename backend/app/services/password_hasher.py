@@ -0,0 +1,113 @@
+﻿"""Bounded thread pool for bcrypt hashing and verification."""
+import asyncio
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+T = TypeVar("T")
+
+
+class PasswordHashPoolBusy(Exception):
+    """Raised when the hashing queue is full; routes answer 503."""
+
+
+def _timed(fn: Callable[..., T], args: tuple) -> tuple[float, float, T]:
+    started = time.perf_counter()
+    result = fn(*args)
+    return started, time.perf_counter(), result
+
+
+class PasswordHashPool:
+    """Executa o bcrypt fora do event loop, com concorrencia e fila limitadas.
+
+    Um verify custa centenas de milissegundos de CPU; chamado direto numa
+    rota async, trava todas as outras requisicoes do worker. O bcrypt solta o
+    GIL durante o hash, entao threads bastam (sem processos nem pickling) e
+    ``workers`` limita quantos nucleos uma rajada de logins pode ocupar. Acima
+    de ``max_pending`` chamadas em andamento ou na fila, ``run`` recusa com
+    ``PasswordHashPoolBusy`` em vez de acumular espera. A vaga so e liberada
+    quando o futuro do executor termina: uma requisicao cancelada tira da
+    fila o hash que ainda nao comecou, mas o que ja roda segue ocupando a
+    vaga ate acabar. Os contadores so sao alterados no event loop; a thread
+    apenas mede os proprios tempos.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.failures = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHashPoolBusy("Fila de hash de senha cheia")
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        future = self._get_executor().submit(_timed, fn, args)
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        future.add_done_callback(lambda done: self._finished_threadsafe(loop, done, submitted))
+        _, _, result = await asyncio.wrap_future(future, loop=loop)
+        return result
+
+    def _finished_threadsafe(self, loop: asyncio.AbstractEventLoop, future: Future, submitted: float) -> None:
+        # Roda na thread do hash (ou no loop, se o futuro ja terminou): devolve ao loop
+        try:
+            loop.call_soon_threadsafe(self._finished, future, submitted)
+        except RuntimeError:
+            # Loop ja fechado (shutdown): nao ha mais quem leia os contadores
+            pass
+
+    def _finished(self, future: Future, submitted: float) -> None:
+        self.pending -= 1
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.failures += 1
+            return
+        started, finished, _ = future.result()
+        wait = started - submitted
+        self.completed += 1
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self.total_run_seconds += finished - started
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "limite_pendentes": self.max_pending,
+            "em_execucao": min(self.pending, self.workers),
+            "na_fila": max(0, self.pending - self.workers),
+            "pendentes_maximo": self.peak_pending,
+            "concluidos": self.completed,
+            "falhas": self.failures,
+            "rejeitados": self.rejected,
+            "espera_media_segundos": round(self.total_wait_seconds / self.completed, 6) if self.completed else 0.0,
+            "espera_maxima_segundos": round(self.max_wait_seconds, 6),
+            "duracao_media_segundos": round(self.total_run_seconds / self.completed, 6) if self.completed else 0.0,
+        }
+
+
+password_hash_pool = PasswordHashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,61 @@
+"""In-process snapshot cache for the pool dashboard."""
+import asyncio
+import os
+import time
+from typing import Any, Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+POOL_SNAPSHOT_TTL_SECONDS = float(os.getenv("POOL_SNAPSHOT_TTL_SECONDS", "2"))
+
+
+class SnapshotCache:
+    """Cache de um unico valor com TTL, invalidacao explicita e single-flight.
+
+    Chamadores concorrentes que encontram o cache vazio aguardam a mesma
+    computacao em andamento em vez de dispararem uma consulta cada. Uma
+    invalidacao incrementa a geracao, de modo que um calculo iniciado antes
+    dela nunca repopula o cache com dados antigos.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._value: Any = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._inflight: Optional[tuple[int, asyncio.Future]] = None
+        self._listeners: list[Callable[[], None]] = []
+
+    def add_invalidation_listener(self, listener: Callable[[], None]) -> None:
+        self._listeners.append(listener)
+
+    async def get(self, loader: Callable[[], Any]) -> Any:
+        if self._value is not None and time.monotonic() < self._expires_at:
+            return self._value
+
+        generation = self._generation
+        if self._inflight is None or self._inflight[0] != generation:
+            task = asyncio.ensure_future(self._load(loader, generation))
+            self._inflight = (generation, task)
+        return await asyncio.shield(self._inflight[1])
+
+    async def _load(self, loader: Callable[[], Any], generation: int) -> Any:
+        try:
+            value = await run_in_threadpool(loader)
+        finally:
+            if self._inflight is not None and self._inflight[0] == generation:
+                self._inflight = None
+        if generation == self._generation:
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl_seconds
+        return value
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._value = None
+        self._expires_at = 0.0
+        for listener in self._listeners:
+            listener()
+
+
+pool_snapshot_cache = SnapshotCache(POOL_SNAPSHOT_TTL_SECONDS)
@@ -0,0 +1,150 @@
+"""Pool utilization time series."""
+import asyncio
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.db import SessionLocal
+from app.models import PoolSnapshot
+from app.services.pool_service import get_pool_aggregate
+
+POOL_HISTORY_INTERVAL_SECONDS = float(os.getenv("POOL_HISTORY_INTERVAL_SECONDS", "60"))
+POOL_HISTORY_HEARTBEAT_SECONDS = float(os.getenv("POOL_HISTORY_HEARTBEAT_SECONDS", "900"))
+MAX_HISTORY_BUCKETS = 1000
+EPOCH = datetime(1970, 1, 1)
+
+logger = logging.getLogger("pool_history")
+
+
+def record_pool_snapshot(db: Session, heartbeat: Optional[timedelta] = None) -> Optional[PoolSnapshot]:
+    """Grava o estado atual do pool se ele mudou desde o ultimo ponto.
+
+    Com ``heartbeat``, grava mesmo sem mudanca quando o ultimo ponto e mais
+    antigo que esse intervalo, para o grafico nao ficar com buracos longos.
+    """
+    aggregate = get_pool_aggregate(db)
+    total = float(aggregate.total_invested)
+    committed = float(aggregate.total_committed)
+    utilization = round(committed / total * 100, 4) if total else 0.0
+    now = datetime.utcnow()
+
+    last = db.query(PoolSnapshot).order_by(PoolSnapshot.recorded_at.desc()).first()
+    if last is not None:
+        unchanged = (
+            last.total_invested == total
+            and last.total_committed == committed
+            and last.queued_loans == aggregate.queued_loans
+        )
+        stale = heartbeat is not None and now - last.recorded_at >= heartbeat
+        if unchanged and not stale:
+            return None
+
+    snapshot = PoolSnapshot(
+        recorded_at=now,
+        total_invested=total,
+        total_committed=committed,
+        utilization=utilization,
+        queued_loans=int(aggregate.queued_loans),
+    )
+    db.add(snapshot)
+    db.commit()
+    return snapshot
+
+
+def downsample_pool_history(db: Session, inicio: datetime, fim: datetime, buckets: int) -> list[dict]:
+    """Agrupa os pontos de [inicio, fim) em ate ``buckets`` faixas com min/max/media.
+
+    ``inicio`` e ``fim`` sao datetimes UTC sem timezone, como ``recorded_at``.
+    O agrupamento roda no banco, entao o tamanho da resposta depende apenas de
+    ``buckets`` e nao da quantidade de pontos no intervalo.
+    """
+    # Alguns bancos (SQLite) truncam o epoch em segundos inteiros; a origem e
+    # arredondada para baixo e a largura ganha 1s para nenhum ponto cair fora.
+    origin = math.floor((inicio - EPOCH).total_seconds())
+    width = ((fim - EPOCH).total_seconds() - origin + 1) / buckets
+    offset = func.extract("epoch", PoolSnapshot.recorded_at) - origin
+    bucket = func.floor(offset / width).label("bucket")
+
+    rows = db.execute(
+        select(
+            bucket,
+            func.count(PoolSnapshot.id).label("amostras"),
+            func.min(PoolSnapshot.utilization).label("utilizacao_min"),
+            func.max(PoolSnapshot.utilization).label("utilizacao_max"),
+            func.avg(PoolSnapshot.utilization).label("utilizacao_media"),
+            func.avg(PoolSnapshot.total_invested).label("saldo_total_medio"),
+            func.avg(PoolSnapshot.total_committed).label("saldo_emprestado_medio"),
+            func.max(PoolSnapshot.queued_loans).label("fila_max"),
+        )
+        .where(PoolSnapshot.recorded_at >= inicio, PoolSnapshot.recorded_at < fim)
+        .group_by(bucket)
+        .order_by(bucket)
+    ).all()
+
+    return [
+        {
+            "inicio": EPOCH + timedelta(seconds=origin + int(row.bucket) * width),
+            "amostras": row.amostras,
+            "utilizacao_min": round(row.utilizacao_min, 2),
+            "utilizacao_max": round(row.utilizacao_max, 2),
+            "utilizacao_media": round(row.utilizacao_media, 2),
+            "saldo_total_medio": round(row.saldo_total_medio, 2),
+            "saldo_emprestado_medio": round(row.saldo_emprestado_medio, 2),
+            "fila_max": row.fila_max,
+        }
+        for row in rows
+    ]
+
+
+class PoolHistoryRecorder:
+    """Grava um ponto da serie a cada ``interval_seconds`` (se o pool mudou)."""
+
+    def __init__(
+        self,
+        interval_seconds: float = POOL_HISTORY_INTERVAL_SECONDS,
+        heartbeat_seconds: float = POOL_HISTORY_HEARTBEAT_SECONDS,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.heartbeat = timedelta(seconds=heartbeat_seconds)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self._record)
+            except Exception as exc:  # pragma: no cover - logging defensivo
+                logger.exception("Pool snapshot failed: %s", exc)
+            await asyncio.sleep(self.interval_seconds)
+
+    def _record(self) -> None:
+        db = SessionLocal()
+        try:
+            record_pool_snapshot(db, heartbeat=self.heartbeat)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+pool_history_recorder = PoolHistoryRecorder()
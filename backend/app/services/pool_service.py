@@ -1,34 +1,180 @@
 ﻿"""Pool and loan queue helpers."""
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import func
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from app.models import Investment, Loan
+from app.models import Investment, Loan, PoolAggregate, SequenceCounter, loan_queue_position_seq
+from app.services.admission_policy import AdmissionPolicy, QueuedLoan, get_admission_policy
 
 POOL_THRESHOLD = 0.8
+POOL_AGGREGATE_ID = 1
+COMMITTED_STATUSES = ("pendente", "ativo")
+QUEUED_STATUS = "fila"
+AGGREGATE_TOLERANCE = 0.01
+QUEUE_SCAN_BATCH = 100
+QUEUE_POSITION_COUNTER = "loan_queue_position"
 
+PoolItemState = tuple[Optional[str], float]
 
-def get_pool_totals(db: Session) -> tuple[float, float]:
+
+def compute_pool_aggregate(db: Session) -> dict:
+    """Recalcula os totais do pool em uma unica consulta sobre investments e loans."""
     total_invested = (
-        db.query(func.coalesce(func.sum(Investment.valor), 0.0))
-        .filter(Investment.status == "ativo")
-        .scalar()
-    ) or 0.0
+        select(func.coalesce(func.sum(Investment.valor), 0.0))
+        .where(Investment.status == "ativo")
+        .scalar_subquery()
+    )
     total_committed = (
-        db.query(func.coalesce(func.sum(Loan.valor), 0.0))
-        .filter(Loan.status.in_(["pendente", "ativo"]))
-        .scalar()
-    ) or 0.0
-    return float(total_invested), float(total_committed)
+        select(func.coalesce(func.sum(Loan.valor), 0.0))
+        .where(Loan.status.in_(COMMITTED_STATUSES))
+        .scalar_subquery()
+    )
+    active_investors = (
+        select(func.count(func.distinct(Investment.user_id)))
+        .where(Investment.status == "ativo")
+        .scalar_subquery()
+    )
+    queued_loans = (
+        select(func.count(Loan.id))
+        .where(Loan.status == QUEUED_STATUS)
+        .scalar_subquery()
+    )
+    row = db.execute(
+        select(
+            total_invested.label("total_invested"),
+            total_committed.label("total_committed"),
+            active_investors.label("active_investors"),
+            queued_loans.label("queued_loans"),
+        )
+    ).one()
+    return {
+        "total_invested": float(row.total_invested or 0.0),
+        "total_committed": float(row.total_committed or 0.0),
+        "active_investors": int(row.active_investors or 0),
+        "queued_loans": int(row.queued_loans or 0),
+    }
+
+
+def rebuild_pool_aggregate(db: Session) -> PoolAggregate:
+    """Regrava a linha agregada a partir das tabelas (nao faz commit)."""
+    db.flush()
+    values = compute_pool_aggregate(db)
+    aggregate = db.get(PoolAggregate, POOL_AGGREGATE_ID)
+    if aggregate is None:
+        aggregate = PoolAggregate(id=POOL_AGGREGATE_ID)
+    for key, value in values.items():
+        setattr(aggregate, key, value)
+    aggregate.updated_at = datetime.utcnow()
+    db.add(aggregate)
+    db.flush()
+    return aggregate
+
+
+def verify_pool_aggregate(db: Session) -> dict:
+    """Compara a linha agregada com os totais reais e retorna as divergencias."""
+    aggregate = db.get(PoolAggregate, POOL_AGGREGATE_ID)
+    expected = compute_pool_aggregate(db)
+    drift = {}
+    for key, value in expected.items():
+        stored = getattr(aggregate, key) if aggregate is not None else None
+        if stored is None or abs(stored - value) > AGGREGATE_TOLERANCE:
+            drift[key] = {"armazenado": stored, "esperado": value}
+    return drift
+
+
+def get_pool_aggregate(db: Session) -> PoolAggregate:
+    aggregate = db.get(PoolAggregate, POOL_AGGREGATE_ID)
+    if aggregate is None:
+        aggregate = rebuild_pool_aggregate(db)
+    return aggregate
+
+
+def adjust_pool_aggregate(
+    db: Session,
+    *,
+    invested: float = 0.0,
+    committed: float = 0.0,
+    investors: int = 0,
+    queued: int = 0,
+) -> None:
+    """Aplica deltas na linha agregada dentro da transacao corrente.
+
+    O UPDATE e relativo (coluna = coluna + delta) para nao perder
+    incrementos concorrentes. Se a linha ainda nao existir ela e
+    reconstruida a partir do estado ja flushado, que inclui a mudanca.
+    """
+    if not (invested or committed or investors or queued):
+        return
+    db.flush()
+    aggregate = db.get(PoolAggregate, POOL_AGGREGATE_ID)
+    if aggregate is None:
+        rebuild_pool_aggregate(db)
+        return
+    db.query(PoolAggregate).filter(PoolAggregate.id == POOL_AGGREGATE_ID).update(
+        {
+            PoolAggregate.total_invested: PoolAggregate.total_invested + invested,
+            PoolAggregate.total_committed: PoolAggregate.total_committed + committed,
+            PoolAggregate.active_investors: PoolAggregate.active_investors + investors,
+            PoolAggregate.queued_loans: PoolAggregate.queued_loans + queued,
+            PoolAggregate.updated_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+    db.expire(aggregate)
+
+
+def item_state(item: Optional[Investment | Loan]) -> PoolItemState:
+    """Captura (status, valor) de um investimento/emprestimo antes de altera-lo."""
+    if item is None:
+        return None, 0.0
+    return item.status, float(item.valor or 0.0)
+
+
+def record_investment_change(
+    db: Session,
+    investment: Investment,
+    before: PoolItemState,
+    after: PoolItemState,
+) -> None:
+    was_active = before[0] == "ativo"
+    is_active = after[0] == "ativo"
+    invested = (after[1] if is_active else 0.0) - (before[1] if was_active else 0.0)
+
+    investors = 0
+    if was_active != is_active:
+        other_active = (
+            db.query(Investment.id)
+            .filter(
+                Investment.user_id == investment.user_id,
+                Investment.status == "ativo",
+                Investment.id != investment.id,
+            )
+            .first()
+        )
+        if other_active is None:
+            investors = 1 if is_active else -1
+
+    adjust_pool_aggregate(db, invested=invested, investors=investors)
+
+
+def record_loan_change(db: Session, before: PoolItemState, after: PoolItemState) -> None:
+    committed = (after[1] if after[0] in COMMITTED_STATUSES else 0.0) - (
+        before[1] if before[0] in COMMITTED_STATUSES else 0.0
+    )
+    queued = int(after[0] == QUEUED_STATUS) - int(before[0] == QUEUED_STATUS)
+    adjust_pool_aggregate(db, committed=committed, queued=queued)
+
+
+def get_pool_totals(db: Session) -> tuple[float, float]:
+    aggregate = get_pool_aggregate(db)
+    return float(aggregate.total_invested), float(aggregate.total_committed)
 
 
 def active_investors_count(db: Session) -> int:
-    return (
-        db.query(func.count(func.distinct(Investment.user_id)))
-        .filter(Investment.status == "ativo")
-        .scalar()
-    ) or 0
+    return int(get_pool_aggregate(db).active_investors)
 
 
 def should_enqueue(db: Session, loan_value: float) -> bool:
@@ -39,47 +185,87 @@ def should_enqueue(db: Session, loan_value: float) -> bool:
 
 
 def next_queue_position(db: Session) -> int:
-    current = (
-        db.query(func.coalesce(func.max(Loan.queue_position), 0))
-        .filter(Loan.status == "fila")
-        .scalar()
-    ) or 0
-    return int(current) + 1
+    """Aloca a proxima posicao da fila sem varrer loans.
+
+    No PostgreSQL usa a sequence ``loan_queue_position_seq`` (sem locks e
+    sem duplicatas entre transacoes concorrentes). No SQLite (sem sequences)
+    faz um incremento atomico no contador ``sequence_counters``.
+    """
+    if db.get_bind().dialect.supports_sequences:
+        return int(db.execute(select(loan_queue_position_seq.next_value())).scalar_one())
+
+    value = _increment_queue_counter(db)
+    if value is None:
+        # Primeiro uso num banco criado via create_all: semeia a partir da fila
+        # atual. ON CONFLICT DO NOTHING: se outra transacao semeou antes, o
+        # incremento abaixo parte do valor dela em vez de falhar na PK
+        current = db.query(func.coalesce(func.max(Loan.queue_position), 0)).scalar() or 0
+        db.execute(
+            sqlite_insert(SequenceCounter)
+            .values(name=QUEUE_POSITION_COUNTER, value=int(current))
+            .on_conflict_do_nothing(index_elements=[SequenceCounter.name])
+        )
+        value = _increment_queue_counter(db)
+    return int(value)
 
 
-def process_loan_queue(db: Session) -> bool:
+def _increment_queue_counter(db: Session) -> Optional[int]:
+    return db.execute(
+        update(SequenceCounter)
+        .where(SequenceCounter.name == QUEUE_POSITION_COUNTER)
+        .values(value=SequenceCounter.value + 1)
+        .returning(SequenceCounter.value)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+
+def process_loan_queue(db: Session, policy: Optional[AdmissionPolicy] = None) -> int:
+    """Admite emprestimos da fila enquanto houver capacidade; retorna quantos.
+
+    A fila e lida em ordem por cursor no servidor (id, valor e created_at) e
+    a politica de admissao consome o cursor so ate decidir, entao o custo
+    cresce com o numero de candidatos examinados e nao com o tamanho da fila.
+    A promocao e feita com um unico UPDATE ... WHERE id IN (...).
+    """
     total, committed = get_pool_totals(db)
     if total <= 0:
-        return False
+        return 0
 
-    updated = False
-    queue = (
-        db.query(Loan)
-        .filter(Loan.status == "fila")
+    policy = policy or get_admission_policy()
+    queue = db.execute(
+        select(Loan.id, Loan.valor, Loan.created_at)
+        .where(Loan.status == QUEUED_STATUS)
         .order_by(Loan.queue_position.asc(), Loan.created_at.asc())
-        .all()
+        .execution_options(stream_results=True, yield_per=QUEUE_SCAN_BATCH)
     )
+    now = datetime.utcnow()
+    try:
+        candidates = (
+            QueuedLoan(id=loan_id, valor=valor, created_at=created_at or now)
+            for loan_id, valor, created_at in queue
+        )
+        admitted = policy.select(candidates, total * POOL_THRESHOLD - committed, now)
+    finally:
+        queue.close()
 
-    for loan in queue:
-        if committed + loan.valor <= total * POOL_THRESHOLD:
-            loan.status = "pendente"
-            loan.queue_position = None
-            loan.updated_at = datetime.utcnow()
-            db.add(loan)
-            committed += loan.valor
-            updated = True
-        else:
-            break
+    if not admitted:
+        return 0
 
-    if updated:
-        db.commit()
-    return updated
+    admitted_ids = [loan.id for loan in admitted]
+    promoted = db.execute(
+        update(Loan)
+        .where(Loan.id.in_(admitted_ids), Loan.status == QUEUED_STATUS)
+        .values(status="pendente", queue_position=None, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if promoted == len(admitted_ids):
+        adjust_pool_aggregate(db, committed=sum(loan.valor for loan in admitted), queued=-promoted)
+    else:
+        # Outra transacao mexeu em parte da fila no meio da passada
+        rebuild_pool_aggregate(db)
+    db.commit()
+    return promoted
 
 
 def queued_loans_count(db: Session) -> int:
-    return (
-        db.query(func.count(Loan.id))
-        .filter(Loan.status == "fila")
-        .scalar()
-    ) or 0
-
+    return int(get_pool_aggregate(db).queued_loans)
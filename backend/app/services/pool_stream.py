@@ -0,0 +1,138 @@
+"""Server-sent events fan-out for live pool status."""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+POOL_STREAM_FALLBACK_SECONDS = float(os.getenv("POOL_STREAM_FALLBACK_SECONDS", "10"))
+POOL_STREAM_KEEPALIVE_SECONDS = float(os.getenv("POOL_STREAM_KEEPALIVE_SECONDS", "15"))
+POOL_STREAM_RETRY_SECONDS = float(os.getenv("POOL_STREAM_RETRY_SECONDS", "0.5"))
+POOL_STREAM_RETRY_MAX_SECONDS = float(os.getenv("POOL_STREAM_RETRY_MAX_SECONDS", "30"))
+SUBSCRIBER_BUFFER = 16
+
+logger = logging.getLogger("pool_stream")
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class PoolStatusBroadcaster:
+    """Um unico produtor calcula o status do pool e distribui para N assinantes.
+
+    O produtor so existe enquanto ha assinantes. Ele acorda quando ``notify``
+    e chamado (escritas no pool) ou, como rede de seguranca para mudancas
+    feitas por outros processos, a cada ``fallback_seconds``. Apenas os campos
+    que mudaram sao enviados como ``delta``; quem conecta recebe antes um
+    ``snapshot`` completo. Se o calculo falha, o produtor registra o erro e
+    tenta de novo com espera exponencial, sem encerrar a task.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[dict]],
+        fallback_seconds: float = POOL_STREAM_FALLBACK_SECONDS,
+        keepalive_seconds: float = POOL_STREAM_KEEPALIVE_SECONDS,
+        retry_seconds: float = POOL_STREAM_RETRY_SECONDS,
+        retry_max_seconds: float = POOL_STREAM_RETRY_MAX_SECONDS,
+    ) -> None:
+        self._loader = loader
+        self.fallback_seconds = fallback_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.retry_seconds = retry_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._subscribers: set[asyncio.Queue] = set()
+        self._state: Optional[dict] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._producer: Optional[asyncio.Task] = None
+        self.computations = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def notify(self) -> None:
+        """Sinaliza que o pool mudou; seguro para chamar de qualquer thread."""
+        if self._loop is None or self._changed is None or not self._subscribers:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._changed.set()
+        else:
+            self._loop.call_soon_threadsafe(self._changed.set)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+        self._subscribers.add(queue)
+        self._ensure_producer()
+        try:
+            if self._state is None:
+                await self._refresh()
+            yield format_sse("snapshot", self._state)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield message
+        finally:
+            self._subscribers.discard(queue)
+            if not self._subscribers and self._producer is not None:
+                self._producer.cancel()
+                self._producer = None
+                self._state = None
+
+    def _ensure_producer(self) -> None:
+        if self._producer is not None and not self._producer.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._producer = self._loop.create_task(self._produce())
+
+    async def _refresh(self) -> dict:
+        state = await self._loader()
+        self.computations += 1
+        previous, self._state = self._state, state
+        if previous is None:
+            return {}
+        return {key: value for key, value in state.items() if previous.get(key) != value}
+
+    async def _produce(self) -> None:
+        while self._subscribers:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self.fallback_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            had_state = self._state is not None
+            try:
+                delta = await self._refresh()
+            except Exception as exc:
+                self.failures += 1
+                self.consecutive_failures += 1
+                logger.exception("Pool stream refresh failed (tentativa %s): %s", self.consecutive_failures, exc)
+                delay = min(self.retry_max_seconds, self.retry_seconds * 2 ** (self.consecutive_failures - 1))
+                await asyncio.sleep(delay)
+                self._changed.set()
+                continue
+            self.consecutive_failures = 0
+            if had_state and delta:
+                self._publish(format_sse("delta", delta))
+
+    def _publish(self, message: str) -> None:
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Assinante lento: descarta o backlog e reenvia o estado completo
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(format_sse("snapshot", self._state))
+            else:
+                queue.put_nowait(message)
@@ -0,0 +1,102 @@
+﻿"""TTL cache of authenticated principals, keyed by user id."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """So as colunas de users usadas na autorizacao das rotas."""
+
+    id: int
+    is_admin: bool
+    is_active: bool
+
+
+class PrincipalCache:
+    """Cache LRU de ``Principal`` com TTL e invalidacao por usuario.
+
+    ``get_current_user`` roda no threadpool, entao o acesso e protegido por
+    lock e o ``loader`` roda fora dele. Cada invalidacao incrementa a
+    geracao: uma leitura iniciada antes dela nao grava o valor antigo. O TTL
+    limita por quanto tempo outro processo (worker) enxerga um usuario
+    alterado, ja que a invalidacao so alcanca o processo que fez a mudanca.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._data: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int, loader: Callable[[], Optional[Principal]]) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        principal = loader()
+        # Usuario inexistente nao e cacheado: o 401 continua consultando o banco
+        if principal is None:
+            return None
+        with self._lock:
+            if generation == self._generation:
+                self._data[user_id] = (now + self.ttl_seconds, principal)
+                self._data.move_to_end(user_id)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return principal
+
+    def peek(self, user_id: int) -> Optional[Principal]:
+        """Principal ja em cache e dentro do TTL, sem carregar nem contar acerto/falha."""
+        with self._lock:
+            entry = self._data.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._data.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "tamanho": len(self._data),
+                "capacidade": self.maxsize,
+                "ttl_segundos": self.ttl_seconds,
+                "acertos": self.hits,
+                "falhas": self.misses,
+                "descartes": self.evictions,
+                "invalidacoes": self.invalidations,
+                "taxa_acerto": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_SIZE)
@@ -0,0 +1,171 @@
+"""Background worker that admits queued loans out of band."""
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.db import SessionLocal
+from app.services.admission_policy import AdmissionPolicy, get_admission_policy
+from app.services.pool_cache import pool_snapshot_cache
+from app.services.pool_service import process_loan_queue
+
+LOAN_QUEUE_COALESCE_SECONDS = float(os.getenv("LOAN_QUEUE_COALESCE_SECONDS", "0.05"))
+LOAN_QUEUE_RETRY_SECONDS = float(os.getenv("LOAN_QUEUE_RETRY_SECONDS", "0.5"))
+LOAN_QUEUE_RETRY_MAX_SECONDS = float(os.getenv("LOAN_QUEUE_RETRY_MAX_SECONDS", "30"))
+
+logger = logging.getLogger("loan_queue_worker")
+
+
+class LoanQueueWorker:
+    """Recebe sinais de "pool mudou" e roda a admissao da fila em background.
+
+    Sinais que chegam enquanto uma passada esta pendente ou em execucao sao
+    agrupados: uma rajada de escritas resulta em uma unica passada extra.
+    Uma passada que falha e repetida com espera exponencial (de
+    ``retry_seconds`` ate ``retry_max_seconds``), sem depender de um novo sinal.
+    A politica de admissao e resolvida do ambiente uma vez, em ``start``.
+    """
+
+    def __init__(
+        self,
+        coalesce_seconds: float = LOAN_QUEUE_COALESCE_SECONDS,
+        retry_seconds: float = LOAN_QUEUE_RETRY_SECONDS,
+        retry_max_seconds: float = LOAN_QUEUE_RETRY_MAX_SECONDS,
+    ) -> None:
+        self.coalesce_seconds = coalesce_seconds
+        self.retry_seconds = retry_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.policy: Optional[AdmissionPolicy] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending_since: Optional[float] = None
+        self.signals = 0
+        self.passes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.admitted_total = 0
+        self.last_admitted = 0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.last_pass_seconds = 0.0
+        self.last_pass_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        if self.policy is None:
+            self.policy = get_admission_policy()
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+        # Uma passada inicial cobre sinais perdidos enquanto o app estava parado
+        self.signal()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def signal(self) -> None:
+        """Avisa que o pool mudou; seguro para chamar de qualquer thread."""
+        self.signals += 1
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        if self._loop is None or self._event is None:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._event.set)
+
+    async def _run(self) -> None:
+        while True:
+            await self._event.wait()
+            if self.coalesce_seconds > 0:
+                await asyncio.sleep(self.coalesce_seconds)
+            self._event.clear()
+            pending_since = self._pending_since
+            self._pending_since = None
+            if not await self._run_pass(pending_since):
+                await self._retry(pending_since)
+
+    async def _retry(self, pending_since: Optional[float]) -> None:
+        """Reagenda a passada que falhou; o sinal original ja foi consumido."""
+        if self._pending_since is None:
+            self._pending_since = pending_since if pending_since is not None else time.monotonic()
+        delay = min(self.retry_max_seconds, self.retry_seconds * 2 ** (self.consecutive_failures - 1))
+        await asyncio.sleep(delay)
+        self._event.set()
+
+    async def _run_pass(self, pending_since: Optional[float]) -> bool:
+        started = time.monotonic()
+        try:
+            admitted = await run_in_threadpool(self._process)
+        except Exception as exc:
+            self.failures += 1
+            self.consecutive_failures += 1
+            logger.exception("Loan queue pass failed (tentativa %s): %s", self.consecutive_failures, exc)
+            return False
+        finished = time.monotonic()
+
+        self.consecutive_failures = 0
+        self.passes += 1
+        self.last_admitted = admitted
+        self.admitted_total += admitted
+        self.last_pass_seconds = finished - started
+        self.last_pass_at = time.time()
+        if pending_since is not None:
+            self.last_lag_seconds = finished - pending_since
+            self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+        if admitted:
+            pool_snapshot_cache.invalidate()
+            logger.info("Loan queue pass admitted %s loans", admitted)
+        return True
+
+    def _process(self) -> int:
+        db = SessionLocal()
+        try:
+            return process_loan_queue(db, self.policy)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "politica": self.policy.name if self.policy is not None else None,
+            "pendente": self._pending_since is not None,
+            "sinais": self.signals,
+            "passadas": self.passes,
+            "falhas": self.failures,
+            "falhas_consecutivas": self.consecutive_failures,
+            "admitidos_total": self.admitted_total,
+            "admitidos_ultima_passada": self.last_admitted,
+            "media_admitidos_por_passada": round(self.admitted_total / self.passes, 4) if self.passes else 0.0,
+            "lag_ultima_passada_segundos": round(self.last_lag_seconds, 6),
+            "lag_maximo_segundos": round(self.max_lag_seconds, 6),
+            "duracao_ultima_passada_segundos": round(self.last_pass_seconds, 6),
+            "ultima_passada_em": self.last_pass_at,
+        }
+
+
+loan_queue_worker = LoanQueueWorker()
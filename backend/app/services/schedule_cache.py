@@ -0,0 +1,89 @@
+"""Bounded LRU caches for loan and investment schedules."""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+SCHEDULE_CACHE_SIZE = int(os.getenv("SCHEDULE_CACHE_SIZE", "2048"))
+
+
+class LRUCache:
+    """Cache LRU limitado a ``maxsize`` entradas, com contadores.
+
+    As rotas async e o threadpool compartilham as instancias, entao o acesso
+    ao dicionario e protegido por lock. O ``loader`` roda fora do lock: duas
+    falhas simultaneas na mesma chave calculam o valor duas vezes, o que e
+    inofensivo para calculos puros como cronogramas.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove as chaves que satisfazem ``predicate``; devolve quantas sairam."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "tamanho": len(self._data),
+                "capacidade": self.maxsize,
+                "acertos": self.hits,
+                "falhas": self.misses,
+                "descartes": self.evictions,
+                "invalidacoes": self.invalidations,
+                "taxa_acerto": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def lru_cache_metrics(cached_function) -> dict:
+    """Mesmo formato de ``LRUCache.metrics`` para funcoes com ``functools.lru_cache``."""
+    info = cached_function.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "tamanho": info.currsize,
+        "capacidade": info.maxsize,
+        "acertos": info.hits,
+        "falhas": info.misses,
+        "taxa_acerto": round(info.hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+# Chave: (valor, taxa_juros, prazo_meses, sistema, primeira_parcela)
+loan_schedule_cache = LRUCache(SCHEDULE_CACHE_SIZE)
+# Chave: (valor, taxa_rendimento, dias, tipo)
+investment_schedule_cache = LRUCache(SCHEDULE_CACHE_SIZE)
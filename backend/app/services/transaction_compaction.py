@@ -0,0 +1,196 @@
+﻿"""Compaction of per-run accrual transactions into monthly summaries."""
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import ArchivedTransaction, Transaction
+
+ACCRUAL_TRANSACTION_TYPES = ("rendimento_acumulado", "juros_acumulado")
+COMPACTION_WALLET_BATCH = 500
+
+_DETAIL_COLUMNS = (
+    Transaction.id,
+    Transaction.wallet_id,
+    Transaction.tipo,
+    Transaction.valor,
+    Transaction.descricao,
+    Transaction.related_investment_id,
+    Transaction.related_loan_id,
+    Transaction.created_at,
+)
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _detail_filter(inicio: datetime, fim: datetime):
+    # Linhas de resumo ja geradas nunca sao compactadas de novo
+    is_summary = exists().where(ArchivedTransaction.summary_transaction_id == Transaction.id)
+    return (
+        Transaction.tipo.in_(ACCRUAL_TRANSACTION_TYPES),
+        Transaction.created_at >= inicio,
+        Transaction.created_at < fim,
+        ~is_summary,
+    )
+
+
+def _summary_row(periodo: str, details: list) -> dict:
+    first = details[0]
+    alvo = (
+        f"investimento {first.related_investment_id}"
+        if first.related_investment_id is not None
+        else f"emprestimo {first.related_loan_id}"
+    )
+    # Cada lancamento ja esta em centavos; a soma em Decimal preserva o total exato
+    valor = sum((Decimal(str(row.valor)) for row in details), Decimal(0))
+    return {
+        "wallet_id": first.wallet_id,
+        "tipo": first.tipo,
+        "valor": float(valor),
+        "descricao": f"Juros acumulados {periodo} ({len(details)} lancamentos consolidados) {alvo}",
+        "related_investment_id": first.related_investment_id,
+        "related_loan_id": first.related_loan_id,
+        # Mantem o resumo na mesma posicao do historico ordenado por data
+        "created_at": max(row.created_at for row in details),
+    }
+
+
+def _compact_wallets(db: Session, wallet_ids: list[int], inicio: datetime, fim: datetime) -> tuple[int, int]:
+    rows = db.execute(
+        select(*_DETAIL_COLUMNS)
+        .where(Transaction.wallet_id.in_(wallet_ids), *_detail_filter(inicio, fim))
+        .order_by(
+            Transaction.wallet_id,
+            Transaction.tipo,
+            Transaction.related_investment_id,
+            Transaction.related_loan_id,
+            Transaction.created_at,
+            Transaction.id,
+        )
+    ).all()
+
+    periodo = inicio.strftime("%Y-%m")
+    groups = []
+    for _, group in groupby(
+        rows, key=lambda row: (row.wallet_id, row.tipo, row.related_investment_id, row.related_loan_id)
+    ):
+        details = list(group)
+        if len(details) > 1:
+            groups.append(details)
+    if not groups:
+        return 0, 0
+
+    summary_ids = db.scalars(
+        insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+        [_summary_row(periodo, details) for details in groups],
+    ).all()
+    archived = [
+        {
+            "id": row.id,
+            "summary_transaction_id": summary_id,
+            "wallet_id": row.wallet_id,
+            "tipo": row.tipo,
+            "valor": row.valor,
+            "descricao": row.descricao,
+            "related_investment_id": row.related_investment_id,
+            "related_loan_id": row.related_loan_id,
+            "created_at": row.created_at,
+        }
+        for summary_id, details in zip(summary_ids, groups)
+        for row in details
+    ]
+    db.execute(insert(ArchivedTransaction), archived)
+    db.execute(
+        delete(Transaction).where(Transaction.id.in_([row["id"] for row in archived])),
+        execution_options={"synchronize_session": False},
+    )
+    return len(groups), len(archived)
+
+
+def compact_accrual_month(
+    db: Session, inicio: datetime, wallet_batch: int = COMPACTION_WALLET_BATCH
+) -> dict:
+    """Consolida os lancamentos de accrual do mes que comeca em ``inicio``.
+
+    Para cada carteira, tipo e investimento/emprestimo com mais de um
+    lancamento no mes, grava uma linha de resumo com a soma exata e move os
+    lancamentos para ``transactions_archive``. Faz commit a cada
+    ``wallet_batch`` carteiras; cada lote e atomico (resumo, arquivo e
+    remocao na mesma transacao).
+    """
+    fim = next_month(inicio)
+    summaries = 0
+    archived = 0
+    last_wallet_id = 0
+    while True:
+        wallet_ids = db.scalars(
+            select(Transaction.wallet_id)
+            .where(Transaction.wallet_id > last_wallet_id, *_detail_filter(inicio, fim))
+            .group_by(Transaction.wallet_id)
+            .order_by(Transaction.wallet_id)
+            .limit(wallet_batch)
+        ).all()
+        if not wallet_ids:
+            break
+        batch_summaries, batch_archived = _compact_wallets(db, wallet_ids, inicio, fim)
+        db.commit()
+        summaries += batch_summaries
+        archived += batch_archived
+        last_wallet_id = wallet_ids[-1]
+    return {"periodo": inicio.strftime("%Y-%m"), "resumos": summaries, "arquivados": archived}
+
+
+def compact_accrual_transactions(
+    db: Session, before: datetime, wallet_batch: int = COMPACTION_WALLET_BATCH
+) -> list[dict]:
+    """Compacta todos os meses fechados anteriores ao mes de ``before``."""
+    limite = month_start(before)
+    earliest = db.scalar(
+        select(func.min(Transaction.created_at)).where(
+            Transaction.tipo.in_(ACCRUAL_TRANSACTION_TYPES),
+            Transaction.created_at < limite,
+        )
+    )
+    results = []
+    inicio = month_start(earliest) if earliest else limite
+    while inicio < limite:
+        results.append(compact_accrual_month(db, inicio, wallet_batch))
+        inicio = next_month(inicio)
+    return results
+
+
+def is_compaction_summary(db: Session, transaction_id: int) -> bool:
+    """Se a transacao e um resumo mensal com lancamentos arquivados apontando para ela."""
+    return bool(
+        db.scalar(select(exists().where(ArchivedTransaction.summary_transaction_id == transaction_id)))
+    )
+
+
+def delete_wallet_archive(db: Session, wallet_id: int) -> int:
+    """Remove o arquivo de lancamentos da carteira antes de remover as transacoes dela.
+
+    ``summary_transaction_id`` referencia ``transactions`` sem ON DELETE: sem
+    isso a remocao em cascata da carteira viola a FK no PostgreSQL.
+    """
+    result = db.execute(
+        delete(ArchivedTransaction).where(ArchivedTransaction.wallet_id == wallet_id),
+        execution_options={"synchronize_session": False},
+    )
+    return result.rowcount
+
+
+def get_archived_details(db: Session, summary_transaction_id: int) -> list[ArchivedTransaction]:
+    return (
+        db.query(ArchivedTransaction)
+        .filter(ArchivedTransaction.summary_transaction_id == summary_transaction_id)
+        .order_by(ArchivedTransaction.created_at, ArchivedTransaction.id)
+        .all()
+    )
@@ -0,0 +1,46 @@
+﻿"""Wallet resolution helpers."""
+from typing import Iterable
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import Wallet
+
+
+def _insert_ignoring_existing(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(Wallet).on_conflict_do_nothing(index_elements=[Wallet.user_id])
+    if dialect == "sqlite":
+        return sqlite.insert(Wallet).on_conflict_do_nothing(index_elements=[Wallet.user_id])
+    return insert(Wallet)
+
+
+def resolve_wallet_ids(db: Session, user_ids: Iterable[int]) -> dict[int, int]:
+    """Retorna ``{user_id: wallet_id}`` para um lote de usuarios.
+
+    Carrega as carteiras existentes em uma consulta e cria as que faltam com
+    um unico INSERT em lote (saldo zero). Carteiras criadas ao mesmo tempo por
+    outra transacao sao ignoradas no INSERT e relidas em seguida, sem violar o
+    unique de ``user_id``. Nao faz commit.
+    """
+    wanted = set(user_ids)
+    if not wanted:
+        return {}
+    wallet_ids = dict(db.execute(select(Wallet.user_id, Wallet.id).where(Wallet.user_id.in_(wanted))).all())
+
+    missing = wanted - wallet_ids.keys()
+    if missing:
+        db.execute(_insert_ignoring_existing(db), [{"user_id": user_id, "saldo": 0.0} for user_id in sorted(missing)])
+        wallet_ids.update(
+            db.execute(select(Wallet.user_id, Wallet.id).where(Wallet.user_id.in_(missing))).all()
+        )
+    return wallet_ids
+
+
+def get_or_create_wallet(db: Session, user_id: int) -> Wallet:
+    wallet = db.query(Wallet).filter(Wallet.user_id == user_id).first()
+    if wallet:
+        return wallet
+    return db.get(Wallet, resolve_wallet_ids(db, [user_id])[user_id])
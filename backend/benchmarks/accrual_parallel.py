@@ -0,0 +1,151 @@
+"""
+Compara o accrual serial com o paralelo (--workers) em um banco semeado.
+
+Cria um banco SQLite temporario com usuarios, carteiras, investimentos e
+emprestimos sinteticos, copia o arquivo e roda o modo bulk serial em uma
+copia e o paralelo na outra, com a mesma data de referencia. Falha se
+saldos, datas de accrual ou transacoes divergirem.
+
+Uso: python benchmarks/accrual_parallel.py [--positions 20000] [--workers 4]
+"""
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import accrual_job  # noqa: E402
+from app.models import Base, Investment, Loan, User, Wallet  # noqa: E402
+
+REFERENCE = datetime(2025, 1, 31, 12, 0, 0)
+
+
+def seed(url: str, positions: int, seed_value: int) -> None:
+    rng = random.Random(seed_value)
+    users = max(positions // 4, 1)
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            User.__table__.insert(),
+            [
+                {"id": i, "email": f"user{i}@bench", "hashed_password": "x", "full_name": "bench", "cpf": str(i)}
+                for i in range(1, users + 1)
+            ],
+        )
+        # Parte dos usuarios sem carteira, para exercitar a criacao no job
+        conn.execute(Wallet.__table__.insert(), [{"user_id": i, "saldo": 0.0} for i in range(1, users + 1) if i % 5])
+        conn.execute(
+            Investment.__table__.insert(),
+            [
+                {
+                    "user_id": rng.randint(1, users),
+                    "valor": round(rng.uniform(10, 50_000), 2),
+                    "taxa_rendimento": rng.choice([0.10, 0.12, 0.135]),
+                    "rendimento_acumulado": 0.0,
+                    "status": rng.choice(["ativo", "ativo", "resgatado"]),
+                    "last_accrual_at": REFERENCE - timedelta(days=rng.randint(0, 40), hours=rng.randint(0, 23)),
+                    "created_at": REFERENCE - timedelta(days=50),
+                }
+                for _ in range(positions)
+            ],
+        )
+        conn.execute(
+            Loan.__table__.insert(),
+            [
+                {
+                    "user_id": rng.randint(1, users),
+                    "valor": round(rng.uniform(100, 20_000), 2),
+                    "valor_pago": round(rng.uniform(0, 25_000), 2) if rng.random() < 0.3 else 0.0,
+                    "taxa_juros": rng.choice([0.15, 0.20]),
+                    "interest_accrued": 0.0,
+                    "status": rng.choice(["ativo", "pendente", "fila", "pago"]),
+                    "last_accrual_at": REFERENCE - timedelta(days=rng.randint(0, 40)),
+                    "created_at": REFERENCE - timedelta(days=50),
+                }
+                for _ in range(positions)
+            ],
+        )
+    engine.dispose()
+
+
+def snapshot(url: str) -> tuple:
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        investments = conn.execute(
+            text("SELECT id, ROUND(rendimento_acumulado, 2), last_accrual_at FROM investments ORDER BY id")
+        ).all()
+        loans = conn.execute(
+            text("SELECT id, ROUND(interest_accrued, 2), last_accrual_at FROM loans ORDER BY id")
+        ).all()
+        # Ids de carteira dependem da ordem de criacao; compara por usuario
+        transactions = sorted(
+            conn.execute(
+                text(
+                    "SELECT w.user_id, t.tipo, ROUND(t.valor, 2), t.descricao, "
+                    "t.related_investment_id, t.related_loan_id "
+                    "FROM transactions t JOIN wallets w ON w.id = t.wallet_id"
+                )
+            ).all()
+        )
+        wallets = conn.execute(text("SELECT user_id FROM wallets ORDER BY user_id")).all()
+    engine.dispose()
+    return investments, loans, transactions, wallets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=20_000, help="investimentos e emprestimos semeados (cada)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=accrual_job.BULK_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="accrual_bench_"))
+    try:
+        serial_url = f"sqlite:///{workdir / 'serial.db'}"
+        parallel_url = f"sqlite:///{workdir / 'parallel.db'}"
+        seed(serial_url, args.positions, args.seed)
+        shutil.copy(workdir / "serial.db", workdir / "parallel.db")
+
+        started = time.perf_counter()
+        engine = create_engine(serial_url)
+        with Session(engine) as db:
+            serial_investments = accrual_job.bulk_process_investments(db, now=REFERENCE, batch_size=args.chunk_size)
+            serial_loans = accrual_job.bulk_process_loans(db, now=REFERENCE, batch_size=args.chunk_size)
+            db.commit()
+        engine.dispose()
+        serial_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        summaries = accrual_job.run_parallel_accrual(
+            args.workers, chunk_size=args.chunk_size, database_url=parallel_url, now=REFERENCE
+        )
+        parallel_seconds = time.perf_counter() - started
+
+        parallel_investments = sum(summary["investimentos"] for summary in summaries)
+        parallel_loans = sum(summary["emprestimos"] for summary in summaries)
+        print(f"{'modo':<10}{'investimentos':>15}{'emprestimos':>13}{'segundos':>10}")
+        print(f"{'serial':<10}{serial_investments:>15}{serial_loans:>13}{serial_seconds:>10.2f}")
+        print(f"{'paralelo':<10}{parallel_investments:>15}{parallel_loans:>13}{parallel_seconds:>10.2f}")
+        for summary in summaries:
+            first, last = summary["usuarios"]
+            print(f"  usuarios {first}-{last}: {summary['investimentos']} investimentos, {summary['emprestimos']} emprestimos")
+
+        assert (serial_investments, serial_loans) == (parallel_investments, parallel_loans), "totais divergem"
+        assert snapshot(serial_url) == snapshot(parallel_url), "estado final diverge"
+        print("OK: serial e paralelo produzem o mesmo resultado")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark das politicas de admissao da fila de emprestimos.
+
+Simula um pool com capacidade fixa recebendo emprestimos sinteticos
+(valores log-normais com alguns pedidos grandes) e compara utilizacao,
+throughput, espera e custo por passada de cada politica.
+
+Uso: python benchmarks/admission_policies.py [--ticks 2000] [--seed 42]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.admission_policy import (  # noqa: E402
+    BestFitPolicy,
+    FifoPolicy,
+    QueuedLoan,
+    SkipAheadPolicy,
+)
+
+POOL_TOTAL = 1_000_000.0
+THRESHOLD = 0.8
+TICK = timedelta(hours=1)
+
+
+def synthetic_arrivals(ticks: int, seed: int, max_per_tick: int) -> list[list[float]]:
+    rng = random.Random(seed)
+    arrivals = []
+    for _ in range(ticks):
+        batch = []
+        for _ in range(rng.randint(0, max_per_tick)):
+            valor = rng.lognormvariate(9.2, 0.9)
+            if rng.random() < 0.05:
+                valor *= 8
+            batch.append(round(min(valor, POOL_TOTAL * THRESHOLD), 2))
+        arrivals.append(batch)
+    return arrivals
+
+
+def simulate(policy, arrivals: list[list[float]], seed: int) -> dict:
+    rng = random.Random(seed + 1)
+    start = datetime(2025, 1, 1)
+    queue: list[QueuedLoan] = []
+    active: list[tuple[int, float]] = []
+    committed = 0.0
+    admitted_total = 0
+    waits: list[float] = []
+    utilization: list[float] = []
+    pass_seconds = 0.0
+    next_id = 1
+
+    for tick, batch in enumerate(arrivals):
+        now = start + tick * TICK
+        still_active = []
+        for ends_at, valor in active:
+            if ends_at <= tick:
+                committed -= valor
+            else:
+                still_active.append((ends_at, valor))
+        active = still_active
+
+        for valor in batch:
+            queue.append(QueuedLoan(id=next_id, valor=valor, created_at=now))
+            next_id += 1
+
+        t0 = time.perf_counter()
+        chosen = policy.select(iter(queue), POOL_TOTAL * THRESHOLD - committed, now)
+        pass_seconds += time.perf_counter() - t0
+
+        if chosen:
+            chosen_ids = {loan.id for loan in chosen}
+            queue = [loan for loan in queue if loan.id not in chosen_ids]
+            for loan in chosen:
+                committed += loan.valor
+                active.append((tick + rng.randint(24, 24 * 4), loan.valor))
+                waits.append((now - loan.created_at) / TICK)
+            admitted_total += len(chosen)
+        utilization.append(committed / POOL_TOTAL)
+
+    waits.sort()
+    return {
+        "admitidos": admitted_total,
+        "utilizacao_media": statistics.fmean(utilization),
+        "espera_media_h": statistics.fmean(waits) if waits else 0.0,
+        "espera_p99_h": waits[int(len(waits) * 0.99) - 1] if waits else 0.0,
+        "fila_final": len(queue),
+        "us_por_passada": pass_seconds / len(arrivals) * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--aging-hours", type=float, default=72)
+    args = parser.parse_args()
+
+    policies = [
+        FifoPolicy(),
+        SkipAheadPolicy(max_skips=20),
+        BestFitPolicy(aging=timedelta(hours=args.aging_hours), window=1000),
+    ]
+
+    for label, max_per_tick in (("carga moderada", 1), ("carga saturada", 2)):
+        arrivals = synthetic_arrivals(args.ticks, args.seed, max_per_tick)
+        print(f"\n== {label} ({sum(len(b) for b in arrivals)} pedidos em {args.ticks} ticks de 1h) ==")
+        print(f"{'politica':<12} {'admitidos':>10} {'util. media':>12} {'espera med(h)':>14} "
+              f"{'espera p99(h)':>14} {'fila final':>11} {'us/passada':>11}")
+        for policy in policies:
+            r = simulate(policy, arrivals, args.seed)
+            print(f"{policy.name:<12} {r['admitidos']:>10} {r['utilizacao_media']:>12.2%} {r['espera_media_h']:>14.1f} "
+                  f"{r['espera_p99_h']:>14.1f} {r['fila_final']:>11} {r['us_por_passada']:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Confere e mede a projecao de fluxo de caixa da carteira (GET /pool/cashflow).
+
+Semeia um banco SQLite temporario com emprestimos ativos sinteticos, mede
+load_loan_book + project_cashflow na carteira inteira e confere uma amostra
+contra a referencia: o cronograma de calculate_loan_preview de cada
+emprestimo, com valor_pago quitando as parcelas em ordem, somado por mes.
+
+Uso: python benchmarks/cashflow_projection.py [--loans 100000] [--months 24]
+"""
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.models import Base, Loan, User  # noqa: E402
+from app.schemas import LoanPreviewRequest  # noqa: E402
+from app.services.cashflow_projection import load_loan_book, project_cashflow  # noqa: E402
+from app.services.finance_service import calculate_loan_preview  # noqa: E402
+
+REFERENCE = date(2025, 6, 15)
+
+
+def seed(url: str, loans: int, seed_value: int) -> None:
+    rng = random.Random(seed_value)
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 1, "email": "bench@bench", "hashed_password": "x", "full_name": "bench", "cpf": "1"}])
+        rows = []
+        # ``loans`` emprestimos ativos e mais 25% em outros status, que a projecao ignora
+        statuses = ["ativo"] * loans + [rng.choice(["pago", "pendente", "fila"]) for _ in range(loans // 4)]
+        for status in statuses:
+            valor = round(rng.uniform(500, 50_000), 2)
+            rows.append(
+                {
+                    "user_id": 1,
+                    "valor": valor,
+                    "taxa_juros": rng.choice([0.12, 0.15, 0.2, 0.35]),
+                    "prazo_meses": rng.choice([6, 12, 24, 36, 60]),
+                    "valor_pago": round(rng.uniform(0, valor), 2) if rng.random() < 0.4 else 0.0,
+                    "status": status,
+                    "created_at": datetime.combine(REFERENCE, datetime.min.time()) - timedelta(days=rng.randint(0, 1500)),
+                }
+            )
+        conn.execute(Loan.__table__.insert(), rows)
+    engine.dispose()
+
+
+def reference_cashflow(db: Session, months: int) -> tuple[dict, float, int]:
+    """Soma por mes das parcelas ainda nao quitadas, emprestimo a emprestimo."""
+    first_month = REFERENCE.year * 12 + REFERENCE.month - 1
+    buckets = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    overdue = Decimal(0)
+    overdue_installments = 0
+    for loan in db.query(Loan).filter(Loan.status == "ativo"):
+        preview = calculate_loan_preview(
+            LoanPreviewRequest(
+                valor=Decimal(str(loan.valor)),
+                taxa_juros=Decimal(str(loan.taxa_juros)),
+                prazo_meses=loan.prazo_meses,
+                primeira_parcela=loan.created_at.date(),
+            )
+        )
+        remaining_paid = Decimal(str(loan.valor_pago or 0))
+        for parcela in preview.parcelas:
+            covered = min(remaining_paid, parcela.valor_parcela)
+            remaining_paid -= covered
+            open_fraction = (parcela.valor_parcela - covered) / parcela.valor_parcela
+            month = parcela.data_pagamento.year * 12 + parcela.data_pagamento.month - 1
+            if month < first_month:
+                overdue += parcela.valor_parcela - covered
+                overdue_installments += 1
+            elif month < first_month + months:
+                buckets[month][0] += parcela.amortizacao * open_fraction
+                buckets[month][1] += parcela.juros * open_fraction
+    return buckets, float(overdue), overdue_installments
+
+
+def check(url: str, months: int) -> int:
+    engine = create_engine(url)
+    with Session(engine) as db:
+        projection = project_cashflow(load_loan_book(db), REFERENCE, months)
+        buckets, overdue, overdue_installments = reference_cashflow(db, months)
+    engine.dispose()
+
+    first_month = REFERENCE.year * 12 + REFERENCE.month - 1
+    loans = projection["emprestimos"]
+    # A referencia arredonda cada parcela em centavos; a projecao soma em float
+    assert abs(projection["em_atraso"] - overdue) <= 0.005 * overdue_installments + 0.01, (projection["em_atraso"], overdue)
+    for offset, month in enumerate(projection["serie"]):
+        principal, juros = buckets[first_month + offset]
+        tolerance = 0.005 * month["parcelas"] + 0.01
+        assert abs(month["principal"] - float(principal)) <= tolerance, (month, principal)
+        assert abs(month["juros"] - float(juros)) <= tolerance, (month, juros)
+    return loans
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loans", type=int, default=100_000, help="emprestimos ativos semeados")
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--check-loans", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="cashflow_bench_"))
+    try:
+        check_url = f"sqlite:///{workdir / 'check.db'}"
+        seed(check_url, args.check_loans, args.seed)
+        checked = check(check_url, args.months)
+        print(f"OK: {checked} emprestimos ativos conferidos contra o cronograma individual")
+
+        url = f"sqlite:///{workdir / 'book.db'}"
+        seed(url, args.loans, args.seed)
+        engine = create_engine(url)
+        with Session(engine) as db:
+            started = time.perf_counter()
+            book = load_loan_book(db)
+            loaded = time.perf_counter()
+            projection = project_cashflow(book, REFERENCE, args.months)
+            finished = time.perf_counter()
+        engine.dispose()
+        print(
+            f"{projection['emprestimos']} emprestimos ativos, {args.months} meses: "
+            f"consulta {(loaded - started) * 1000:.0f}ms, projecao {(finished - loaded) * 1000:.0f}ms"
+        )
+        print(f"primeiro mes: {projection['serie'][0]}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
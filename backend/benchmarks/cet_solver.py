@@ -0,0 +1,175 @@
+"""
+Confere e mede o solver vetorizado de TIR/CET (app.services.cet).
+
+Confere solve_irr contra uma bissecao escalar em Python puro para fluxos
+Price, SAC e irregulares (com tarifa descontada do valor liberado e fluxos
+sem raiz), o CET do preview individual contra o do lote e o de price_cet.
+Depois mede solve_irr na carteira inteira contra o laco escalar.
+
+Uso: python benchmarks/cet_solver.py [--loans 100000] [--seed 42]
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.schemas import LoanPreviewRequest  # noqa: E402
+from app.services.cet import annual_cet, price_cet, solve_irr  # noqa: E402
+from app.services.finance_batch import loan_preview_batch  # noqa: E402
+from app.services.finance_service import (  # noqa: E402
+    _rate_annual_to_monthly,
+    calculate_loan_preview,
+    price_schedule_cents,
+    sac_schedule_cents,
+)
+
+
+def npv(fluxos: list[float], taxa: float) -> float:
+    v = 1 / (1 + taxa)
+    return sum(f * v**k for k, f in enumerate(fluxos))
+
+
+def reference_irr(fluxos: list[float]) -> float:
+    """Bissecao escalar no mesmo intervalo do solver; NaN sem troca de sinal."""
+    lo, hi = -0.99, 1024.0
+    if npv(fluxos, lo) <= 0 or npv(fluxos, hi) >= 0:
+        return math.nan
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        if npv(fluxos, mid) > 0:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def scalar_newton(fluxos: list[float], chute: float) -> float:
+    """Newton escalar por emprestimo: o laco que o solver vetorizado substitui."""
+    taxa = chute
+    for _ in range(100):
+        v = 1 / (1 + taxa)
+        desconto = 1.0
+        valor = derivada = 0.0
+        for k, f in enumerate(fluxos):
+            valor += f * desconto
+            derivada -= k * f * desconto * v
+            desconto *= v
+        passo = valor / derivada
+        taxa -= passo
+        if abs(passo) <= 1e-12 * (1 + abs(taxa)):
+            break
+    return taxa
+
+
+def random_flows(rng: random.Random, count: int) -> list[list[float]]:
+    flows = []
+    for _ in range(count):
+        valor = Decimal(rng.randint(10_000, 10_000_000)) / 100
+        taxa_mensal = _rate_annual_to_monthly(Decimal(rng.randint(1, 6000)) / 10_000)
+        prazo = rng.randint(1, 120)
+        kind = rng.random()
+        if kind < 0.35:
+            parcelas = [row[0] for row in price_schedule_cents(valor, taxa_mensal, prazo)]
+        elif kind < 0.7:
+            parcelas = [row[0] for row in sac_schedule_cents(valor, taxa_mensal, prazo)]
+        else:
+            # Parcelas irregulares, com carencia (zeros) no meio
+            parcelas = [rng.choice([0, rng.randint(1, 500_000)]) for _ in range(prazo)]
+        # Tarifa descontada do valor liberado
+        liberado = int(valor * 100) - rng.randint(0, int(valor * 5))
+        flows.append([-float(liberado), *map(float, parcelas)])
+    flows.append([-100.0, 0.0, 0.0])
+    flows.append([100.0, 1.0, 1.0])
+    return flows
+
+
+def padded(flows: list[list[float]]) -> np.ndarray:
+    matrix = np.zeros((len(flows), max(map(len, flows))))
+    for i, row in enumerate(flows):
+        matrix[i, : len(row)] = row
+    return matrix
+
+
+def check(cases: int, seed: int) -> int:
+    rng = random.Random(seed)
+    flows = random_flows(rng, cases)
+    solved = solve_irr(padded(flows))
+    for row, actual in zip(flows, solved.tolist()):
+        expected = reference_irr(row)
+        if math.isnan(expected):
+            assert math.isnan(actual), (row, actual)
+        else:
+            assert abs(actual - expected) <= 1e-9 * (1 + abs(expected)), (row, actual, expected)
+
+    cenarios = [
+        LoanPreviewRequest(
+            valor=Decimal(rng.randint(10_000, 10_000_000)) / 100,
+            taxa_juros=Decimal(rng.randint(1, 6000)) / 10_000,
+            prazo_meses=rng.randint(1, 360),
+            sistema=rng.choice(["price", "sac"]),
+        )
+        for _ in range(200)
+    ]
+    batch = loan_preview_batch(cenarios)
+    price = price_cet(
+        np.array([float(c.valor) for c in cenarios]),
+        np.array([float(c.taxa_juros) for c in cenarios]),
+        np.array([c.prazo_meses for c in cenarios]),
+    )
+    for cenario, lote, bulk in zip(cenarios, batch["cet"], price.tolist()):
+        preview = float(calculate_loan_preview(cenario).cet)
+        # O lote e o recalculo da carteira usam parcelas em float arredondadas em centavos
+        assert abs(preview - lote) <= 0.0001, (cenario, preview, lote)
+        if cenario.sistema == "price":
+            assert abs(preview - round(bulk, 4)) <= 0.0001, (cenario, preview, bulk)
+    return len(flows)
+
+
+def book(loans: int, seed: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    valor = np.round(rng.uniform(500, 50_000, loans), 2)
+    taxa = rng.choice([0.12, 0.15, 0.2, 0.35], loans)
+    prazo = rng.choice([6, 12, 24, 36, 60], loans)
+    return valor, taxa, prazo
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loans", type=int, default=100_000)
+    parser.add_argument("--cases", type=int, default=2_000)
+    parser.add_argument("--scalar-loans", type=int, default=5_000, help="emprestimos medidos no laco escalar")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    checked = check(args.cases, args.seed)
+    print(f"OK: {checked} fluxos conferidos contra a bissecao escalar; CET do preview = lote = carteira")
+
+    valor, taxa, prazo = book(args.loans, args.seed)
+    started = time.perf_counter()
+    cet = price_cet(valor, taxa, prazo)
+    vector_seconds = time.perf_counter() - started
+
+    # Mesmos fluxos de price_cet, resolvidos um emprestimo por vez
+    n = args.scalar_loans
+    taxa_mensal = np.power(1 + taxa[:n], 1 / 12) - 1
+    crescimento = np.power(1 + taxa_mensal, prazo[:n])
+    parcela = np.rint(valor[:n] * taxa_mensal * crescimento / (crescimento - 1) * 100)
+    flows = [[-round(v * 100)] + [p] * int(k) for v, p, k in zip(valor[:n].tolist(), parcela.tolist(), prazo[:n].tolist())]
+    started = time.perf_counter()
+    scalar = [scalar_newton(row, chute) for row, chute in zip(flows, taxa_mensal.tolist())]
+    scalar_seconds = (time.perf_counter() - started) * args.loans / n
+    assert np.allclose(annual_cet(np.array(scalar)), cet[:n], rtol=0, atol=1e-9)
+
+    print(f"{'emprestimos':>12}{'vetorizado (ms)':>17}{'escalar estimado (ms)':>23}{'speedup':>9}")
+    print(f"{args.loans:>12}{vector_seconds * 1000:>17.0f}{scalar_seconds * 1000:>23.0f}{scalar_seconds / vector_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
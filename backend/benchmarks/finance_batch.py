@@ -0,0 +1,153 @@
+"""
+Compara os previews em lote (finance_batch) com os previews individuais.
+
+Gera cenarios aleatorios de emprestimo e investimento, calcula cada um com
+calculate_loan_preview/calculate_investment_preview e o lote inteiro com
+loan_preview_batch/investment_preview_batch. Falha se algum campo divergir
+em mais de um centavo (0.0001 nas taxas) e mede o tempo dos dois caminhos.
+
+Uso: python benchmarks/finance_batch.py [--scenarios 500] [--seed 42]
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.schemas import InvestmentPreviewRequest, LoanPreviewRequest  # noqa: E402
+from app.services.finance_batch import investment_preview_batch, loan_preview_batch  # noqa: E402
+from app.services.finance_service import calculate_investment_preview, calculate_loan_preview  # noqa: E402
+
+PRIMEIRA = date(2025, 1, 31)
+
+
+def random_loans(rng: random.Random, count: int) -> list[LoanPreviewRequest]:
+    return [
+        LoanPreviewRequest(
+            valor=Decimal(rng.randint(10_000, 5_000_000)) / 100,
+            taxa_juros=Decimal(rng.randint(100, 6000)) / 10_000,
+            prazo_meses=rng.randint(1, 120),
+            sistema=rng.choice(["price", "sac"]),
+            primeira_parcela=PRIMEIRA,
+        )
+        for _ in range(count)
+    ]
+
+
+def random_investments(rng: random.Random, count: int) -> list[InvestmentPreviewRequest]:
+    return [
+        InvestmentPreviewRequest(
+            valor=Decimal(rng.randint(1_000, 10_000_000)) / 100,
+            taxa_rendimento=Decimal(rng.randint(100, 3000)) / 10_000,
+            dias=rng.randint(1, 1825),
+            tipo=rng.choice(["simples", "composto"]),
+            capitalizacao=rng.choice(["diaria", "mensal", "semestral", "anual"]),
+        )
+        for _ in range(count)
+    ]
+
+
+def close(expected: Decimal, actual: float, tolerance: str = "0.01") -> bool:
+    return abs(expected - Decimal(str(actual))) <= Decimal(tolerance)
+
+
+def check_loans(cenarios: list[LoanPreviewRequest]) -> int:
+    batch = loan_preview_batch(cenarios, incluir_parcelas=True)
+    parcelas = batch["parcelas"]
+    offset = 0
+    diffs = 0
+    for index, cenario in enumerate(cenarios):
+        single = calculate_loan_preview(cenario)
+        assert close(single.taxa_mensal, batch["taxa_mensal"][index], "0.0001"), ("taxa_mensal", index)
+        for field in ("valor_contratado", "total_pago", "total_juros"):
+            expected = getattr(single, field)
+            actual = batch[field][index]
+            assert close(expected, actual), (field, index, expected, actual)
+            diffs += expected != Decimal(str(actual))
+        for parcela in single.parcelas:
+            assert parcelas["cenario"][offset] == index
+            assert parcelas["numero"][offset] == parcela.numero
+            assert parcelas["data_pagamento"][offset] == parcela.data_pagamento
+            for field in ("valor_parcela", "juros", "amortizacao", "saldo_devedor"):
+                expected = getattr(parcela, field)
+                actual = parcelas[field][offset]
+                assert close(expected, actual), (field, index, parcela.numero, expected, actual)
+                diffs += expected != Decimal(str(actual))
+            offset += 1
+    assert offset == len(parcelas["cenario"])
+    return diffs
+
+
+def check_investments(cenarios: list[InvestmentPreviewRequest]) -> int:
+    batch = investment_preview_batch(cenarios)
+    diffs = 0
+    for index, cenario in enumerate(cenarios):
+        single = calculate_investment_preview(cenario)
+        for field, tolerance in (
+            ("valor_investido", "0.01"),
+            ("rendimento_previsto", "0.01"),
+            ("total_previsto", "0.01"),
+            ("taxa_mensal", "0.0001"),
+            ("apy", "0.0001"),
+        ):
+            expected = getattr(single, field)
+            actual = batch[field][index]
+            assert close(expected, actual, tolerance), (field, index, expected, actual)
+            diffs += expected != Decimal(str(actual))
+    return diffs
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    loans = random_loans(rng, args.scenarios)
+    investments = random_investments(rng, args.scenarios)
+
+    loan_diffs = check_loans(loans)
+    investment_diffs = check_investments(investments)
+    print(f"OK: {len(loans)} emprestimos e {len(investments)} investimentos dentro da tolerancia")
+    print(f"    campos com diferenca de centavo: {loan_diffs} (emprestimos), {investment_diffs} (investimentos)")
+
+    rows = [
+        (
+            "emprestimos",
+            lambda: [calculate_loan_preview(cenario) for cenario in loans],
+            lambda: loan_preview_batch(loans),
+        ),
+        (
+            "emprestimos + parcelas",
+            lambda: [calculate_loan_preview(cenario) for cenario in loans],
+            lambda: loan_preview_batch(loans, incluir_parcelas=True),
+        ),
+        (
+            "investimentos",
+            lambda: [calculate_investment_preview(cenario) for cenario in investments],
+            lambda: investment_preview_batch(investments),
+        ),
+    ]
+    print(f"{'preview':<26}{'individual (s)':>16}{'lote (s)':>10}{'speedup':>9}")
+    for name, single, batch in rows:
+        single_seconds = timed(single)
+        batch_seconds = timed(batch)
+        print(f"{name:<26}{single_seconds:>16.4f}{batch_seconds:>10.4f}{single_seconds / batch_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
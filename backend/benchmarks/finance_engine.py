@@ -0,0 +1,129 @@
+"""
+Mede o motor de centavos/ponto fixo do finance_service contra a implementacao
+anterior em Decimal.
+
+A referencia Decimal e a conferencia campo a campo (incluindo os empates em
+meio centavo) ficam em tests/test_finance_engine.py; aqui so se mede o tempo
+de cada implementacao sobre cenarios aleatorios com seed fixa.
+
+Uso: python benchmarks/finance_engine.py [--cases 20000] [--seed 42]
+"""
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND))
+sys.path.append(str(BACKEND / "tests"))
+
+from app.schemas import LoanInstallment  # noqa: E402
+from app.services import finance_service  # noqa: E402
+from test_finance_engine import (  # noqa: E402
+    PRIMEIRA,
+    legacy_accrued_interest,
+    legacy_price,
+    legacy_sac,
+    random_accruals,
+    random_schedules,
+)
+
+
+def legacy_installments(parcelas: list[tuple]) -> list[LoanInstallment]:
+    # O _price_schedule/_sac_schedule anterior montava LoanInstallment a cada parcela
+    return [
+        LoanInstallment(
+            numero=numero, data_pagamento=data, valor_parcela=parcela, juros=juros,
+            amortizacao=amortizacao, saldo_devedor=saldo,
+        )
+        for numero, data, parcela, juros, amortizacao, saldo in parcelas
+    ]
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    accruals = random_accruals(rng, args.cases)
+    # Colunas do job: dinheiro em centavos e taxa com poucas casas (caminho rapido)
+    float_accruals = [
+        (rng.randint(1, 10_000_000) / 100, rng.randint(1, 6000) / 10_000, rng.randint(1, 400))
+        for _ in range(args.cases)
+    ]
+    dirty_accruals = [(float(principal), float(taxa), dias) for principal, taxa, dias in accruals]
+    schedules = random_schedules(rng, max(args.cases // 40, 50))
+
+    parcelas = sum(prazo for _, _, prazo in schedules)
+    rows = [
+        (
+            "accrued_interest",
+            len(accruals),
+            lambda: [legacy_accrued_interest(*case) for case in accruals],
+            lambda: [finance_service.accrued_interest(*case) for case in accruals],
+        ),
+        (
+            "accrued_interest_cents (float)",
+            len(float_accruals),
+            lambda: [
+                float(legacy_accrued_interest(Decimal(str(p)), Decimal(str(t)), d)) for p, t, d in float_accruals
+            ],
+            lambda: [finance_service.accrued_interest_cents(*case) / 100 for case in float_accruals],
+        ),
+        (
+            "accrued_interest_cents (float sujo)",
+            len(dirty_accruals),
+            lambda: [
+                float(legacy_accrued_interest(Decimal(str(p)), Decimal(str(t)), d)) for p, t, d in dirty_accruals
+            ],
+            lambda: [finance_service.accrued_interest_cents(*case) / 100 for case in dirty_accruals],
+        ),
+        (
+            "price_schedule_cents",
+            parcelas,
+            lambda: [legacy_price(*case) for case in schedules],
+            lambda: [finance_service.price_schedule_cents(*case) for case in schedules],
+        ),
+        (
+            "sac_schedule_cents",
+            parcelas,
+            lambda: [legacy_sac(*case) for case in schedules],
+            lambda: [finance_service.sac_schedule_cents(*case) for case in schedules],
+        ),
+        (
+            "_price_schedule",
+            parcelas,
+            lambda: [legacy_installments(legacy_price(*case)) for case in schedules],
+            lambda: [finance_service._price_schedule(*case, PRIMEIRA) for case in schedules],
+        ),
+        (
+            "_sac_schedule",
+            parcelas,
+            lambda: [legacy_installments(legacy_sac(*case)) for case in schedules],
+            lambda: [finance_service._sac_schedule(*case, PRIMEIRA) for case in schedules],
+        ),
+    ]
+    print(f"{'funcao':<38}{'itens':>9}{'Decimal (s)':>13}{'centavos (s)':>14}{'speedup':>9}")
+    for name, items, legacy, current in rows:
+        legacy_seconds = timed(legacy)
+        current_seconds = timed(current)
+        print(f"{name:<38}{items:>9}{legacy_seconds:>13.4f}{current_seconds:>14.4f}{legacy_seconds / current_seconds:>8.2f}x")
+    print("Obs.: accrued_interest com Decimal manteve a conta Decimal (~1x); *_cents comparado ao")
+    print("      laco Decimal anterior; _price/_sac_schedule incluem a montagem dos LoanInstallment.")
+
+
+if __name__ == "__main__":
+    main()
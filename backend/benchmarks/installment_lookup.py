@@ -0,0 +1,82 @@
+"""
+Confere e mede o calculo de uma parcela isolada (price/sac_installment_cents).
+
+Para cronogramas aleatorios, compara cada parcela calculada isoladamente
+com a linha correspondente de price_schedule_cents/sac_schedule_cents (tem
+que ser identica) e mede o tempo de obter a ultima parcela pelos dois
+caminhos em prazos crescentes.
+
+Uso: python benchmarks/installment_lookup.py [--schedules 300] [--seed 42]
+"""
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.finance_service import (  # noqa: E402
+    _rate_annual_to_monthly,
+    price_installment_cents,
+    price_schedule_cents,
+    sac_installment_cents,
+    sac_schedule_cents,
+)
+
+PAIRS = (
+    (price_schedule_cents, price_installment_cents),
+    (sac_schedule_cents, sac_installment_cents),
+)
+
+
+def check(schedules: int, seed: int) -> int:
+    rng = random.Random(seed)
+    cases = [
+        (Decimal(rng.randint(100, 100_000_000)) / 100, _rate_annual_to_monthly(Decimal(rng.randint(1, 6000)) / 10_000), rng.randint(1, 480))
+        for _ in range(schedules)
+    ]
+    cases.append((Decimal("100.05"), Decimal(0), 10))
+    rows = 0
+    for valor, taxa_mensal, prazo in cases:
+        for schedule, installment in PAIRS:
+            expected = schedule(valor, taxa_mensal, prazo)
+            for numero in range(1, prazo + 1):
+                actual = installment(valor, taxa_mensal, prazo, numero)
+                assert actual == expected[numero - 1], (installment.__name__, valor, taxa_mensal, prazo, numero)
+                rows += 1
+    return rows
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schedules", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = check(args.schedules, args.seed)
+    print(f"OK: {rows} parcelas isoladas identicas ao cronograma completo")
+
+    valor = Decimal("250000.00")
+    taxa_mensal = _rate_annual_to_monthly(Decimal("0.12"))
+    print(f"{'sistema':<8}{'prazo':>7}{'cronograma (ms)':>17}{'parcela (ms)':>14}{'speedup':>9}")
+    for schedule, installment in PAIRS:
+        name = schedule.__name__.split("_")[0]
+        for prazo in (12, 120, 360, 600):
+            full = timed(lambda: schedule(valor, taxa_mensal, prazo)[-1]) * 1000
+            single = timed(lambda: installment(valor, taxa_mensal, prazo, prazo)) * 1000
+            print(f"{name:<8}{prazo:>7}{full:>17.3f}{single:>14.3f}{full / single:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
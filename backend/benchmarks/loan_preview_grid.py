@@ -0,0 +1,88 @@
+"""
+Confere e mede a grade taxa x prazo de simulacoes (POST /loans/preview/grid).
+
+Para grades aleatorias, compara cada celula de loan_preview_grid com o
+calculate_loan_preview do par taxa x prazo (um centavo no total pago da
+Price; no SAC, meio centavo por parcela, que o preview arredonda uma a uma)
+e confere que os juros da grade sao total pago - valor. Depois mede a grade contra o laco de previews que ela
+substitui.
+
+Uso: python benchmarks/loan_preview_grid.py [--taxas 20] [--prazos 30] [--seed 42]
+"""
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.schemas import LoanPreviewRequest  # noqa: E402
+from app.services.finance_batch import loan_preview_grid  # noqa: E402
+from app.services.finance_service import calculate_loan_preview  # noqa: E402
+
+
+def previews(valor: Decimal, taxas: list[Decimal], prazos: list[int], sistema: str) -> list[list]:
+    return [
+        [
+            calculate_loan_preview(LoanPreviewRequest(valor=valor, taxa_juros=taxa, prazo_meses=prazo, sistema=sistema))
+            for prazo in prazos
+        ]
+        for taxa in taxas
+    ]
+
+
+def check(grids: int, seed: int) -> int:
+    rng = random.Random(seed)
+    cells = 0
+    for _ in range(grids):
+        valor = Decimal(rng.randint(10_000, 100_000_000)) / 100
+        taxas = [Decimal(rng.randint(1, 6000)) / 10_000 for _ in range(rng.randint(1, 6))]
+        prazos = [rng.randint(1, 360) for _ in range(rng.randint(1, 6))]
+        sistema = rng.choice(["price", "sac"])
+        grid = loan_preview_grid(valor, taxas, prazos, sistema)
+        expected = previews(valor, taxas, prazos, sistema)
+        for i, row in enumerate(expected):
+            for j, preview in enumerate(row):
+                tolerance = 0.005 * prazos[j] + 0.01
+                # Price: total pago e a parcela em centavos vezes o prazo, como no preview
+                total_tolerance = 0.01 if sistema == "price" else tolerance
+                assert abs(grid["total_pago"][i][j] - float(preview.total_pago)) <= total_tolerance, (valor, taxas[i], prazos[j], sistema)
+                juros_cents = round(grid["total_pago"][i][j] * 100) - round(float(valor) * 100)
+                assert round(grid["total_juros"][i][j] * 100) == juros_cents, (valor, taxas[i], prazos[j], sistema)
+                assert abs(grid["valor_primeira_parcela"][i][j] - float(preview.parcelas[0].valor_parcela)) <= 0.01
+                # A ultima parcela do preview absorve o arredondamento acumulado
+                assert abs(grid["valor_ultima_parcela"][i][j] - float(preview.parcelas[-1].valor_parcela)) <= tolerance
+                cells += 1
+    return cells
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--taxas", type=int, default=20)
+    parser.add_argument("--prazos", type=int, default=30)
+    parser.add_argument("--grids", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    cells = check(args.grids, args.seed)
+    print(f"OK: {cells} celulas conferidas contra calculate_loan_preview")
+
+    valor = Decimal("50000.00")
+    taxas = [Decimal(5 + i) / 100 for i in range(args.taxas)]
+    prazos = [6 * (j + 1) for j in range(args.prazos)]
+    print(f"grade {args.taxas} x {args.prazos} (prazos ate {prazos[-1]} meses)")
+    print(f"{'sistema':<8}{'previews (ms)':>15}{'grade (ms)':>12}{'speedup':>9}")
+    for sistema in ("price", "sac"):
+        started = time.perf_counter()
+        previews(valor, taxas, prazos, sistema)
+        loop_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        loan_preview_grid(valor, taxas, prazos, sistema)
+        grid_seconds = time.perf_counter() - started
+        print(f"{sistema:<8}{loop_seconds * 1000:>15.1f}{grid_seconds * 1000:>12.3f}{loop_seconds / grid_seconds:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Mede a latencia de uma rota sem relacao com login durante uma rajada de logins.
+
+Monta a API num diretorio temporario (SQLite proprio) com um usuario de senha
+bcrypt real e, pelo ASGI e sem servidor, dispara logins concorrentes enquanto
+uma sonda chama POST /loans/preview em intervalo fixo, medindo cada chamada
+desde o instante agendado. Compara a sonda sem rajada, com o verify rodando
+direto no event loop (como antes) e com o pool limitado de hash. Antes confere
+login certo/errado, o 503 quando a fila do pool enche e os contadores de
+metrics().
+
+Uso: python benchmarks/login_storm.py [--logins 30] [--concurrency 15] [--interval-ms 10]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND))
+
+import httpx  # noqa: E402
+
+EMAIL = "storm@bench"
+PASSWORD = "storm-secret"
+PREVIEW = {"valor": 10000, "taxa_juros": 0.15, "prazo_meses": 12}
+
+
+async def legacy_authenticate(db, email: str, password: str):
+    """Login anterior: verify bcrypt direto na rota async, travando o event loop."""
+    from app.models import User
+    from app.services.auth_service import AuthService
+
+    user = db.query(User).filter(User.email == email).first()
+    if not user or not AuthService.verify_password(password, user.hashed_password):
+        return None
+    return user
+
+
+async def login(client: httpx.AsyncClient, password: str = PASSWORD) -> int:
+    response = await client.post("/auth/login", data={"username": EMAIL, "password": password})
+    return response.status_code
+
+
+async def check(client: httpx.AsyncClient) -> None:
+    from app.services.password_hasher import password_hash_pool
+
+    assert await login(client) == 200
+    assert await login(client, "errada") == 401
+    max_pending = password_hash_pool.max_pending
+    password_hash_pool.max_pending = 1
+    try:
+        statuses = await asyncio.gather(*(login(client) for _ in range(3)))
+    finally:
+        password_hash_pool.max_pending = max_pending
+    assert 200 in statuses and 503 in statuses, statuses
+    metrics = password_hash_pool.metrics()
+    assert metrics["rejeitados"] == statuses.count(503), metrics
+    assert metrics["concluidos"] == 2 + statuses.count(200), metrics
+    assert metrics["em_execucao"] == 0 and metrics["na_fila"] == 0, metrics
+
+
+async def probe(client: httpx.AsyncClient, headers: dict, until, interval: float) -> list[float]:
+    """Sonda em malha aberta: uma requisicao por intervalo, medida a partir do
+    instante agendado, para que o tempo com o loop travado entre na latencia."""
+
+    async def one(scheduled: float) -> float:
+        response = await client.post("/loans/preview", json=PREVIEW, headers=headers)
+        assert response.status_code == 200, response.text
+        return time.perf_counter() - scheduled
+
+    tasks = []
+    started = time.perf_counter()
+    while not until():
+        scheduled = started + len(tasks) * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(scheduled)))
+    return list(await asyncio.gather(*tasks))
+
+
+async def storm(client: httpx.AsyncClient, logins: int, concurrency: int) -> tuple[float, list[int]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> int:
+        async with semaphore:
+            return await login(client)
+
+    started = time.perf_counter()
+    statuses = await asyncio.gather(*(one() for _ in range(logins)))
+    return time.perf_counter() - started, statuses
+
+
+async def scenario(client: httpx.AsyncClient, headers: dict, args, with_storm: bool) -> tuple:
+    if not with_storm:
+        deadline = time.perf_counter() + 2.0
+        latencies = await probe(client, headers, lambda: time.perf_counter() >= deadline, args.interval_ms / 1000)
+        return latencies, None, []
+    task = asyncio.create_task(storm(client, args.logins, args.concurrency))
+    # Deixa a rajada ocupar o pool antes da primeira sonda
+    await asyncio.sleep(0)
+    latencies = await probe(client, headers, task.done, args.interval_ms / 1000)
+    elapsed, statuses = await task
+    return latencies, elapsed, statuses
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=15)
+    parser.add_argument("--interval-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="login_storm_bench_"))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from app.db import SessionLocal, engine
+        from app.main import app
+        from app.models import Base, User
+        from app.services.auth_service import AuthService
+        from app.services.password_hasher import password_hash_pool
+
+        Base.metadata.create_all(engine)
+        with SessionLocal() as db:
+            user = User(email=EMAIL, hashed_password=AuthService.hash_password(PASSWORD), full_name="storm", cpf="1")
+            db.add(user)
+            db.commit()
+            user_id = user.id
+
+        headers = {"Authorization": f"Bearer {AuthService.create_access_token(subject=EMAIL, user_id=user_id)}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await check(client)
+            print("OK: login certo/errado, 503 com a fila cheia e metricas conferidos")
+
+            rows = []
+            pooled = AuthService.authenticate
+            for label, authenticate, with_storm in (
+                ("sem rajada", pooled, False),
+                ("bcrypt no loop", legacy_authenticate, True),
+                ("pool limitado", pooled, True),
+            ):
+                AuthService.authenticate = staticmethod(authenticate)
+                try:
+                    latencies, elapsed, statuses = await scenario(client, headers, args, with_storm)
+                finally:
+                    AuthService.authenticate = staticmethod(pooled)
+                latencies.sort()
+                rows.append((label, latencies, elapsed, statuses))
+            metrics = password_hash_pool.metrics()
+        password_hash_pool.shutdown()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.logins} logins, concorrencia {args.concurrency}, {password_hash_pool.workers} workers de hash, sonda a cada {args.interval_ms:g} ms")
+    print(f"{'login':<16}{'sondas':>8}{'p50 (ms)':>10}{'p99 (ms)':>10}{'max (ms)':>10}{'logins/s':>10}{'503':>6}")
+    for label, latencies, elapsed, statuses in rows:
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        rate = f"{len(statuses) / elapsed:.2f}" if elapsed else "-"
+        print(
+            f"{label:<16}{len(latencies):>8}{statistics.median(latencies) * 1000:>10.2f}{p99 * 1000:>10.2f}"
+            f"{latencies[-1] * 1000:>10.2f}{rate:>10}{statuses.count(503):>6}"
+        )
+    print(f"pool: {metrics}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""
+Confere e mede o cache de principal de get_current_user.
+
+Semeia um banco SQLite temporario com usuarios que tem foto de perfil
+(profile_image_base64) e compara, para uma sequencia de requisicoes de
+usuarios aleatorios, a resolucao antiga (SELECT da linha inteira por
+requisicao) com get_current_user usando o cache: tempo por requisicao e
+SELECTs emitidos. Confere tambem que invalidate forca a releitura e que uma
+leitura iniciada antes da invalidacao nao repopula o cache.
+
+Uso: python benchmarks/principal_cache.py [--users 200] [--requests 5000] [--image-kb 200]
+"""
+import argparse
+import base64
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.api.auth import get_current_user  # noqa: E402
+from app.models import Base, User  # noqa: E402
+from app.services.auth_service import AuthService  # noqa: E402
+from app.services.principal_cache import Principal, PrincipalCache, principal_cache  # noqa: E402
+
+
+def seed(url: str, users: int, image_kb: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    image = base64.b64encode(random.randbytes(image_kb * 768)).decode()
+    with engine.begin() as conn:
+        conn.execute(
+            User.__table__.insert(),
+            [
+                {"id": i, "email": f"u{i}@bench", "hashed_password": "x", "full_name": f"u{i}", "cpf": str(i), "profile_image_base64": image}
+                for i in range(1, users + 1)
+            ],
+        )
+    engine.dispose()
+
+
+def legacy_current_user(token: str, db: Session) -> User:
+    """Resolucao anterior: decodifica o token e busca a linha inteira."""
+    payload = AuthService.decode_access_token(token)
+    return db.query(User).filter(User.id == payload["user_id"]).first()
+
+
+def check_generation() -> None:
+    cache = PrincipalCache(ttl_seconds=60, maxsize=10)
+    principal = Principal(id=1, is_admin=False, is_active=True)
+
+    def racing_loader() -> Principal:
+        # Invalidacao chega enquanto a leitura esta em andamento
+        cache.invalidate(1)
+        return principal
+
+    assert cache.get(1, racing_loader) == principal
+    assert cache.metrics()["tamanho"] == 0, "leitura anterior a invalidacao repopulou o cache"
+    cache.get(1, lambda: principal)
+    assert cache.get(1, lambda: None) == principal
+    cache.invalidate(1)
+    assert cache.get(1, lambda: None) is None
+
+
+def run(db: Session, tokens: list[str], resolve) -> tuple[float, int]:
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(db.get_bind(), "before_cursor_execute", count)
+    started = time.perf_counter()
+    for token in tokens:
+        resolve(token, db)
+        db.expunge_all()
+    elapsed = time.perf_counter() - started
+    event.remove(db.get_bind(), "before_cursor_execute", count)
+    return elapsed, statements
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--image-kb", type=int, default=200, help="tamanho da foto de perfil de cada usuario")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    check_generation()
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="principal_bench_"))
+    try:
+        url = f"sqlite:///{workdir / 'users.db'}"
+        seed(url, args.users, args.image_kb)
+        engine = create_engine(url)
+        tokens = [
+            AuthService.create_access_token(subject="bench", user_id=rng.randint(1, args.users))
+            for _ in range(args.requests)
+        ]
+        with Session(engine) as db:
+            user = get_current_user(tokens[0], db)
+            assert user == Principal(id=user.id, is_admin=False, is_active=True)
+            principal_cache.invalidate(user.id)
+            assert run(db, tokens[:1], get_current_user)[1] == 1, "invalidate nao forcou a releitura"
+            principal_cache.clear()
+
+            legacy_seconds, legacy_statements = run(db, tokens, legacy_current_user)
+            cached_seconds, cached_statements = run(db, tokens, get_current_user)
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("OK: invalidacao e geracao conferidas")
+    print(f"{args.requests} requisicoes, {args.users} usuarios, foto de {args.image_kb} KB")
+    print(f"{'resolucao':<12}{'us/req':>10}{'SELECTs':>10}")
+    print(f"{'linha toda':<12}{legacy_seconds / args.requests * 1e6:>10.1f}{legacy_statements:>10}")
+    print(f"{'cache':<12}{cached_seconds / args.requests * 1e6:>10.1f}{cached_statements:>10}")
+    print(f"cache: {principal_cache.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Confere e mede a paginacao e o modo NDJSON do cronograma de emprestimo.
+
+Para cronogramas aleatorios, junta paginas de calculate_loan_preview
+(offset/limit) e as linhas de iter_loan_preview_ndjson e compara com o
+preview completo. Depois mede, para prazos crescentes, o tempo ate a
+primeira linha NDJSON e o pico de memoria (tracemalloc) contra o preview
+completo serializado.
+
+Uso: python benchmarks/schedule_stream.py [--schedules 100] [--seed 42]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.schemas import LoanPreviewRequest  # noqa: E402
+from app.services.finance_service import calculate_loan_preview, iter_loan_preview_ndjson  # noqa: E402
+
+PRIMEIRA = date(2025, 1, 31)
+
+
+def request(valor: Decimal, taxa: Decimal, prazo: int, sistema: str) -> LoanPreviewRequest:
+    return LoanPreviewRequest(valor=valor, taxa_juros=taxa, prazo_meses=prazo, sistema=sistema, primeira_parcela=PRIMEIRA)
+
+
+def check(schedules: int, seed: int) -> int:
+    rng = random.Random(seed)
+    pages = 0
+    for _ in range(schedules):
+        req = request(
+            Decimal(rng.randint(10_000, 100_000_000)) / 100,
+            Decimal(rng.randint(100, 6000)) / 10_000,
+            rng.randint(1, 480),
+            rng.choice(["price", "sac"]),
+        )
+        full = json.loads(calculate_loan_preview(req).model_dump_json())
+
+        limit = rng.randint(1, 60)
+        parcelas = []
+        for offset in range(0, req.prazo_meses, limit):
+            page = json.loads(calculate_loan_preview(req, offset, limit).model_dump_json())
+            assert {k: v for k, v in page.items() if k != "parcelas"} == {k: v for k, v in full.items() if k != "parcelas"}
+            parcelas.extend(page["parcelas"])
+            pages += 1
+        assert parcelas == full["parcelas"], ("paginas", req)
+        assert calculate_loan_preview(req, req.prazo_meses, limit).parcelas == []
+
+        offset = rng.randint(0, req.prazo_meses - 1)
+        lines = [json.loads(line) for line in iter_loan_preview_ndjson(req, offset)]
+        assert lines[:-1] == full["parcelas"][offset:], ("ndjson", req, offset)
+        assert lines[-1] == {k: v for k, v in full.items() if k != "parcelas"}, ("ndjson resumo", req)
+    return pages
+
+
+def measure(prazo: int) -> tuple[float, float, int, int]:
+    req = request(Decimal("250000.00"), Decimal("0.12"), prazo, "price")
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    calculate_loan_preview(req).model_dump_json()
+    full_seconds = time.perf_counter() - started
+    full_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    stream = iter_loan_preview_ndjson(req)
+    next(stream)
+    first_line_seconds = time.perf_counter() - started
+    for _ in stream:
+        pass
+    stream_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return full_seconds, first_line_seconds, full_peak, stream_peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schedules", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    pages = check(args.schedules, args.seed)
+    print(f"OK: {args.schedules} cronogramas; {pages} paginas e o NDJSON reproduzem o preview completo")
+
+    print(f"{'prazo':>6}{'completo (ms)':>15}{'1a linha (ms)':>15}{'pico completo (KB)':>20}{'pico NDJSON (KB)':>18}")
+    for prazo in (12, 120, 360, 1200):
+        full_seconds, first_line_seconds, full_peak, stream_peak = measure(prazo)
+        print(
+            f"{prazo:>6}{full_seconds * 1000:>15.2f}{first_line_seconds * 1000:>15.2f}"
+            f"{full_peak / 1024:>20.0f}{stream_peak / 1024:>18.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
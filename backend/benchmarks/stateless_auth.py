@@ -0,0 +1,131 @@
+"""
+Confere e mede a autenticacao sem banco das rotas de preview.
+
+Monta a API num diretorio temporario (SQLite proprio) e dispara previews
+concorrentes de emprestimo pelo ASGI, sem servidor: uma vez com a
+dependencia sem estado (get_token_principal) e outra trocando-a por
+get_current_user, que abre sessao e consulta o principal. Compara
+requisicoes/s, latencia e conexoes retiradas do pool. Antes confere que
+token expirado (mesmo ja no cache de decode), token sem a claim is_admin e
+usuario sabidamente inativo se comportam como esperado, e que nenhuma
+conexao e aberta pelas rotas de preview.
+
+Uso: python benchmarks/stateless_auth.py [--requests 2000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND))
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+PREVIEW = {"valor": 10000, "taxa_juros": 0.15, "prazo_meses": 12}
+
+
+async def fire(client: httpx.AsyncClient, headers: dict, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/loans/preview", json=PREVIEW, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - started, latencies
+
+
+async def check(client: httpx.AsyncClient, checkouts: list[int], user_id: int) -> None:
+    from app.services.auth_service import AuthService, SECRET_KEY, ALGORITHM
+    from app.services.principal_cache import Principal, principal_cache
+    from jose import jwt
+
+    short = AuthService.create_access_token(subject="bench", user_id=user_id, expires_delta=timedelta(seconds=1))
+    assert (await client.post("/loans/preview", json=PREVIEW, headers={"Authorization": f"Bearer {short}"})).status_code == 200
+    await asyncio.sleep(1.1)
+    response = await client.post("/loans/preview", json=PREVIEW, headers={"Authorization": f"Bearer {short}"})
+    assert response.status_code == 401, "token expirado aceito a partir do cache de decode"
+
+    # Tokens emitidos antes da claim is_admin continuam validos para os previews
+    legacy = jwt.encode({"sub": "bench", "user_id": user_id, "exp": int(time.time()) + 60}, SECRET_KEY, algorithm=ALGORITHM)
+    assert (await client.post("/loans/preview", json=PREVIEW, headers={"Authorization": f"Bearer {legacy}"})).status_code == 200
+
+    principal_cache.get(user_id + 1, lambda: Principal(id=user_id + 1, is_admin=False, is_active=False))
+    inactive = AuthService.create_access_token(subject="bench", user_id=user_id + 1)
+    response = await client.post("/loans/preview", json=PREVIEW, headers={"Authorization": f"Bearer {inactive}"})
+    assert response.status_code == 403, "usuario inativo em cache aceito"
+    assert checkouts[0] == 0, f"{checkouts[0]} conexoes abertas pelas rotas de preview"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="stateless_auth_bench_"))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from app.api.auth import get_current_user, get_token_principal
+        from app.db import SessionLocal, engine
+        from app.main import app
+        from app.models import Base, User
+        from app.services.auth_service import AuthService
+
+        Base.metadata.create_all(engine)
+        with SessionLocal() as db:
+            user = User(email="bench@bench", hashed_password="x", full_name="bench", cpf="1")
+            db.add(user)
+            db.commit()
+            user_id = user.id
+
+        checkouts = [0]
+
+        def count(*_):
+            checkouts[0] += 1
+
+        event.listen(engine, "checkout", count)
+        headers = {"Authorization": f"Bearer {AuthService.create_access_token(subject='bench', user_id=user_id)}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await check(client, checkouts, user_id)
+            print("OK: expiracao, token sem claim, usuario inativo e zero conexoes conferidos")
+
+            rows = []
+            for label, override in (("get_current_user", get_current_user), ("sem estado", None)):
+                if override is not None:
+                    app.dependency_overrides[get_token_principal] = override
+                checkouts[0] = 0
+                await fire(client, headers, 200, args.concurrency)
+                elapsed, latencies = await fire(client, headers, args.requests, args.concurrency)
+                app.dependency_overrides.clear()
+                latencies.sort()
+                rows.append(
+                    (label, args.requests / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)], checkouts[0])
+                )
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.requests} previews, concorrencia {args.concurrency}")
+    print(f"{'autenticacao':<18}{'req/s':>8}{'p50 (ms)':>10}{'p99 (ms)':>10}{'conexoes':>10}")
+    for label, rate, p50, p99, connections in rows:
+        print(f"{label:<18}{rate:>8.0f}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}{connections:>10}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
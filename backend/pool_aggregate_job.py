@@ -0,0 +1,44 @@
+﻿"""Rebuild or verify the persisted pool aggregate row."""
+import argparse
+import logging
+import sys
+
+from app.db import SessionLocal
+from app.services.pool_service import rebuild_pool_aggregate, verify_pool_aggregate
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger("pool_aggregate_job")
+
+
+def run_pool_aggregate_job(verify_only: bool = False) -> int:
+    db = SessionLocal()
+    try:
+        drift = verify_pool_aggregate(db)
+        for field, values in drift.items():
+            logger.warning(
+                "Divergencia em %s - armazenado=%s, esperado=%s",
+                field,
+                values["armazenado"],
+                values["esperado"],
+            )
+        if verify_only:
+            logger.info("Verificacao concluida - divergencias=%s", len(drift))
+            return 1 if drift else 0
+
+        aggregate = rebuild_pool_aggregate(db)
+        db.commit()
+        logger.info("Agregado do pool reconstruido - %r", aggregate)
+        return 0
+    except Exception as exc:  # pragma: no cover - logging defensivo
+        db.rollback()
+        logger.exception("Pool aggregate job failed: %s", exc)
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--verify", action="store_true", help="apenas compara, sem regravar")
+    args = parser.parse_args()
+    sys.exit(run_pool_aggregate_job(verify_only=args.verify))
@@ -10,6 +10,7 @@ from datetime import date, datetime, timedelta
 from decimal import Decimal
 from app.db import engine, SessionLocal
 from app.models import Base, User, Wallet, Transaction, Investment, Loan
+from app.services.pool_service import rebuild_pool_aggregate
 from passlib.context import CryptContext
 
 # Configuração para hash de senha
@@ -277,6 +278,10 @@ def main():
         loans = create_loans(db, users)
         create_transactions(db, wallets)
 
+        # Investimentos e empréstimos foram inseridos direto; recalcula o agregado do pool
+        rebuild_pool_aggregate(db)
+        db.commit()
+
         print("\n" + "=" * 60)
         print("✅ SEED DATA CONCLUÍDO!")
         print("=" * 60)
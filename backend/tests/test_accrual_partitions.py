@@ -0,0 +1,169 @@
+"""Particionamento do accrual paralelo (accrual_job --workers)."""
+import shutil
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+import accrual_job
+from app.models import Base, Investment, Loan, User, Wallet
+
+REFERENCE = datetime(2025, 1, 31, 12, 0, 0)
+
+
+def _assert_covers(partitions: list[tuple[int, int]], users: list[int], workers: int) -> None:
+    assert 0 < len(partitions) <= workers
+    assert all(start is not None and start <= end for start, end in partitions)
+    covered = [user for user in users if any(start <= user <= end for start, end in partitions)]
+    assert covered == users
+    for (_, end), (start, _) in zip(partitions, partitions[1:]):
+        assert end < start
+
+
+@pytest.mark.parametrize(
+    "per_user, workers",
+    [
+        ([(1, 10), (2, 10), (3, 10)], 3),
+        ([(1, 10), (2, 10), (3, 10), (4, 10)], 2),
+        ([(1, 100), (2, 1), (3, 1), (4, 1)], 3),
+        ([(1, 1), (2, 1), (3, 100), (4, 1), (5, 1)], 3),
+        ([(1, 1), (2, 50), (3, 50)], 4),
+        ([(7, 3)], 4),
+    ],
+)
+def test_split_user_counts_cobre_todos_os_usuarios(per_user, workers):
+    partitions = accrual_job.split_user_counts(per_user, workers)
+    _assert_covers(partitions, [user for user, _ in per_user], workers)
+
+
+def test_split_user_counts_usuario_que_atinge_a_meta_sozinho():
+    assert accrual_job.split_user_counts([(1, 10), (2, 10), (3, 10)], 3) == [(1, 1), (2, 2), (3, 3)]
+
+
+def _seed(url: str, positions_per_user: dict[int, int]) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    users = sorted(positions_per_user)
+    investments, loans = [], []
+    for user_id in users:
+        for n in range(positions_per_user[user_id]):
+            last = REFERENCE - timedelta(days=1 + (user_id + n) % 30, hours=n % 5)
+            if n % 3 == 2:
+                loans.append(
+                    {
+                        "user_id": user_id,
+                        "valor": 1000.0 + 37 * n,
+                        "valor_pago": 0.0,
+                        "taxa_juros": 0.15,
+                        "interest_accrued": 0.0,
+                        "status": "ativo",
+                        "last_accrual_at": last,
+                        "created_at": REFERENCE - timedelta(days=60),
+                    }
+                )
+            else:
+                investments.append(
+                    {
+                        "user_id": user_id,
+                        "valor": 500.0 + 113 * n,
+                        "taxa_rendimento": 0.12,
+                        "rendimento_acumulado": 0.0,
+                        "status": "ativo",
+                        "last_accrual_at": last,
+                        "created_at": REFERENCE - timedelta(days=60),
+                    }
+                )
+    with engine.begin() as conn:
+        conn.execute(
+            User.__table__.insert(),
+            [{"id": i, "email": f"u{i}@test", "hashed_password": "x", "full_name": "t", "cpf": str(i)} for i in users],
+        )
+        # Usuarios pares sem carteira: o job cria
+        conn.execute(Wallet.__table__.insert(), [{"user_id": i, "saldo": 0.0} for i in users if i % 2])
+        if investments:
+            conn.execute(Investment.__table__.insert(), investments)
+        if loans:
+            conn.execute(Loan.__table__.insert(), loans)
+    engine.dispose()
+
+
+def _snapshot(url: str) -> tuple:
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        investments = conn.execute(
+            text("SELECT id, ROUND(rendimento_acumulado, 2), last_accrual_at FROM investments ORDER BY id")
+        ).all()
+        loans = conn.execute(text("SELECT id, ROUND(interest_accrued, 2), last_accrual_at FROM loans ORDER BY id")).all()
+        transactions = sorted(
+            conn.execute(
+                text(
+                    "SELECT w.user_id, t.tipo, ROUND(t.valor, 2), t.related_investment_id, t.related_loan_id "
+                    "FROM transactions t JOIN wallets w ON w.id = t.wallet_id"
+                )
+            ).all()
+        )
+    engine.dispose()
+    return investments, loans, transactions
+
+
+@pytest.mark.parametrize(
+    "positions_per_user, workers",
+    [
+        ({1: 10, 2: 10, 3: 10}, 3),
+        ({1: 4, 2: 4, 3: 4, 4: 4, 5: 4, 6: 4}, 4),
+        ({1: 40, 2: 1, 3: 2, 4: 1, 5: 1}, 3),
+        ({1: 1, 2: 2, 3: 30, 4: 1, 5: 25, 6: 1}, 4),
+    ],
+    ids=["iguais-um-por-worker", "iguais", "concentrado-no-primeiro", "concentrado-no-meio"],
+)
+def test_particionado_igual_ao_serial(tmp_path, positions_per_user, workers):
+    serial_url = f"sqlite:///{tmp_path / 'serial.db'}"
+    partitioned_url = f"sqlite:///{tmp_path / 'particionado.db'}"
+    _seed(serial_url, positions_per_user)
+    shutil.copy(tmp_path / "serial.db", tmp_path / "particionado.db")
+
+    engine = create_engine(serial_url)
+    with Session(engine) as db:
+        accrual_job.bulk_process_investments(db, now=REFERENCE, batch_size=3)
+        accrual_job.bulk_process_loans(db, now=REFERENCE, batch_size=3)
+        db.commit()
+    engine.dispose()
+
+    engine = create_engine(partitioned_url)
+    with Session(engine) as db:
+        partitions = accrual_job.plan_user_partitions(db, workers)
+    engine.dispose()
+    _assert_covers(partitions, sorted(positions_per_user), workers)
+    # Mesma funcao que cada processo executa, aqui em sequencia
+    for user_range in partitions:
+        accrual_job._accrue_partition(partitioned_url, user_range, REFERENCE, 3)
+
+    serial = _snapshot(serial_url)
+    assert serial == _snapshot(partitioned_url)
+    assert {row[0] for row in serial[2]} == set(positions_per_user), "usuario sem juros"
+
+
+def test_run_parallel_accrual_em_processos_igual_ao_serial(tmp_path):
+    positions_per_user = {1: 12, 2: 1, 3: 5, 4: 2, 5: 9}
+    serial_url = f"sqlite:///{tmp_path / 'serial.db'}"
+    parallel_url = f"sqlite:///{tmp_path / 'paralelo.db'}"
+    _seed(serial_url, positions_per_user)
+    shutil.copy(tmp_path / "serial.db", tmp_path / "paralelo.db")
+
+    engine = create_engine(serial_url)
+    with Session(engine) as db:
+        accrual_job.bulk_process_investments(db, now=REFERENCE, batch_size=4)
+        accrual_job.bulk_process_loans(db, now=REFERENCE, batch_size=4)
+        db.commit()
+    engine.dispose()
+
+    # Caminho real do --workers: ProcessPoolExecutor com spawn, engine criada em cada filho
+    summaries = accrual_job.run_parallel_accrual(workers=2, chunk_size=4, database_url=parallel_url, now=REFERENCE)
+
+    _assert_covers([tuple(summary["usuarios"]) for summary in summaries], sorted(positions_per_user), 2)
+    # _seed cria um emprestimo a cada tres posicoes
+    loans = sum(count // 3 for count in positions_per_user.values())
+    assert sum(summary["emprestimos"] for summary in summaries) == loans
+    assert sum(summary["investimentos"] for summary in summaries) == sum(positions_per_user.values()) - loans
+    assert _snapshot(serial_url) == _snapshot(parallel_url)
@@ -0,0 +1,87 @@
+"""Politicas de admissao da fila (admission_policy)."""
+import random
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta
+from itertools import islice
+
+import pytest
+
+from app.services.admission_policy import (
+    AdmissionPolicy,
+    BestFitPolicy,
+    QueuedLoan,
+    SkipAheadPolicy,
+    get_admission_policy,
+)
+
+NOW = datetime(2025, 1, 31, 12, 0, 0)
+
+
+def _best_fit_reference(candidates, capacity, now, aging, window):
+    """Best-fit com lista ordenada por insort/pop, a versao direta do algoritmo."""
+    chosen = []
+    by_value = []
+    for order, loan in enumerate(islice(candidates, window)):
+        if now - loan.created_at >= aging:
+            if loan.valor > capacity:
+                return chosen
+            chosen.append(loan)
+            capacity -= loan.valor
+            continue
+        insort(by_value, (loan.valor, order, loan))
+    while by_value and capacity > 0:
+        index = bisect_right(by_value, (capacity, float("inf"))) - 1
+        if index < 0:
+            break
+        valor, _, loan = by_value.pop(index)
+        chosen.append(loan)
+        capacity -= valor
+    return chosen
+
+
+def _queue(rng: random.Random, size: int) -> list[QueuedLoan]:
+    return [
+        QueuedLoan(
+            id=i,
+            # Valores repetidos exercitam o desempate pela posicao na fila
+            valor=float(rng.choice([rng.randint(1, 50) * 100, round(rng.lognormvariate(7, 1), 2)])),
+            created_at=NOW - timedelta(hours=rng.uniform(0, 100)),
+        )
+        for i in range(size)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_best_fit_igual_a_referencia(seed):
+    rng = random.Random(seed)
+    queue = _queue(rng, rng.randint(0, 300))
+    capacity = rng.uniform(0, 200_000)
+    aging = timedelta(hours=rng.choice([24, 72, 1000]))
+    window = rng.choice([10, 100, 1000])
+    policy = BestFitPolicy(aging=aging, window=window)
+    expected = _best_fit_reference(iter(queue), capacity, NOW, aging, window)
+    assert [loan.id for loan in policy.select(iter(queue), capacity, NOW)] == [loan.id for loan in expected]
+
+
+def test_politica_lida_do_ambiente_a_cada_chamada(monkeypatch):
+    monkeypatch.setenv("LOAN_ADMISSION_POLICY", "best_fit")
+    monkeypatch.setenv("LOAN_ADMISSION_WINDOW", "5")
+    monkeypatch.setenv("LOAN_ADMISSION_AGING_HOURS", "1.5")
+    policy = get_admission_policy()
+    assert isinstance(policy, BestFitPolicy)
+    assert policy.window == 5 and policy.aging == timedelta(hours=1.5)
+
+    monkeypatch.setenv("LOAN_ADMISSION_POLICY", "skip_ahead")
+    monkeypatch.setenv("LOAN_ADMISSION_MAX_SKIPS", "3")
+    policy = get_admission_policy()
+    assert isinstance(policy, SkipAheadPolicy) and policy.max_skips == 3
+
+    monkeypatch.delenv("LOAN_ADMISSION_POLICY")
+    assert get_admission_policy().name == "fifo"
+    with pytest.raises(ValueError):
+        get_admission_policy("desconhecida")
+
+
+def test_politica_base_e_abstrata():
+    with pytest.raises(TypeError):
+        AdmissionPolicy()
@@ -0,0 +1,92 @@
+"""Previews vetorizados (finance_batch) contra o preview individual."""
+import random
+from decimal import Decimal
+
+import pytest
+
+from app.schemas import LoanPreviewRequest
+from app.services.finance_batch import loan_preview_batch, loan_preview_grid
+from app.services.finance_service import calculate_loan_preview
+
+CENT = 0.01 + 1e-6
+CAMPOS = ("valor_parcela", "juros", "amortizacao", "saldo_devedor")
+
+
+def _cenarios_aleatorios(seed: int, quantidade: int) -> list[LoanPreviewRequest]:
+    rng = random.Random(seed)
+    return [
+        LoanPreviewRequest(
+            valor=Decimal(rng.randint(10_000, 200_000_000)) / 100,
+            taxa_juros=Decimal(rng.randint(1, 6000)) / 10_000,
+            prazo_meses=rng.randint(1, 600),
+            sistema=rng.choice(["price", "sac"]),
+        )
+        for _ in range(quantidade)
+    ]
+
+
+def _comparar(cenarios: list[LoanPreviewRequest]) -> int:
+    """Confere o lote parcela a parcela; devolve quantos centavos divergem (empates)."""
+    lote = loan_preview_batch(cenarios, incluir_parcelas=True)
+    parcelas = lote["parcelas"]
+    inicio = 0
+    divergentes = 0
+    for i, cenario in enumerate(cenarios):
+        preview = calculate_loan_preview(cenario)
+        assert lote["total_pago"][i] == pytest.approx(float(preview.total_pago), abs=CENT)
+        assert lote["total_juros"][i] == pytest.approx(float(preview.total_juros), abs=CENT)
+        assert lote["valor_primeira_parcela"][i] == float(preview.parcelas[0].valor_parcela)
+        for k, parcela in enumerate(preview.parcelas):
+            for campo in CAMPOS:
+                diferenca = abs(parcelas[campo][inicio + k] - float(getattr(parcela, campo)))
+                assert diferenca <= CENT, (cenario, k + 1, campo)
+                divergentes += diferenca > 1e-6
+        assert parcelas["saldo_devedor"][inicio + len(preview.parcelas) - 1] == 0.0
+        inicio += len(preview.parcelas)
+    return divergentes
+
+
+def test_price_longo_zera_o_saldo_como_o_preview():
+    cenario = LoanPreviewRequest(valor=Decimal("1508403.97"), taxa_juros=Decimal("0.5768"), prazo_meses=580)
+    assert _comparar([cenario]) == 0
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_lote_igual_ao_preview_individual(seed):
+    cenarios = _cenarios_aleatorios(seed, 40)
+    celulas = sum(c.prazo_meses for c in cenarios) * len(CAMPOS)
+    # So empates de meio centavo isolados podem divergir
+    assert _comparar(cenarios) <= celulas // 10_000 + 2
+
+
+@pytest.mark.parametrize("sistema", ["price", "sac"])
+def test_grade_prazos_longos_igual_ao_preview(sistema):
+    rng = random.Random(22)
+    valor = Decimal("1508403.97")
+    taxas = [Decimal("0.5768"), Decimal("0.1299"), Decimal("0.0375")]
+    prazos = [360, 480, 580, 600] + [rng.randint(300, 600) for _ in range(2)]
+    grade = loan_preview_grid(valor, taxas, prazos, sistema)
+    for i, taxa in enumerate(taxas):
+        for j, prazo in enumerate(prazos):
+            preview = calculate_loan_preview(
+                LoanPreviewRequest(valor=valor, taxa_juros=taxa, prazo_meses=prazo, sistema=sistema)
+            )
+            assert grade["valor_primeira_parcela"][i][j] == pytest.approx(float(preview.parcelas[0].valor_parcela), abs=CENT)
+            # Os totais somam ate meio centavo de arredondamento por parcela do preview
+            limite = 0.005 * prazo + 1e-6
+            if sistema == "price":
+                assert grade["total_pago"][i][j] == pytest.approx(float(preview.total_pago), abs=1e-6)
+            else:
+                assert grade["total_pago"][i][j] == pytest.approx(float(preview.total_pago), abs=limite)
+            assert round(grade["total_juros"][i][j] * 100) == round(grade["total_pago"][i][j] * 100) - round(float(valor) * 100)
+
+
+@pytest.mark.parametrize("sistema", ["price", "sac"])
+def test_grade_juros_igual_total_pago_menos_valor(sistema):
+    grade = loan_preview_grid(Decimal("1000"), [Decimal("0.1"), Decimal("0.5768")], [3, 12, 240], sistema)
+    for pagos, juros in zip(grade["total_pago"], grade["total_juros"]):
+        for total_pago, total_juros in zip(pagos, juros):
+            assert round(total_juros * 100) == round(total_pago * 100) - 100_000
+    if sistema == "price":
+        # Caso do review: total_pago 1015.98 com total_juros 15.99
+        assert (grade["total_pago"][0][0], grade["total_juros"][0][0]) == (1015.98, 15.98)
@@ -0,0 +1,208 @@
+"""Motor de centavos/ponto fixo do finance_service contra a implementacao Decimal anterior."""
+import random
+from datetime import date
+from decimal import ROUND_HALF_EVEN, Decimal
+from fractions import Fraction
+
+import pytest
+
+from app.services import finance_service
+from app.services.finance_service import _add_months, _rate_annual_to_monthly
+
+TWO_PLACES = Decimal("0.01")
+ALL_DAYS_YEAR = Decimal(365)
+PRIMEIRA = date(2025, 1, 31)
+
+
+# Implementacao anterior (Decimal), usada como referencia -----------------
+
+def legacy_round(value: Decimal) -> Decimal:
+    return value.quantize(TWO_PLACES, rounding=ROUND_HALF_EVEN)
+
+
+def legacy_accrued_interest(principal: Decimal, taxa_anual: Decimal, dias: int) -> Decimal:
+    return legacy_round(principal * taxa_anual * Decimal(dias) / ALL_DAYS_YEAR)
+
+
+def legacy_price(valor: Decimal, taxa_mensal: Decimal, prazo: int) -> list[tuple]:
+    parcelas = []
+    if taxa_mensal == 0:
+        parcela_valor = valor / prazo
+    else:
+        fator = (taxa_mensal * (Decimal(1) + taxa_mensal) ** prazo) / ((Decimal(1) + taxa_mensal) ** prazo - 1)
+        parcela_valor = valor * fator
+    saldo = valor
+    for i in range(1, prazo + 1):
+        juros = saldo * taxa_mensal
+        amortizacao = parcela_valor - juros
+        saldo -= amortizacao
+        if saldo < Decimal("0.005"):
+            saldo = Decimal(0)
+        parcelas.append(
+            (i, _add_months(PRIMEIRA, i - 1), legacy_round(parcela_valor), legacy_round(juros),
+             legacy_round(amortizacao), legacy_round(saldo))
+        )
+    return parcelas
+
+
+def legacy_sac(valor: Decimal, taxa_mensal: Decimal, prazo: int) -> list[tuple]:
+    parcelas = []
+    amortizacao_constante = valor / prazo
+    saldo = valor
+    for i in range(1, prazo + 1):
+        juros = saldo * taxa_mensal
+        parcela = amortizacao_constante + juros
+        saldo -= amortizacao_constante
+        if saldo < Decimal("0.005"):
+            saldo = Decimal(0)
+        parcelas.append(
+            (i, _add_months(PRIMEIRA, i - 1), legacy_round(parcela), legacy_round(juros),
+             legacy_round(amortizacao_constante), legacy_round(saldo))
+        )
+    return parcelas
+
+
+# Geracao de cenarios ----------------------------------------------------
+
+def random_money(rng: random.Random) -> Decimal:
+    # Mistura valores em centavos com floats "sujos", como Decimal(str(valor_restante))
+    if rng.random() < 0.5:
+        return Decimal(rng.randint(1, 10_000_000)) / 100
+    return Decimal(str(rng.uniform(0.01, 100_000) * rng.choice([1, 1.15, 1.2])))
+
+
+def random_rate(rng: random.Random) -> Decimal:
+    if rng.random() < 0.5:
+        return Decimal(rng.randint(1, 6000)) / 10_000
+    return Decimal(str(rng.uniform(0.0001, 0.6)))
+
+
+# principal * taxa * dias / 365 caindo exatamente em meio centavo
+TIE_ACCRUALS = [
+    (Decimal("36.50"), Decimal("0.05"), 1),    # 0.005 -> 0.00
+    (Decimal("109.50"), Decimal("0.05"), 1),   # 0.015 -> 0.02
+    (Decimal("255.50"), Decimal("0.10"), 5),   # 0.35 exato
+    (Decimal("1.825"), Decimal("1"), 10),      # 0.05 exato
+    (Decimal("0.73"), Decimal("0.25"), 1),     # 0.0005 -> 0.00
+    (Decimal("912.50"), Decimal("0.01"), 1),   # 0.025 -> 0.02
+]
+
+
+def random_accruals(rng: random.Random, cases: int) -> list[tuple[Decimal, Decimal, int]]:
+    return TIE_ACCRUALS + [(random_money(rng), random_rate(rng), rng.randint(1, 400)) for _ in range(cases)]
+
+
+def random_schedules(rng: random.Random, cases: int) -> list[tuple[Decimal, Decimal, int]]:
+    schedules = [
+        (Decimal(rng.randint(10_000, 50_000_000)) / 100, _rate_annual_to_monthly(random_rate(rng)), rng.randint(1, 420))
+        for _ in range(cases)
+    ]
+    schedules.append((Decimal("100.05"), Decimal(0), 10))  # amortizacao em meio centavo
+    schedules.append((Decimal("45537.07"), _rate_annual_to_monthly(Decimal("0.0262")), 162))  # saldo em meio centavo
+    return schedules
+
+
+def schedule_rows(parcelas) -> list[tuple]:
+    return [
+        (p.numero, p.data_pagamento, p.valor_parcela, p.juros, p.amortizacao, p.saldo_devedor)
+        for p in parcelas
+    ]
+
+
+def same(expected, actual) -> bool:
+    # Compara valor e representacao (ex.: "0.00" vs "-0.00")
+    return expected == actual and str(expected) == str(actual)
+
+
+def exact_tie_resolved(exact: Fraction, actual) -> bool:
+    """``exact`` cai exatamente em meio centavo e ``actual`` e o arredondamento par."""
+    cents = exact * 100
+    if cents.denominator != 2:
+        return False
+    even = cents.numerator // 2 + (cents.numerator // 2) % 2
+    return Decimal(even).scaleb(-2) == actual
+
+
+def sac_exact_fields(valor: Decimal, taxa_mensal: Decimal, prazo: int, numero: int) -> dict[int, Fraction]:
+    # Indices de (numero, data, parcela, juros, amortizacao, saldo) com o valor racional exato
+    amortizacao = Fraction(valor) / prazo
+    juros = Fraction(valor) * (prazo - numero + 1) / prazo * Fraction(taxa_mensal)
+    return {2: amortizacao + juros, 3: juros, 4: amortizacao, 5: Fraction(valor) * (prazo - numero) / prazo}
+
+
+def half_even_cents(exact: Fraction) -> Decimal:
+    return Decimal(round(exact * 100)).scaleb(-2)
+
+
+def compare_schedule(legacy, current, valor: Decimal, taxa_mensal: Decimal, prazo: int) -> int:
+    """Confere o cronograma campo a campo e devolve quantos empates de meio centavo divergem.
+
+    So sao aceitas divergencias em campos SAC (ou Price sem juros) cujo valor
+    exato cai em meio centavo e que o motor novo arredondou para o par.
+    """
+    expected = legacy(valor, taxa_mensal, prazo)
+    actual = schedule_rows(current(valor, taxa_mensal, prazo, PRIMEIRA))
+    assert len(expected) == len(actual)
+    exact_sac = current is finance_service._sac_schedule or taxa_mensal == 0
+    ties = 0
+    for row_expected, row_actual in zip(expected, actual):
+        exact = sac_exact_fields(valor, taxa_mensal, prazo, row_actual[0]) if exact_sac else {}
+        for index, (a, b) in enumerate(zip(row_expected, row_actual)):
+            if same(a, b):
+                continue
+            if index in exact and exact_tie_resolved(exact[index], b):
+                ties += 1
+                continue
+            raise AssertionError((current.__name__, valor, taxa_mensal, prazo, row_expected, row_actual))
+    return ties
+
+
+# Testes -----------------------------------------------------------------
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_accrued_interest_igual_a_referencia(seed):
+    for principal, taxa, dias in random_accruals(random.Random(seed), 2000):
+        expected = legacy_accrued_interest(principal, taxa, dias)
+        assert same(expected, finance_service.accrued_interest(principal, taxa, dias)), (principal, taxa, dias)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_accrued_interest_cents_com_floats_igual_a_referencia(seed):
+    rng = random.Random(seed)
+    accruals = random_accruals(rng, 2000)
+    # Colunas do job: centavos e taxas com poucas casas (caminho rapido) e floats "sujos"
+    accruals += [(Decimal(rng.randint(1, 10_000_000)) / 100, Decimal(rng.randint(1, 6000)) / 10_000, rng.randint(1, 400))
+                 for _ in range(2000)]
+    for principal, taxa, dias in accruals:
+        principal, taxa = float(principal), float(taxa)
+        expected = legacy_accrued_interest(Decimal(str(principal)), Decimal(str(taxa)), dias)
+        assert float(expected) == finance_service.accrued_interest_cents(principal, taxa, dias) / 100, (
+            principal, taxa, dias,
+        )
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_cronogramas_iguais_a_referencia_exceto_empates(seed):
+    for valor, taxa_mensal, prazo in random_schedules(random.Random(seed), 25):
+        compare_schedule(legacy_price, finance_service._price_schedule, valor, taxa_mensal, prazo)
+        compare_schedule(legacy_sac, finance_service._sac_schedule, valor, taxa_mensal, prazo)
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_sac_arredonda_o_valor_exato_de_cada_campo(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        valor = Decimal(rng.randint(100, 500_000)) / 100
+        taxa_mensal = rng.choice([Decimal(0), Decimal("0.01"), Decimal("0.015"), _rate_annual_to_monthly(random_rate(rng))])
+        prazo = rng.randint(1, 60)
+        for row in schedule_rows(finance_service._sac_schedule(valor, taxa_mensal, prazo, PRIMEIRA)):
+            for index, exact in sac_exact_fields(valor, taxa_mensal, prazo, row[0]).items():
+                assert row[index] == half_even_cents(exact), (valor, taxa_mensal, prazo, row, index)
+
+
+def test_empates_de_meio_centavo_divergem_da_referencia():
+    # 567.50 / 39 * (1 + 17 * 0.01) = 17.025 na parcela 23: a referencia Decimal
+    # chega a 17.03 pelo ruido acumulado, o motor novo arredonda 17.025 para o par
+    assert compare_schedule(legacy_sac, finance_service._sac_schedule, Decimal("567.50"), Decimal("0.01"), 39) > 0
+    parcela = finance_service._sac_schedule(Decimal("567.50"), Decimal("0.01"), 39, PRIMEIRA)[22]
+    assert parcela.valor_parcela == Decimal("17.02")
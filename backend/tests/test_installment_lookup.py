@@ -0,0 +1,29 @@
+"""Parcela isolada (price/sac_installment_cents) contra o cronograma completo."""
+import random
+from decimal import Decimal
+
+import pytest
+
+from app.services.finance_service import (
+    _rate_annual_to_monthly,
+    price_installment_cents,
+    price_schedule_cents,
+    sac_installment_cents,
+    sac_schedule_cents,
+)
+
+
+@pytest.mark.parametrize(
+    "installment, schedule",
+    [(price_installment_cents, price_schedule_cents), (sac_installment_cents, sac_schedule_cents)],
+    ids=["price", "sac"],
+)
+def test_parcela_isolada_igual_a_linha_do_cronograma(installment, schedule):
+    rng = random.Random(7)
+    for _ in range(40):
+        valor = Decimal(rng.randint(10_000, 50_000_000)) / 100
+        taxa_mensal = _rate_annual_to_monthly(Decimal(rng.randint(1, 6000)) / 10_000)
+        prazo = rng.randint(1, 480)
+        rows = schedule(valor, taxa_mensal, prazo)
+        for numero in {1, 2, prazo // 2 or 1, prazo - 1 or 1, prazo, rng.randint(1, prazo)}:
+            assert installment(valor, taxa_mensal, prazo, numero) == rows[numero - 1], (valor, prazo, numero)
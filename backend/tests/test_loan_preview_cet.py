@@ -0,0 +1,23 @@
+"""CET do preview de emprestimo quando a TIR nao tem solucao."""
+import json
+from decimal import Decimal
+
+import pytest
+
+from app.schemas.finance import LoanPreviewRequest
+from app.services.finance_service import calculate_loan_preview, iter_loan_preview_ndjson
+
+
+@pytest.mark.parametrize("sistema", ["price", "sac"])
+def test_cet_sem_solucao_vira_null(sistema):
+    # Parcelas de 0.01 / 12 arredondam para zero centavo: nenhum fluxo positivo, TIR NaN
+    req = LoanPreviewRequest(valor=Decimal("0.01"), taxa_juros=Decimal("0.15"), prazo_meses=12, sistema=sistema)
+    preview = calculate_loan_preview(req)
+    assert preview.cet is None
+    assert json.loads(preview.model_dump_json())["cet"] is None
+    assert json.loads(list(iter_loan_preview_ndjson(req))[-1])["cet"] is None
+
+
+def test_cet_com_solucao_continua_decimal():
+    req = LoanPreviewRequest(valor=Decimal("1000"), taxa_juros=Decimal("0.15"), prazo_meses=12)
+    assert calculate_loan_preview(req).cet == Decimal("0.1499")
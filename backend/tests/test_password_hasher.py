@@ -0,0 +1,75 @@
+"""Vagas do pool de hash (password_hasher) com requisicoes canceladas."""
+import asyncio
+import threading
+
+import pytest
+
+from app.services.password_hasher import PasswordHashPool, PasswordHashPoolBusy
+
+
+def test_cancelar_requisicao_nao_libera_a_vaga_do_hash_em_curso():
+    pool = PasswordHashPool(workers=1, max_pending=2)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_hash(value):
+        started.set()
+        release.wait(5)
+        return value
+
+    async def scenario():
+        running = asyncio.create_task(pool.run(slow_hash, "a"))
+        await asyncio.to_thread(started.wait, 5)
+        queued = asyncio.create_task(pool.run(slow_hash, "b"))
+        await asyncio.sleep(0)
+        assert pool.pending == 2
+
+        # O hash "a" continua na thread: a vaga segue ocupada e a fila cheia recusa
+        running.cancel()
+        await asyncio.sleep(0.05)
+        assert pool.pending == 2
+        with pytest.raises(PasswordHashPoolBusy):
+            await pool.run(slow_hash, "c")
+
+        # "b" ainda nao comecou: cancelar tira o hash da fila e libera a vaga
+        queued.cancel()
+        await asyncio.sleep(0.05)
+        assert pool.pending == 1
+
+        release.set()
+        for _ in range(100):
+            if pool.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await pool.run(str.upper, "d") == "D"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
+
+    metrics = pool.metrics()
+    assert metrics["em_execucao"] == 0 and metrics["na_fila"] == 0
+    assert metrics["rejeitados"] == 1
+    # "a" terminou na thread mesmo cancelado; "b" nunca rodou
+    assert metrics["concluidos"] == 2
+    assert metrics["falhas"] == 0
+
+
+def test_falha_no_hash_conta_e_libera_a_vaga():
+    pool = PasswordHashPool(workers=1, max_pending=1)
+
+    def broken(_):
+        raise ValueError("hash invalido")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await pool.run(broken, "x")
+        assert pool.pending == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert pool.metrics()["falhas"] == 1
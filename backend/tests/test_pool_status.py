@@ -0,0 +1,51 @@
+"""GET /pool: carga single-flight do snapshot do pool."""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from app.api import pool
+from app.services.pool_cache import SnapshotCache
+from app.services.principal_cache import Principal
+
+
+class _TrackedSession:
+    closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_requisicao_lider_cancelada_nao_fecha_a_sessao_da_carga(monkeypatch):
+    monkeypatch.setattr(pool, "pool_snapshot_cache", SnapshotCache(60))
+    sessions: list[_TrackedSession] = []
+
+    def session_local() -> _TrackedSession:
+        sessions.append(_TrackedSession())
+        return sessions[-1]
+
+    started, release = threading.Event(), threading.Event()
+
+    def aggregate(db: _TrackedSession) -> SimpleNamespace:
+        started.set()
+        assert release.wait(5)
+        assert not db.closed, "sessao fechada durante a carga"
+        return SimpleNamespace(total_invested=100.0, total_committed=40.0, active_investors=2, queued_loans=1)
+
+    monkeypatch.setattr(pool, "SessionLocal", session_local)
+    monkeypatch.setattr(pool, "get_pool_aggregate", aggregate)
+    principal = Principal(id=1, is_admin=False, is_active=True)
+
+    async def scenario():
+        leader = asyncio.create_task(pool.get_pool_status(_=principal))
+        assert await asyncio.to_thread(started.wait, 5)
+        follower = asyncio.create_task(pool.get_pool_status(_=principal))
+        await asyncio.sleep(0)
+        # Requisicao lider cai no meio da carga; a seguidora recebe o resultado
+        leader.cancel()
+        release.set()
+        return leader, await follower
+
+    leader, response = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert response.saldo_disponivel == 60.0 and response.emprestimos_em_fila == 1
+    assert len(sessions) == 1 and sessions[0].closed
@@ -0,0 +1,34 @@
+"""Produtor do stream SSE do pool (pool_stream) diante de falhas do loader."""
+import asyncio
+import json
+
+from app.services.pool_stream import PoolStatusBroadcaster
+
+
+def test_produtor_sobrevive_a_falha_do_loader():
+    results = [{"total": 1}, RuntimeError("banco indisponivel"), RuntimeError("de novo"), {"total": 2}]
+
+    async def loader():
+        result = results.pop(0) if len(results) > 1 else results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    broadcaster = PoolStatusBroadcaster(loader, fallback_seconds=60, keepalive_seconds=60, retry_seconds=0.01)
+
+    async def scenario():
+        stream = broadcaster.subscribe()
+        snapshot = await stream.__anext__()
+        producer = broadcaster._producer
+        broadcaster.notify()
+        delta = await asyncio.wait_for(stream.__anext__(), timeout=5)
+        alive = not producer.done()
+        await stream.aclose()
+        return snapshot, delta, alive
+
+    snapshot, delta, alive = asyncio.run(scenario())
+
+    assert snapshot.startswith("event: snapshot") and json.loads(snapshot.split("data: ")[1]) == {"total": 1}
+    assert delta.startswith("event: delta") and json.loads(delta.split("data: ")[1]) == {"total": 2}
+    assert alive
+    assert broadcaster.failures == 2 and broadcaster.consecutive_failures == 0
@@ -0,0 +1,44 @@
+"""Contador de posicao da fila (pool_service.next_queue_position) no SQLite."""
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+from app.models import Base, Loan, SequenceCounter, User
+from app.services.pool_service import QUEUE_POSITION_COUNTER, next_queue_position
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fila.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_semeia_a_partir_da_fila_atual(engine):
+    with Session(engine) as db:
+        db.add(User(id=1, email="u@test", hashed_password="x", full_name="u", cpf="1"))
+        db.add(Loan(user_id=1, valor=100.0, taxa_juros=0.15, prazo_meses=12, status="fila", queue_position=7))
+        db.commit()
+        assert [next_queue_position(db) for _ in range(3)] == [8, 9, 10]
+        db.commit()
+
+
+def test_outra_transacao_semeia_primeiro(engine):
+    """O contador aparece entre o UPDATE vazio e a semeadura: nada de IntegrityError."""
+    with Session(engine) as db:
+        connection = db.connection()
+        seeded = []
+
+        @event.listens_for(connection, "after_cursor_execute")
+        def concurrent_seed(conn, cursor, statement, parameters, context, executemany):
+            if not seeded and statement.startswith("UPDATE sequence_counters"):
+                seeded.append(True)
+                conn.exec_driver_sql(
+                    "INSERT INTO sequence_counters (name, value) VALUES (?, ?)", (QUEUE_POSITION_COUNTER, 41)
+                )
+
+        assert next_queue_position(db) == 42
+        assert next_queue_position(db) == 43
+        db.commit()
+        assert db.execute(select(SequenceCounter.value)).scalar_one() == 43
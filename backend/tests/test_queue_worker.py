@@ -0,0 +1,89 @@
+"""Repeticao da passada da fila quando ela falha."""
+import asyncio
+
+from app.services import queue_worker as queue_worker_module
+from app.services.queue_worker import LoanQueueWorker
+
+
+def test_passada_com_erro_e_repetida_sem_novo_sinal(monkeypatch):
+    calls = []
+
+    def process(self):
+        calls.append(len(calls))
+        if len(calls) <= 2:
+            raise RuntimeError("banco indisponivel")
+        return 3
+
+    monkeypatch.setattr(LoanQueueWorker, "_process", process)
+    monkeypatch.setattr(queue_worker_module.pool_snapshot_cache, "invalidate", lambda: None)
+    worker = LoanQueueWorker(coalesce_seconds=0, retry_seconds=0.01, retry_max_seconds=0.02)
+
+    async def scenario():
+        worker.start()
+        for _ in range(200):
+            if worker.passes:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 3
+    metrics = worker.metrics()
+    assert metrics["falhas"] == 2
+    assert metrics["falhas_consecutivas"] == 0
+    assert metrics["passadas"] == 1
+    assert metrics["admitidos_total"] == 3
+    assert metrics["pendente"] is False
+
+
+def test_espera_entre_tentativas_cresce_ate_o_limite(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(queue_worker_module.asyncio, "sleep", fake_sleep)
+    worker = LoanQueueWorker(retry_seconds=1, retry_max_seconds=5)
+
+    async def scenario():
+        worker._event = asyncio.Event()
+        for failures in range(1, 6):
+            worker.consecutive_failures = failures
+            worker._event.clear()
+            await worker._retry(None)
+            assert worker._event.is_set()
+
+    asyncio.run(scenario())
+
+    assert delays == [1, 2, 4, 5, 5]
+    assert worker.metrics()["pendente"] is True
+
+
+def test_politica_resolvida_uma_vez_no_start(monkeypatch):
+    seen = []
+
+    def process(self):
+        seen.append(self.policy)
+        return 0
+
+    monkeypatch.setattr(LoanQueueWorker, "_process", process)
+    monkeypatch.setenv("LOAN_ADMISSION_POLICY", "skip_ahead")
+    worker = LoanQueueWorker(coalesce_seconds=0)
+
+    async def scenario():
+        worker.start()
+        monkeypatch.setenv("LOAN_ADMISSION_POLICY", "best_fit")
+        for _ in range(3):
+            worker.signal()
+            for _ in range(100):
+                await asyncio.sleep(0.005)
+                if not worker.metrics()["pendente"]:
+                    break
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+    assert len(seen) >= 2
+    assert all(policy is seen[0] for policy in seen)
+    assert worker.metrics()["politica"] == "skip_ahead"
@@ -0,0 +1,168 @@
+"""Compactacao mensal dos lancamentos de accrual (transaction_compaction)."""
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.auth import get_current_user
+from app.db import get_db
+from app.main import app
+from app.models import ArchivedTransaction, Base, Transaction, User, Wallet
+from app.services.principal_cache import Principal
+from app.services.transaction_compaction import compact_accrual_transactions
+
+BEFORE = datetime(2025, 4, 10)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'compactacao.db'}")
+
+    # FKs ligadas, como no PostgreSQL
+    @event.listens_for(engine, "connect")
+    def _foreign_keys(dbapi_connection, _):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    _seed(engine)
+    yield engine
+    engine.dispose()
+
+
+def _seed(engine) -> None:
+    rng = random.Random(14)
+    rows = []
+    for wallet_id in range(1, 5):
+        for investment_id in (10 * wallet_id, 10 * wallet_id + 1):
+            # Jan a abril: abril ainda esta aberto e nao e compactado
+            for day in range(0, 100, rng.choice([1, 2, 3])):
+                rows.append(
+                    {
+                        "wallet_id": wallet_id,
+                        "tipo": "rendimento_acumulado",
+                        "valor": rng.randint(1, 50_000) / 100,
+                        "related_investment_id": investment_id,
+                        "created_at": datetime(2025, 1, 1, 3) + timedelta(days=day),
+                    }
+                )
+        rows.append(
+            {"wallet_id": wallet_id, "tipo": "juros_acumulado", "valor": 1.23, "related_loan_id": wallet_id, "created_at": datetime(2025, 2, 14)}
+        )
+        rows.append({"wallet_id": wallet_id, "tipo": "deposito", "valor": 100.0, "created_at": datetime(2025, 1, 5)})
+    with Session(engine) as db:
+        for user_id in range(1, 5):
+            db.add(User(id=user_id, email=f"u{user_id}@test", hashed_password="x", full_name="t", cpf=str(user_id)))
+            db.add(Wallet(id=user_id, user_id=user_id, saldo=0.0))
+        db.flush()
+        empty = {"descricao": None, "related_investment_id": None, "related_loan_id": None}
+        db.execute(Transaction.__table__.insert(), [{**empty, **row} for row in rows])
+        db.commit()
+
+
+def _cents(valor: float) -> int:
+    return round(valor * 100)
+
+
+def _transactions(db: Session) -> list[tuple]:
+    return db.execute(
+        select(Transaction.id, Transaction.wallet_id, Transaction.tipo, Transaction.valor, Transaction.created_at)
+        .order_by(Transaction.id)
+    ).all()
+
+
+def _groups(db: Session) -> dict:
+    sums = defaultdict(int)
+    for row in db.execute(select(Transaction)).scalars():
+        periodo = row.created_at.strftime("%Y-%m")
+        sums[(row.wallet_id, row.tipo, row.related_investment_id, row.related_loan_id, periodo)] += _cents(row.valor)
+    return sums
+
+
+def test_somas_por_carteira_e_por_grupo_preservadas(engine):
+    with Session(engine) as db:
+        before = _groups(db)
+        original_ids = {row.id for row in _transactions(db)}
+        results = compact_accrual_transactions(db, BEFORE)
+        after = _groups(db)
+
+        assert [r["periodo"] for r in results] == ["2025-01", "2025-02", "2025-03"]
+        assert sum(r["resumos"] for r in results) > 0
+        # Cada grupo (carteira, tipo, alvo, mes) soma o mesmo, em centavos exatos
+        assert after == before
+        wallet_totals = defaultdict(int)
+        for (wallet_id, *_), cents in after.items():
+            wallet_totals[wallet_id] += cents
+        assert wallet_totals == {w: sum(c for k, c in before.items() if k[0] == w) for w in range(1, 5)}
+
+        archived = db.execute(select(ArchivedTransaction)).scalars().all()
+        assert len(archived) == sum(r["arquivados"] for r in results)
+        remaining_ids = {row.id for row in _transactions(db)}
+        assert {row.id for row in archived} == original_ids - remaining_ids
+        per_summary = defaultdict(int)
+        for row in archived:
+            per_summary[row.summary_transaction_id] += _cents(row.valor)
+        for summary_id, cents in per_summary.items():
+            assert _cents(db.get(Transaction, summary_id).valor) == cents
+        # Lancamento unico no mes, deposito e mes aberto ficam como estavam
+        kept = db.execute(
+            select(Transaction.tipo, Transaction.created_at).where(Transaction.id.in_(original_ids & remaining_ids))
+        ).all()
+        assert {tipo for tipo, _ in kept} == {"deposito", "juros_acumulado", "rendimento_acumulado"}
+        assert all(tipo != "rendimento_acumulado" or created_at >= datetime(2025, 4, 1) for tipo, created_at in kept)
+
+
+def test_reexecucao_nao_altera_nada(engine):
+    with Session(engine) as db:
+        compact_accrual_transactions(db, BEFORE)
+        transactions = _transactions(db)
+        archived = db.execute(select(ArchivedTransaction.id, ArchivedTransaction.summary_transaction_id)).all()
+
+        results = compact_accrual_transactions(db, BEFORE)
+        assert all(r["resumos"] == 0 and r["arquivados"] == 0 for r in results)
+        assert _transactions(db) == transactions
+        assert db.execute(select(ArchivedTransaction.id, ArchivedTransaction.summary_transaction_id)).all() == archived
+
+
+@pytest.fixture
+def client(engine):
+    factory = sessionmaker(bind=engine, autoflush=False)
+
+    def override_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=99, is_admin=True, is_active=True)
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_remover_resumo_responde_409(engine, client):
+    with Session(engine) as db:
+        compact_accrual_transactions(db, BEFORE)
+        summary_id = db.scalars(select(ArchivedTransaction.summary_transaction_id)).first()
+
+    response = client.delete(f"/transactions/{summary_id}")
+    assert response.status_code == 409, response.text
+    with Session(engine) as db:
+        assert db.get(Transaction, summary_id) is not None
+
+
+def test_remover_usuario_remove_o_arquivo_da_carteira(engine, client):
+    with Session(engine) as db:
+        compact_accrual_transactions(db, BEFORE)
+
+    response = client.delete("/users/2")
+    assert response.status_code == 204, response.text
+    with Session(engine) as db:
+        assert db.scalars(select(ArchivedTransaction.wallet_id).where(ArchivedTransaction.wallet_id == 2)).first() is None
+        assert db.scalars(select(ArchivedTransaction.wallet_id)).first() is not None
@@ -0,0 +1,48 @@
+﻿"""Roll closed months of accrual transactions into monthly summaries."""
+import argparse
+import logging
+from datetime import datetime
+
+from app.db import SessionLocal
+from app.services.transaction_compaction import (
+    COMPACTION_WALLET_BATCH,
+    compact_accrual_transactions,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger("transaction_compaction_job")
+
+
+def run_compaction_job(before: datetime, wallet_batch: int = COMPACTION_WALLET_BATCH) -> list[dict]:
+    db = SessionLocal()
+    try:
+        results = compact_accrual_transactions(db, before, wallet_batch)
+        for result in results:
+            logger.info(
+                "Mes %s compactado - resumos=%s, lancamentos arquivados=%s",
+                result["periodo"],
+                result["resumos"],
+                result["arquivados"],
+            )
+        logger.info("Compaction job finished - meses=%s", len(results))
+        return results
+    except Exception as exc:  # pragma: no cover - logging defensivo
+        db.rollback()
+        logger.exception("Compaction job failed: %s", exc)
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--before",
+        type=lambda value: datetime.strptime(value, "%Y-%m"),
+        default=datetime.utcnow(),
+        metavar="AAAA-MM",
+        help="compacta os meses anteriores a este (padrao: mes atual, ou seja, todos os meses fechados)",
+    )
+    parser.add_argument("--wallet-batch", type=int, default=COMPACTION_WALLET_BATCH, help="carteiras por commit")
+    args = parser.parse_args()
+    run_compaction_job(args.before, args.wallet_batch)